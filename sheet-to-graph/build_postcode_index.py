@@ -0,0 +1,15 @@
+"""
+This script compiles the ONS postcode directory into an indexed SQLite file
+that PostcodeToLatLong uses to look up postcodes.
+Run it once after downloading a new version of the ONS postcode directory.
+"""
+
+from sheet_to_graph import PostcodeIndex
+
+POSTCODE_DIRECTORY_PATH = "../data/ONSPD_FEB_2024_UK"
+
+if __name__ == "__main__":
+    index_file_name = f"{POSTCODE_DIRECTORY_PATH}/postcode_index.sqlite"
+    print(f"Building postcode index from {POSTCODE_DIRECTORY_PATH}")
+    PostcodeIndex.build(POSTCODE_DIRECTORY_PATH, index_file_name)
+    print(f"Saved postcode index to {index_file_name}")
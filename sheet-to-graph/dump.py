@@ -401,6 +401,10 @@ if __name__ == "__main__":
     with open("config.json") as f:
         config = json.load(f)
         credentials_file_name = config["credentials_file"]
+        metrics_file_name = config.get("dump_metrics_file", "")
+        profile_query_names = config.get("dump_profile_queries", [])
+        profile_directory_name = config.get("dump_profiles_directory", "query_profiles")
+        fetch_size = config.get("dump_fetch_size", 1000)
 
     queries = {
         # for top-level data directories:
@@ -419,6 +423,10 @@ if __name__ == "__main__":
         queries,
         credentials_file_name=credentials_file_name,
         output_directory_name=RESULTS_DIR,
+        profile_query_names=profile_query_names,
+        profile_directory_name=profile_directory_name,
+        metrics_file_name=metrics_file_name if metrics_file_name != "" else None,
+        fetch_size=fetch_size,
     )
 
     query_to_csv.make_queries_and_save_outputs()
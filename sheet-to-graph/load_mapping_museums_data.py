@@ -2,6 +2,7 @@ import json
 
 import pandas as pd
 
+from sheet_to_graph import GeoLookupStore
 
 governance_map = {
     "Government-Cadw": "other government",
@@ -35,9 +36,6 @@ governance_broad_map = {
     "Unknown": "unknown governance",
 }
 
-with open("postcode_lookup.json", "r") as f:
-    postcode_lookup = json.load(f)
-
 
 def size_map(size):
     if size == "unknown":
@@ -113,6 +111,9 @@ if __name__ == "__main__":
 
     mapping_museums_file = config["mapping_museums_file"]
     mapping_museums_data = pd.read_csv(mapping_museums_file)
+    postcode_lookup = GeoLookupStore().get_many(
+        "postcode", mapping_museums_data["Postcode"].dropna()
+    )
 
     museums_data = pd.DataFrame(
         {
@@ -1,4 +1,5 @@
 import json
+import os
 
 from sheet_to_graph import Neo4jConnection
 
@@ -7,6 +8,8 @@ if __name__ == "__main__":
     with open("config.json") as f:
         config = json.load(f)
         credentials_file_name = config["credentials_file"]
+        manifest_file_name = config.get("upload_manifest_file", "")
+        checkpoint_file_name = config.get("upload_checkpoint_file", "")
 
     with open(credentials_file_name, "r") as f:
         credentials = json.load(f)
@@ -16,5 +19,9 @@ if __name__ == "__main__":
 
     print("Deleting all data in database")
     neo4j_connection.delete_everything()
+    # the next upload must upload everything again
+    for file_name in [manifest_file_name, checkpoint_file_name]:
+        if file_name != "" and os.path.exists(file_name):
+            os.remove(file_name)
 
     print("Complete")
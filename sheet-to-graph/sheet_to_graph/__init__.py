@@ -1,13 +1,23 @@
+from .boundary_assigner import BoundaryAssigner
+from .bulk_import_translator import BulkImportTranslator
 from .column import Column
 from .connection_manager import ConnectionManager
 from .cypher_translator import CypherTranslator
 from .excel_writer import ExcelWriter
 from .google_utils import GoogleUtils
+from .http_response_cache import HttpResponseCache
 from .rule import Rule
 from .file_loader import FileLoader
 from .file_preprocessor import FilePreprocessor
+from .geo_lookup_store import GeoLookupStore
 from .neo4j_connection import Neo4jConnection
+from .postcode_index import PostcodeIndex
 from .postcode_to_lat_long import PostcodeToLatLong
 from .queries import Queries
+from .query_metrics import QueryMetrics
+from .reverse_geocoder import ReverseGeocoder
+from .spatial_index import SpatialIndex
 from .table import Table
+from .upload_checkpoint import UploadCheckpoint
+from .upload_scheduler import UploadScheduler
 from .wikidata_connection import WikidataConnection
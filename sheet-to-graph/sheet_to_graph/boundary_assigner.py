@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+
+class BoundaryAssigner:
+    """Assigns points to the local authority (or other area) whose boundary contains them.
+
+    Boundaries are loaded from a GeoJSON file in British National Grid coordinates
+    (EPSG:27700), such as the ONS "Local Authority Districts" boundaries,
+    and each feature's area code is read from the property code_property.
+    The boundaries are held in an STR-tree and prepared, so arrays of points
+    are assigned in one call: the tree finds the boundaries whose bounding box
+    contains each point, and only those are tested.
+
+    Only one set of boundaries is loaded. PostcodeToLatLong loads the local
+    authority districts, and takes a point's region from its LAD in the LAD
+    lookup table, rather than from region boundaries: each LAD lies within one
+    region (ITL1), so the LAD's region is the one containing the point.
+
+    Requires shapely 2, which is an optional dependency.
+    """
+
+    def __init__(self, boundaries_file_name: str, code_property: str = "LAD23CD"):
+        if shapely is None:
+            raise ImportError("BoundaryAssigner requires shapely: pip install shapely")
+        with open(boundaries_file_name, "r", encoding="utf-8") as f:
+            features = json.load(f)["features"]
+        self.codes = np.array(
+            [feature["properties"][code_property] for feature in features],
+            dtype=object,
+        )
+        self.boundaries = np.array(
+            [shapely.geometry.shape(feature["geometry"]) for feature in features],
+            dtype=object,
+        )
+        shapely.prepare(self.boundaries)
+        self.tree = shapely.STRtree(self.boundaries)
+
+    def assign_local_authorities(self, bng_x, bng_y) -> list:
+        """Returns the code of the boundary containing each point,
+        or None for points outside every boundary.
+        Points on a shared border are given the boundary that comes first in the file.
+        """
+        xs = np.ravel(np.asarray(bng_x, dtype=float))
+        ys = np.ravel(np.asarray(bng_y, dtype=float))
+        point_indices, boundary_indices = self.tree.query(shapely.points(xs, ys))
+        inside = shapely.intersects_xy(
+            self.boundaries[boundary_indices],
+            xs[point_indices],
+            ys[point_indices],
+        )
+        codes = [None] * len(xs)
+        # visit candidates in reverse file order so the first boundary wins
+        for point_index, boundary_index in sorted(
+            zip(point_indices[inside], boundary_indices[inside]),
+            key=lambda pair: -pair[1],
+        ):
+            codes[point_index] = self.codes[boundary_index]
+        return codes
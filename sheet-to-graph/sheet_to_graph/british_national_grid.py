@@ -0,0 +1,176 @@
+"""Vectorised conversions between WGS84 latitude/longitude and
+British National Grid (OSGB36) eastings and northings.
+
+These are NumPy ports of bng_latlon's WGS84toOSGB36 and OSGB36toWGS84
+(a Helmert transform between the GRS80 and Airy 1830 ellipsoids and the
+Ordnance Survey's transverse Mercator projection), so that whole arrays of
+points can be converted in one call.
+They follow the same algorithm, so results agree with bng_latlon to within
+the rounding bng_latlon applies to its results: 1e-4 m for eastings and
+northings, and 1e-6 degrees for latitudes and longitudes.
+Unlike bng_latlon, the results here are not rounded.
+"""
+
+import numpy as np
+
+# GRS80 ellipsoid, used by WGS84
+_A_GRS80, _B_GRS80 = 6378137.000, 6356752.3141
+_E2_GRS80 = 1 - (_B_GRS80 * _B_GRS80) / (_A_GRS80 * _A_GRS80)
+
+# Airy 1830 ellipsoid, used by OSGB36
+_A_AIRY, _B_AIRY = 6377563.396, 6356256.909
+_E2_AIRY = 1 - (_B_AIRY * _B_AIRY) / (_A_AIRY * _A_AIRY)
+_N_AIRY = (_A_AIRY - _B_AIRY) / (_A_AIRY + _B_AIRY)
+
+# national grid projection
+_F0 = 0.9996012717  # scale factor on the central meridian
+_LAT0 = np.radians(49)  # latitude of true origin
+_LON0 = np.radians(-2)  # longitude of true origin and central meridian
+_N0, _E0 = -100000, 400000  # northing & easting of true origin (m)
+
+# Helmert transform from GRS80 to Airy 1830;
+# the reverse transform negates every parameter
+_S = 20.4894e-6  # scale factor - 1
+_TX, _TY, _TZ = -446.448, 125.157, -542.060  # translations (m)
+_RX, _RY, _RZ = np.radians(np.array([-0.1502, -0.2470, -0.8421]) / 3600)
+
+_MAX_ITERATIONS = 100
+
+
+def wgs84_to_osgb36(lat, long) -> tuple:
+    """Converts WGS84 latitudes and longitudes (in degrees)
+    to British National Grid eastings and northings (in metres).
+    Accepts scalars or array-likes and returns a tuple of two arrays (x, y)."""
+    lat_1 = np.radians(np.asarray(lat, dtype=float))
+    lon_1 = np.radians(np.asarray(long, dtype=float))
+
+    # to cartesian coordinates on the GRS80 ellipsoid
+    nu_1 = _A_GRS80 / np.sqrt(1 - _E2_GRS80 * np.sin(lat_1) ** 2)
+    x_1 = nu_1 * np.cos(lat_1) * np.cos(lon_1)
+    y_1 = nu_1 * np.cos(lat_1) * np.sin(lon_1)
+    z_1 = (1 - _E2_GRS80) * nu_1 * np.sin(lat_1)
+
+    x_2, y_2, z_2 = _helmert(x_1, y_1, z_1, _S, _TX, _TY, _TZ, _RX, _RY, _RZ)
+
+    # back to latitude and longitude on the Airy 1830 ellipsoid
+    lat, nu = _cartesian_to_latitude(x_2, y_2, z_2, _A_AIRY, _E2_AIRY)
+    lon = np.arctan2(y_2, x_2)
+
+    # project onto the national grid
+    sin_lat, cos_lat, tan_lat = np.sin(lat), np.cos(lat), np.tan(lat)
+    rho = _A_AIRY * _F0 * (1 - _E2_AIRY) * (1 - _E2_AIRY * sin_lat**2) ** (-1.5)
+    eta2 = nu * _F0 / rho - 1
+    M = _meridional_arc(lat)
+
+    I = M + _N0
+    II = nu * _F0 * sin_lat * cos_lat / 2
+    III = nu * _F0 * sin_lat * cos_lat**3 * (5 - tan_lat**2 + 9 * eta2) / 24
+    IIIA = nu * _F0 * sin_lat * cos_lat**5 * (61 - 58 * tan_lat**2 + tan_lat**4) / 720
+    IV = nu * _F0 * cos_lat
+    V = nu * _F0 * cos_lat**3 * (nu / rho - tan_lat**2) / 6
+    VI = (
+        nu
+        * _F0
+        * cos_lat**5
+        * (5 - 18 * tan_lat**2 + tan_lat**4 + 14 * eta2 - 58 * eta2 * tan_lat**2)
+        / 120
+    )
+
+    d_lon = lon - _LON0
+    y = I + II * d_lon**2 + III * d_lon**4 + IIIA * d_lon**6
+    x = _E0 + IV * d_lon + V * d_lon**3 + VI * d_lon**5
+    return x, y
+
+
+def osgb36_to_wgs84(x, y) -> tuple:
+    """Converts British National Grid eastings and northings (in metres)
+    to WGS84 latitudes and longitudes (in degrees).
+    Accepts scalars or array-likes and returns a tuple of two arrays (lat, long)."""
+    E = np.asarray(x, dtype=float)
+    N = np.asarray(y, dtype=float)
+
+    # find the latitude whose meridional arc matches the northing, to 0.01mm
+    lat = np.full(np.broadcast(E, N).shape, _LAT0)
+    M = np.zeros_like(lat)
+    for _ in range(_MAX_ITERATIONS):
+        unconverged = N - _N0 - M >= 0.00001
+        if not np.any(unconverged):
+            break
+        lat = np.where(unconverged, (N - _N0 - M) / (_A_AIRY * _F0) + lat, lat)
+        M = np.where(unconverged, _meridional_arc(lat), M)
+
+    sin_lat, tan_lat = np.sin(lat), np.tan(lat)
+    sec_lat = 1 / np.cos(lat)
+    nu = _A_AIRY * _F0 / np.sqrt(1 - _E2_AIRY * sin_lat**2)
+    rho = _A_AIRY * _F0 * (1 - _E2_AIRY) * (1 - _E2_AIRY * sin_lat**2) ** (-1.5)
+    eta2 = nu / rho - 1
+
+    VII = tan_lat / (2 * rho * nu)
+    VIII = (
+        tan_lat
+        / (24 * rho * nu**3)
+        * (5 + 3 * tan_lat**2 + eta2 - 9 * tan_lat**2 * eta2)
+    )
+    IX = tan_lat / (720 * rho * nu**5) * (61 + 90 * tan_lat**2 + 45 * tan_lat**4)
+    X = sec_lat / nu
+    XI = sec_lat / (6 * nu**3) * (nu / rho + 2 * tan_lat**2)
+    XII = sec_lat / (120 * nu**5) * (5 + 28 * tan_lat**2 + 24 * tan_lat**4)
+    XIIA = (
+        sec_lat
+        / (5040 * nu**7)
+        * (61 + 662 * tan_lat**2 + 1320 * tan_lat**4 + 720 * tan_lat**6)
+    )
+    d_E = E - _E0
+    lat_1 = lat - VII * d_E**2 + VIII * d_E**4 - IX * d_E**6
+    lon_1 = _LON0 + X * d_E - XI * d_E**3 + XII * d_E**5 - XIIA * d_E**7
+
+    # to cartesian coordinates on the Airy 1830 ellipsoid
+    x_1 = nu / _F0 * np.cos(lat_1) * np.cos(lon_1)
+    y_1 = nu / _F0 * np.cos(lat_1) * np.sin(lon_1)
+    z_1 = (1 - _E2_AIRY) * nu / _F0 * np.sin(lat_1)
+
+    x_2, y_2, z_2 = _helmert(x_1, y_1, z_1, -_S, -_TX, -_TY, -_TZ, -_RX, -_RY, -_RZ)
+
+    # back to latitude and longitude on the GRS80 ellipsoid
+    lat, _ = _cartesian_to_latitude(x_2, y_2, z_2, _A_GRS80, _E2_GRS80)
+    lon = np.arctan2(y_2, x_2)
+    return np.degrees(lat), np.degrees(lon)
+
+
+def _helmert(x, y, z, s, tx, ty, tz, rx, ry, rz):
+    return (
+        tx + (1 + s) * x - rz * y + ry * z,
+        ty + rz * x + (1 + s) * y - rx * z,
+        tz - ry * x + rx * y + (1 + s) * z,
+    )
+
+
+def _cartesian_to_latitude(x, y, z, a, e2):
+    """Finds the latitude of cartesian coordinates on an ellipsoid by iteration.
+    Also returns the transverse radius of curvature nu, which (as in bng_latlon)
+    is the one computed from the latitude of the last but one iteration."""
+    p = np.sqrt(x**2 + y**2)
+    lat = np.arctan2(z, p * (1 - e2))
+    for _ in range(_MAX_ITERATIONS):
+        nu = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+        new_lat = np.arctan2(z + e2 * nu * np.sin(lat), p)
+        converged = np.all(np.abs(new_lat - lat) <= 1e-16)
+        lat = new_lat
+        if converged:
+            break
+    return lat, nu
+
+
+def _meridional_arc(lat):
+    n = _N_AIRY
+    M1 = (1 + n + (5 / 4) * n**2 + (5 / 4) * n**3) * (lat - _LAT0)
+    M2 = (
+        (3 * n + 3 * n**2 + (21 / 8) * n**3) * np.sin(lat - _LAT0) * np.cos(lat + _LAT0)
+    )
+    M3 = (
+        ((15 / 8) * n**2 + (15 / 8) * n**3)
+        * np.sin(2 * (lat - _LAT0))
+        * np.cos(2 * (lat + _LAT0))
+    )
+    M4 = (35 / 24) * n**3 * np.sin(3 * (lat - _LAT0)) * np.cos(3 * (lat + _LAT0))
+    return _B_AIRY * _F0 * (M1 - M2 + M3 - M4)
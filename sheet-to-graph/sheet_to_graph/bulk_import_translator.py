@@ -0,0 +1,214 @@
+import numbers
+import os
+
+from .cypher_translator import CypherTranslator
+
+
+class BulkImportTranslator(CypherTranslator):
+    """This class translates objects of the class sheet_to_graph.Table into the
+    node and relationship csv files read by neo4j-admin database import,
+    which loads a whole graph into an empty database much faster than Cypher queries.
+
+    Nodes are deduplicated by label and key and relationships are deduplicated,
+    as in CypherTranslator.translate_tables_in_batches.
+    Each node type (a primary key column's type_label and name) gets its own file
+    and ID space, named type_label_key, and its extra type labels go in a :LABEL column.
+    Each relationship type between two node types gets its own file.
+    Relationships to nodes that are not in the tables are left out,
+    as they are when a Cypher query fails to MATCH them.
+
+    Every value is quoted, so that an empty string is imported as one,
+    while a missing value is left empty and imported as null.
+    neo4j-admin cannot escape the array delimiter, so the first of
+    array_delimiters that no array element or label contains is used.
+
+    Initialize with the name of the directory where the csv files are saved.
+    Use translate_tables to write the files, and get_import_command
+    for the neo4j-admin command that imports them.
+    """
+
+    array_delimiters = [";", "|", "^", "~"]
+
+    def __init__(self, output_directory_name: str):
+        super().__init__()
+        self.output_directory_name = output_directory_name
+        self.array_delimiter = self.array_delimiters[0]
+
+    def translate_tables(self, *tables) -> dict:
+        """Writes the csv files and returns their names as
+        {"nodes": [...], "relationships": [...]}."""
+        os.makedirs(self.output_directory_name, exist_ok=True)
+        plans = [self._compile_translation_plan(table) for table in tables]
+        nodes = self._collect_nodes(tables, plans)
+        self.array_delimiter = self._get_array_delimiter(nodes.values())
+        file_names = {
+            "nodes": self._write_nodes(nodes),
+            "relationships": self._write_relationships(
+                self._collect_relationships(tables, plans),
+                {(type_label, key, str(value)) for type_label, key, value in nodes},
+            ),
+        }
+        return file_names
+
+    def get_import_command(self, file_names: dict, database: str = "neo4j") -> str:
+        return " ".join(
+            ["neo4j-admin database import full"]
+            + [f"--nodes={file_name}" for file_name in file_names["nodes"]]
+            + [
+                f"--relationships={file_name}"
+                for file_name in file_names["relationships"]
+            ]
+            + [
+                f'--array-delimiter="{self.array_delimiter}"',
+                "--multiline-fields=true",
+                "--overwrite-destination",
+                database,
+            ]
+        )
+
+    def _write_nodes(self, nodes: dict) -> list:
+        # node_types = {(type_label, key): [(key_value, node), ...]}
+        node_types = {}
+        for (type_label, key, key_value), node in nodes.items():
+            node_types.setdefault((type_label, key), []).append((key_value, node))
+        file_names = []
+        for (type_label, key), type_nodes in node_types.items():
+            property_names = list(
+                dict.fromkeys(
+                    name for _, node in type_nodes for name in node["properties"]
+                )
+            )
+            property_types = {
+                name: self._get_property_type(
+                    [node["properties"].get(name) for _, node in type_nodes]
+                )
+                for name in property_names
+            }
+            file_name = os.path.join(
+                self.output_directory_name, f"nodes_{type_label}_{key}.csv"
+            )
+            with open(file_name, "w", newline="", encoding="utf-8") as f:
+                self._write_row(
+                    f,
+                    [f"{key}:ID({self._get_id_space(type_label, key)})"]
+                    + [f"{name}:{property_types[name]}" for name in property_names]
+                    + [":LABEL"],
+                )
+                for key_value, node in type_nodes:
+                    self._write_row(
+                        f,
+                        [str(key_value)]
+                        + [
+                            self._format_value(node["properties"].get(name))
+                            for name in property_names
+                        ]
+                        + [
+                            self.array_delimiter.join(
+                                [type_label] + node["type_labels"]
+                            )
+                        ],
+                    )
+            file_names.append(file_name)
+        return file_names
+
+    def _write_relationships(self, relationship_types: dict, node_ids: set) -> list:
+        file_names = []
+        for index, (
+            (from_type, from_key, to_type, to_key, type_label),
+            relationships,
+        ) in enumerate(relationship_types.items()):
+            relationships = [
+                relationship
+                for relationship in relationships
+                if (from_type, from_key, relationship["from"]) in node_ids
+                and (to_type, to_key, relationship["to"]) in node_ids
+            ]
+            if len(relationships) == 0:
+                continue
+            property_names = list(
+                dict.fromkeys(
+                    name
+                    for relationship in relationships
+                    for name in relationship["properties"]
+                )
+            )
+            file_name = os.path.join(
+                self.output_directory_name,
+                f"relationships_{index}_{type_label}.csv",
+            )
+            with open(file_name, "w", newline="", encoding="utf-8") as f:
+                self._write_row(
+                    f,
+                    [
+                        f":START_ID({self._get_id_space(from_type, from_key)})",
+                        f":END_ID({self._get_id_space(to_type, to_key)})",
+                    ]
+                    + property_names
+                    + [":TYPE"],
+                )
+                for relationship in relationships:
+                    self._write_row(
+                        f,
+                        [str(relationship["from"]), str(relationship["to"])]
+                        + [
+                            self._format_value(relationship["properties"].get(name))
+                            for name in property_names
+                        ]
+                        + [type_label],
+                    )
+            file_names.append(file_name)
+        return file_names
+
+    def _get_id_space(self, type_label: str, key: str) -> str:
+        return f"{type_label}_{key}"
+
+    def _get_property_type(self, values: list) -> str:
+        values = [value for value in values if value is not None]
+        if len(values) == 0:
+            return "string"
+        if all(isinstance(value, bool) for value in values):
+            return "boolean"
+        if all(isinstance(value, list) for value in values):
+            return "string[]"
+        if any(isinstance(value, bool) for value in values):
+            return "string"
+        if all(isinstance(value, numbers.Integral) for value in values):
+            return "long"
+        if all(isinstance(value, numbers.Real) for value in values):
+            return "double"
+        return "string"
+
+    def _get_array_delimiter(self, nodes) -> str:
+        strings = set()
+        for node in nodes:
+            strings.update(node["type_labels"])
+            for value in node["properties"].values():
+                if isinstance(value, list):
+                    strings.update(str(item) for item in value)
+        for array_delimiter in self.array_delimiters:
+            if not any(array_delimiter in string for string in strings):
+                return array_delimiter
+        raise ValueError(
+            "Every array delimiter appears in an array element: "
+            + " ".join(self.array_delimiters)
+        )
+
+    def _write_row(self, f, fields: list):
+        # csv.writer cannot quote an empty string without also quoting None
+        f.write(
+            ",".join(
+                "" if field is None else '"' + field.replace('"', '""') + '"'
+                for field in fields
+            )
+            + "\r\n"
+        )
+
+    def _format_value(self, value) -> str:
+        """Returns value as it is written in a csv file, or None if it is missing."""
+        if value is None or (isinstance(value, list) and len(value) == 0):
+            return None
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, list):
+            return self.array_delimiter.join(str(item) for item in value)
+        return str(value)
@@ -4,6 +4,7 @@ from .enum_column import EnumColumn
 from .extended_date_time_column import ExtendedDateTimeColumn
 from .formula_column import FormulaColumn
 from .list_column import ListColumn
+from .multi_formula_column import MultiFormulaColumn
 from .optional_column import OptionalColumn
 from .reference_column import ReferenceColumn
 from .split_column import SplitColumn
@@ -37,6 +37,10 @@ class FormulaColumn(Column):
         )
         self.formula = formula
 
+    def calculate_as_dict(self, table, row_index) -> dict:
+        """Returns a dict {column-name: cell-value} for the row at row_index."""
+        return {self.name: self.formula(table, row_index)}
+
     def _validate(self, value) -> str:
         pass
 
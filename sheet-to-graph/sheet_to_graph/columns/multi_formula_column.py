@@ -0,0 +1,43 @@
+from .formula_column import FormulaColumn
+
+
+class MultiFormulaColumn(FormulaColumn):
+    """
+    Calculates the values for several sub-columns with one formula supplied as a callable,
+    for when several columns are derived from the same calculation.
+    Formula is a function with 2 arguments: table and row_index, and returns a dict.
+    Each sub-column takes the value of the key given for it in outputs
+    ({sub-column name: key}), or of its own name if it is not in outputs.
+    Only the sub-columns are added to the table; the dict itself is not stored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        formula: callable,
+        sub_columns: list,
+        outputs: dict = None,
+    ):
+        super().__init__(name, formula, ignore=True)
+        self.sub_columns = sub_columns
+        self.outputs = {} if outputs is None else outputs
+
+    @property
+    def parent_table(self):
+        return self._parent_table
+
+    @parent_table.setter
+    def parent_table(self, table):
+        self._parent_table = table
+        for sub_col in self.sub_columns:
+            sub_col.parent_table = table
+
+    def as_dict(self) -> dict:
+        return {sub_column.name: sub_column for sub_column in self.sub_columns}
+
+    def calculate_as_dict(self, table, row_index) -> dict:
+        values = self.formula(table, row_index)
+        return {
+            sub_column.name: values[self.outputs.get(sub_column.name, sub_column.name)]
+            for sub_column in self.sub_columns
+        }
@@ -1,4 +1,6 @@
 import csv
+import json
+import os
 
 from sheet_to_graph import ConnectionManager
 
@@ -13,6 +15,14 @@ class QueryToCsv(ConnectionManager):
     - credentials_file_name: the name of the file where the database credentials are.
       the file should be in json format with fields uri, user, password
     - output_directory_name: the name of the directory where CSVs are saved.
+    - profile_query_names: the names of queries to run with PROFILE.
+      Their plans and db hits are saved as json files, named after the query,
+      in profile_directory_name, so they can be compared between versions.
+    - metrics_file_name: if given, the latency metrics of the queries
+      (see QueryMetrics) are saved in this file.
+    - fetch_size: the number of records fetched from the database at a time.
+      Records are written to the CSV files as they arrive,
+      so only this many are held in memory.
     """
 
     def __init__(
@@ -20,27 +30,59 @@ class QueryToCsv(ConnectionManager):
         queries: dict,
         credentials_file_name: str = "",
         output_directory_name: str = "",
+        profile_query_names: list = None,
+        profile_directory_name: str = "query_profiles",
+        metrics_file_name: str = None,
+        fetch_size: int = 1000,
     ):
         self.queries = queries
         self.credentials_file_name = credentials_file_name
         self.output_directory_name = output_directory_name
+        self.profile_query_names = (
+            [] if profile_query_names is None else profile_query_names
+        )
+        self.profile_directory_name = profile_directory_name
+        self.metrics_file_name = metrics_file_name
+        self.fetch_size = fetch_size
 
     def make_queries_and_save_outputs(self):
         neo4j_connection = self._initialize_neo4j_connection()
         for query_name, query in self.queries.items():
             self._make_query_and_save_output(neo4j_connection, query_name, query)
         print("Finished making queries")
+        neo4j_connection.metrics.print_summary()
+        if self.metrics_file_name is not None:
+            neo4j_connection.metrics.save(self.metrics_file_name)
 
     def _make_query_and_save_output(self, neo4j_connection, query_name, query):
         print(f"Making query: {query_name}")
         query_file_name = f"{self.output_directory_name}/{query_name}.csv"
-        records = neo4j_connection.run_query(query)
-        try:
-            field_names = records[0].keys()
-        except IndexError:
+        records = neo4j_connection.stream_query(
+            query,
+            fetch_size=self.fetch_size,
+            on_profile=(
+                (lambda profile: self._save_profile(query_name, query, profile))
+                if query_name in self.profile_query_names
+                else None
+            ),
+        )
+        # the field names are taken from the first record,
+        # and the rest are written as they arrive
+        first_record = next(records, None)
+        if first_record is None:
             print("no results")
             return
         with open(query_file_name, "w") as f:
-            writer = csv.DictWriter(f, fieldnames=field_names)
+            writer = csv.DictWriter(f, fieldnames=first_record.keys())
             writer.writeheader()
+            writer.writerow(first_record)
             writer.writerows(records)
+
+    def _save_profile(self, query_name, query, profile):
+        profile_file_name = f"{self.profile_directory_name}/{query_name}.json"
+        os.makedirs(os.path.dirname(profile_file_name), exist_ok=True)
+        with open(profile_file_name, "w") as f:
+            json.dump(
+                {"query_name": query_name, "query": query, **profile}, f, indent=4
+            )
+        print(f"Saved profile of {query_name}: {profile['db_hits']} db hits")
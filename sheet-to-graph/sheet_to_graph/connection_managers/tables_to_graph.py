@@ -1,6 +1,16 @@
+import json
+import os
+import re
+import time
+
+import neo4j
+
+from sheet_to_graph.bulk_import_translator import BulkImportTranslator
 from sheet_to_graph.connection_manager import ConnectionManager
 from sheet_to_graph.cypher_translator import CypherTranslator
 from sheet_to_graph.excel_writer import ExcelWriter
+from sheet_to_graph.upload_checkpoint import UploadCheckpoint
+from sheet_to_graph.upload_scheduler import UploadScheduler
 
 
 class TablesToGraph(ConnectionManager):
@@ -8,12 +18,48 @@ class TablesToGraph(ConnectionManager):
     Use translate_and_upload to validate the tables, translate them into Cypher,
     upload the data to the database, and then run additional inference_queries.
 
+    Before the data is uploaded, a uniqueness constraint is created for the key
+    of each node type (each primary key column's type_label and name), so that
+    nodes can be looked up by their key without scanning every node with the label.
+    A key that other node types with the same label also have as a property
+    (such as the type_name of Type nodes keyed by type_id) need not be unique
+    across the label, so it gets an index instead. So does a key for which the
+    database already holds duplicates, so that the constraint cannot be created.
+    Without a batch_size or manifest_file_name, each node is merged on all of its
+    properties, so rows with the same key and different properties make separate
+    nodes, as they always have. Every key then gets an index instead.
+
+    For a full rebuild of a self-managed database, use translate_and_export instead,
+    which writes the tables as csv files for neo4j-admin database import,
+    together with a Cypher file that creates the constraints and runs the
+    inference_queries once the import is complete.
+
     Initialize with:
     - tables: a list of objects of the sheet_to_graph.Table class.
     - inference_queries: a list of strings written in Cypher.
     - credentials_file_name: the name of the file where the database credentials are.
       the file should be in json format with fields uri, user, password
     - query_file_name: the name of a file where the generated Cypher queries are saved.
+    - batch_size: if given, the tables are translated into parameterised queries
+      that each merge up to batch_size nodes or relationships
+      (see CypherTranslator.translate_tables_in_batches),
+      rather than one query per node and relationship.
+    - manifest_file_name: if given, only the changes since the last upload are
+      uploaded (see CypherTranslator.translate_tables_as_diff). A manifest of what
+      was uploaded is saved in this file after each upload, so delete it
+      whenever the database is reset.
+      The manifest does not cover what inference_queries change, so with any
+      inference_queries everything is uploaded and the manifest is deleted.
+    - transaction_size: the number of queries committed together in each transaction.
+    - workers: the number of sessions that upload batches of nodes and relationships
+      at the same time (see UploadScheduler). With 1, queries are run one at a time.
+    - checkpoint_file_name: if given, the queries are recorded in this file as they
+      are committed (see UploadCheckpoint), so that an interrupted upload
+      skips them when it is run again. The file is deleted once the upload is complete.
+      The inference_queries are recorded together once they have all run, so they
+      are only run again if the upload was interrupted before they had finished.
+    - metrics_file_name: if given, the latency metrics of the upload's queries
+      (see QueryMetrics) are saved in this file.
     """
 
     def __init__(
@@ -22,12 +68,26 @@ class TablesToGraph(ConnectionManager):
         inference_queries: list = None,
         credentials_file_name: str = "",
         query_file_name: str = "queries.txt",
+        batch_size: int = None,
+        manifest_file_name: str = None,
+        transaction_size: int = 100,
+        workers: int = 1,
+        checkpoint_file_name: str = None,
+        metrics_file_name: str = None,
     ):
         self.tables = tables
         self.inference_queries = [] if inference_queries is None else inference_queries
         self.credentials_file_name = credentials_file_name
         self.query_file_name = query_file_name
+        self.batch_size = batch_size
+        self.manifest_file_name = manifest_file_name
+        self.transaction_size = transaction_size
+        self.workers = workers
+        self.checkpoint_file_name = checkpoint_file_name
+        self.metrics_file_name = metrics_file_name
+        # queries = [(query, parameters), ...]
         self.queries = None
+        self.manifest = None
 
     def translate_and_upload(
         self,
@@ -69,20 +129,192 @@ class TablesToGraph(ConnectionManager):
     def translate_tables_into_cypher_queries(self):
         print("Translating tables into cypher queries")
         translator = self._initialize_cypher_translator()
-        self.queries = translator.translate_tables(*self.tables)
+        if self.manifest_file_name is not None and len(self.inference_queries) > 0:
+            print(
+                "Inference queries change the graph outside the manifest, "
+                + "uploading everything"
+            )
+            if os.path.exists(self.manifest_file_name):
+                os.remove(self.manifest_file_name)
+        if self.manifest_file_name is not None and len(self.inference_queries) == 0:
+            self.queries, self.manifest = translator.translate_tables_as_diff(
+                *self.tables,
+                manifest=self._load_manifest(),
+                batch_size=self.batch_size or 1000,
+            )
+        elif self.batch_size:
+            self.queries = list(
+                translator.translate_tables_in_batches(
+                    *self.tables, batch_size=self.batch_size
+                )
+            )
+        else:
+            self.queries = [
+                (query, None) for query in translator.translate_tables(*self.tables)
+            ]
         number_of_queries = len(self.queries)
         print(f"Generated {number_of_queries} queries")
 
     def upload_to_neo4j_database(self):
         print("Connecting to Neo4j database")
         neo4j_connection = self._initialize_neo4j_connection()
-        print("Uploading data to Neo4j database")
         neo4j_connection.open()
-        for query in self.queries + self.inference_queries:
-            neo4j_connection.run_query(query)
+        self.create_constraints(
+            neo4j_connection, unique=bool(self.batch_size) or self.manifest is not None
+        )
+        checkpoint = (
+            None
+            if self.checkpoint_file_name is None
+            else UploadCheckpoint(self.checkpoint_file_name)
+        )
+        print("Uploading data to Neo4j database")
+        start = time.perf_counter()
+        upload_scheduler = UploadScheduler(
+            neo4j_connection, self.workers, self.transaction_size
+        )
+        number_of_queries = upload_scheduler.run(self.queries, checkpoint)
+        self._print_throughput(number_of_queries, time.perf_counter() - start)
+        # inference queries CREATE and DELETE, so running one twice changes the graph:
+        # they each get their own transaction and are not retried, and once they
+        # have all run they are checkpointed as one, after the upload's queries
+        inference_phase = (len(self.queries), tuple(self.inference_queries))
+        if checkpoint is not None and checkpoint.is_completed(*inference_phase):
+            print("Skipping inference queries already run")
+        else:
+            print("Running inference queries")
+            neo4j_connection.run_write_queries(
+                [(query, None) for query in self.inference_queries],
+                transaction_size=1,
+                retry=False,
+            )
+            if checkpoint is not None:
+                checkpoint.mark_completed([inference_phase])
         neo4j_connection.close()
+        neo4j_connection.metrics.print_summary()
+        if self.metrics_file_name is not None:
+            neo4j_connection.metrics.save(self.metrics_file_name)
+        if checkpoint is not None:
+            checkpoint.clear()
+        if self.manifest is not None:
+            self._save_manifest()
         print("Upload complete")
 
+    def get_node_keys(self) -> list:
+        """Returns the (type label, key) of each node type in the tables."""
+        node_keys = []
+        for table in self.tables:
+            for column in table.columns.values():
+                node_key = (column.type_label, column.name)
+                if column.primary_key and node_key not in node_keys:
+                    node_keys.append(node_key)
+        return node_keys
+
+    def create_constraints(self, neo4j_connection, unique: bool = True):
+        """Creates a uniqueness constraint on each node key,
+        or, if unique is False, an index."""
+        print("Creating key constraints")
+        for type_label, key in self.get_node_keys():
+            if not unique or self._is_shared_key(type_label, key):
+                neo4j_connection.run_query(
+                    self._get_create_index_query(type_label, key)
+                )
+                continue
+            try:
+                neo4j_connection.run_query(
+                    self._get_create_constraint_query(type_label, key)
+                )
+            except neo4j.exceptions.Neo4jError as e:
+                print(str(e))
+                print(f"Creating an index on {type_label}.{key} instead")
+                neo4j_connection.run_query(
+                    self._get_create_index_query(type_label, key)
+                )
+
+    def translate_and_export(
+        self,
+        stop_if_validation_fails: bool = True,
+        output_spreadsheet_name: str = None,
+        import_directory_name: str = "bulk_import",
+    ):
+        self.validate_tables(stop_if_validation_fails)
+        if output_spreadsheet_name is not None:
+            self.save_to_spreadsheet(output_spreadsheet_name)
+        print("Translating tables into csv files for neo4j-admin import")
+        translator = BulkImportTranslator(import_directory_name)
+        file_names = translator.translate_tables(*self.tables)
+        post_import_file_name = os.path.join(
+            import_directory_name, "post_import.cypher"
+        )
+        with open(post_import_file_name, "w") as f:
+            for query in [
+                (
+                    self._get_create_index_query(type_label, key)
+                    if self._is_shared_key(type_label, key)
+                    else self._get_create_constraint_query(type_label, key)
+                )
+                for type_label, key in self.get_node_keys()
+            ] + self.inference_queries:
+                f.write(query.strip() + ";\n")
+        print("Stop the database and import the files with:")
+        print(translator.get_import_command(file_names))
+        print("Then start the database and run:")
+        print(f"cypher-shell -f {post_import_file_name}")
+
+    def _print_throughput(self, number_of_queries: int, seconds: float):
+        queries_per_second = number_of_queries / seconds if seconds > 0 else 0
+        print(
+            f"Ran {number_of_queries} queries in {seconds:.1f}s "
+            + f"({queries_per_second:.1f} statements/s)"
+        )
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_file_name):
+            print(
+                f"No manifest found at {self.manifest_file_name}, uploading everything"
+            )
+            return None
+        with open(self.manifest_file_name, "r") as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        with open(self.manifest_file_name, "w") as f:
+            json.dump(self.manifest, f)
+
+    def _get_create_constraint_query(self, type_label: str, key: str) -> str:
+        name = self._get_constraint_name(type_label, key)
+        return (
+            f"CREATE CONSTRAINT {name}_unique IF NOT EXISTS "
+            + f"FOR (node:{type_label}) REQUIRE node.{key} IS UNIQUE"
+        )
+
+    def _get_create_index_query(self, type_label: str, key: str) -> str:
+        name = self._get_constraint_name(type_label, key)
+        return (
+            f"CREATE INDEX {name}_index IF NOT EXISTS "
+            + f"FOR (node:{type_label}) ON (node.{key})"
+        )
+
+    def _is_shared_key(self, type_label: str, key: str) -> bool:
+        """Whether a table with a different key for type_label nodes
+        also gives them key as a property."""
+        for table in self.tables:
+            columns = table.columns.values()
+            if (
+                key in table.columns
+                and not table.columns[key].primary_key
+                and any(
+                    column.primary_key
+                    and column.type_label == type_label
+                    and column.name != key
+                    for column in columns
+                )
+            ):
+                return True
+        return False
+
+    def _get_constraint_name(self, type_label: str, key: str) -> str:
+        return re.sub(r"\W", "_", f"{type_label}_{key}").lower()
+
     def _initialize_cypher_translator(self):
         return CypherTranslator(self.query_file_name)
 
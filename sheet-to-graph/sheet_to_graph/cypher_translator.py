@@ -1,3 +1,4 @@
+import hashlib
 import json
 
 
@@ -5,9 +6,19 @@ class CypherTranslator:
     """This class translates objects of the class sheet_to_graph.Table into Cypher queries.
     Use the method transalte_tables to carry out the translation.
     The cypher queries will be stored in self.output_file_name
+
+    Use the method translate_tables_in_batches instead for fewer, parameterised
+    queries: nodes are deduplicated by label and key, and rows are grouped into
+    UNWIND $rows AS row MERGE ... queries of up to batch_size rows each.
+    The queries are returned as an iterator of (query, parameters) tuples
+    and are also saved in self.output_file_name, one json object per line,
+    unless it is None.
+
+    Use the method translate_tables_as_diff to translate only what has changed
+    since a previous translation, given the manifest that translation returned.
     """
 
-    def __init__(self, output_file_name):
+    def __init__(self, output_file_name=None):
         self.output_file_name = output_file_name
 
     def translate_tables(self, *tables) -> list:
@@ -19,6 +30,355 @@ class CypherTranslator:
         with open(self.output_file_name, "r") as output_file:
             return output_file.readlines()
 
+    @staticmethod
+    def get_batch_kind(query: str) -> str:
+        """Returns "nodes" for the batched queries that merge nodes,
+        "relationships" for the batched queries that merge relationships,
+        and None for any other query."""
+        if not query.startswith("UNWIND $rows AS row"):
+            return None
+        if query.startswith("UNWIND $rows AS row MERGE (node:"):
+            return "nodes"
+        if " MERGE (from)-[" in query:
+            return "relationships"
+        return None
+
+    def translate_tables_in_batches(self, *tables, batch_size: int = 1000):
+        if self.output_file_name is None:
+            yield from self._generate_batches(tables, batch_size)
+            return
+        with open(self.output_file_name, "w") as output_file:
+            for query, parameters in self._generate_batches(tables, batch_size):
+                output_file.write(
+                    json.dumps({"query": query, "parameters": parameters}) + "\n"
+                )
+                yield query, parameters
+
+    def translate_tables_as_diff(
+        self, *tables, manifest: dict = None, batch_size: int = 1000
+    ) -> tuple:
+        """Compares the tables with the manifest of a previous translation
+        and returns (queries, new manifest), where queries are the batched
+        (query, parameters) tuples that bring a graph uploaded from the previous
+        translation up to date: relationships and nodes that are gone are deleted,
+        new and changed nodes are merged, labels and properties they no longer
+        have are removed, and new relationships are merged.
+
+        The manifest holds a content hash of every node and relationship,
+        with the key, labels and property names needed to delete or update it.
+        With no manifest, every node and relationship is new.
+
+        Only what this translator wrote is tracked, so the queries only bring the
+        graph up to date if nothing else has changed it since: nodes and
+        relationships created or deleted by other queries are left as they are."""
+        if manifest is None:
+            manifest = {"nodes": {}, "relationships": {}}
+        plans = [self._compile_translation_plan(table) for table in tables]
+        nodes = self._collect_nodes(tables, plans)
+        relationship_types = self._collect_relationships(tables, plans)
+        new_manifest = self._get_manifest(nodes, relationship_types)
+
+        deleted_relationships = [
+            manifest["relationships"][relationship_hash]
+            for relationship_hash in manifest["relationships"]
+            if relationship_hash not in new_manifest["relationships"]
+        ]
+        added_relationships = {}
+        for relationship_hash, (
+            *relationship_type,
+            relationship,
+        ) in new_manifest["relationships"].items():
+            if relationship_hash not in manifest["relationships"]:
+                added_relationships.setdefault(tuple(relationship_type), []).append(
+                    relationship
+                )
+        deleted_nodes = [
+            json.loads(node_id)
+            for node_id in manifest["nodes"]
+            if node_id not in new_manifest["nodes"]
+        ]
+        changed_nodes = {}
+        removed_labels_and_properties = {}
+        for node_key, node in nodes.items():
+            node_id = self._get_node_id(node_key)
+            old_node = manifest["nodes"].get(node_id)
+            new_node = new_manifest["nodes"][node_id]
+            if old_node is not None and old_node["hash"] == new_node["hash"]:
+                continue
+            changed_nodes[node_key] = node
+            if old_node is None:
+                continue
+            removed_labels = tuple(
+                label
+                for label in old_node["type_labels"]
+                if label not in new_node["type_labels"]
+            )
+            removed_properties = tuple(
+                name
+                for name in old_node["property_names"]
+                if name not in new_node["property_names"]
+            )
+            if len(removed_labels) > 0 or len(removed_properties) > 0:
+                removed_labels_and_properties[node_key] = (
+                    removed_labels,
+                    removed_properties,
+                )
+
+        queries = (
+            list(
+                self._generate_relationship_deletion_batches(
+                    deleted_relationships, batch_size
+                )
+            )
+            + list(self._generate_node_deletion_batches(deleted_nodes, batch_size))
+            + list(self._generate_node_batches(changed_nodes, batch_size))
+            + list(
+                self._generate_node_removal_batches(
+                    removed_labels_and_properties, batch_size
+                )
+            )
+            + list(self._generate_relationship_batches(added_relationships, batch_size))
+        )
+        return queries, new_manifest
+
+    def _get_manifest(self, nodes: dict, relationship_types: dict) -> dict:
+        manifest = {"nodes": {}, "relationships": {}}
+        for node_key, node in nodes.items():
+            manifest["nodes"][self._get_node_id(node_key)] = {
+                "hash": self._hash(node),
+                "type_labels": node["type_labels"],
+                "property_names": list(node["properties"]),
+            }
+        for relationship_type, relationships in relationship_types.items():
+            for relationship in relationships:
+                description = list(relationship_type) + [relationship]
+                manifest["relationships"][self._hash(description)] = description
+        return manifest
+
+    def _get_node_id(self, node_key: tuple) -> str:
+        return json.dumps(list(node_key), default=str)
+
+    def _hash(self, content) -> str:
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _generate_relationship_deletion_batches(self, relationships, batch_size):
+        groups = {}
+        for *relationship_type, relationship in relationships:
+            groups.setdefault(tuple(relationship_type), []).append(relationship)
+        for (from_type, from_key, to_type, to_key, type_label), rows in groups.items():
+            query = (
+                "UNWIND $rows AS row"
+                + f" MATCH (from:{from_type} {{{from_key}: row.from}})"
+                + f"-[relationship:{type_label}]->"
+                + f"(to:{to_type} {{{to_key}: row.to}})"
+                + " WHERE properties(relationship) = row.properties"
+                + " DELETE relationship"
+            )
+            yield from self._batch_rows(query, rows, batch_size)
+
+    def _generate_node_deletion_batches(self, node_keys, batch_size):
+        groups = {}
+        for type_label, key, key_value in node_keys:
+            groups.setdefault((type_label, key), []).append({"key": key_value})
+        for (type_label, key), rows in groups.items():
+            query = (
+                "UNWIND $rows AS row"
+                + f" MATCH (node:{type_label} {{{key}: row.key}})"
+                + " DETACH DELETE node"
+            )
+            yield from self._batch_rows(query, rows, batch_size)
+
+    def _generate_node_removal_batches(self, removed_labels_and_properties, batch_size):
+        groups = {}
+        for (type_label, key, key_value), (
+            removed_labels,
+            removed_properties,
+        ) in removed_labels_and_properties.items():
+            groups.setdefault(
+                (type_label, key, removed_labels, removed_properties), []
+            ).append({"key": key_value})
+        for (
+            type_label,
+            key,
+            removed_labels,
+            removed_properties,
+        ), rows in groups.items():
+            query = (
+                "UNWIND $rows AS row"
+                + f" MATCH (node:{type_label} {{{key}: row.key}})"
+                + "".join(f" REMOVE node:{label}" for label in removed_labels)
+                + "".join(f" REMOVE node.{name}" for name in removed_properties)
+            )
+            yield from self._batch_rows(query, rows, batch_size)
+
+    def _generate_batches(self, tables, batch_size):
+        plans = [self._compile_translation_plan(table) for table in tables]
+        yield from self._generate_node_batches(
+            self._collect_nodes(tables, plans), batch_size
+        )
+        yield from self._generate_relationship_batches(
+            self._collect_relationships(tables, plans), batch_size
+        )
+
+    def _compile_translation_plan(self, table) -> dict:
+        """Works out once per table which columns make up each node and relationship,
+        so that rows can be translated without checking every column."""
+        columns = [column for column in table.columns.values() if not column.ignore]
+        nodes = [
+            {
+                "key": column.name,
+                "type_label": column.type_label,
+                "type_label_columns": [
+                    c.name for c in columns if c.type_label_of == column.name
+                ],
+                "property_columns": [
+                    c.name for c in columns if c.property_of == column.name
+                ],
+            }
+            for column in table.columns.values()
+            if column.primary_key
+        ]
+        relationships = []
+        for column in table.columns.values():
+            if column.relation_from is not None:
+                from_column = table.columns[column.relation_from]
+                to_column = column.reference_column
+                from_value_column, to_value_column = column.relation_from, column.name
+            elif column.relation_to is not None:
+                from_column = column.reference_column
+                to_column = table.columns[column.relation_to]
+                from_value_column, to_value_column = column.name, column.relation_to
+            else:
+                continue
+            relationships.append(
+                {
+                    "type_label": column.type_label,
+                    "from_type": from_column.type_label,
+                    "from_key": from_column.name,
+                    "from_value_column": from_value_column,
+                    "to_type": to_column.type_label,
+                    "to_key": to_column.name,
+                    "to_value_column": to_value_column,
+                    "property_columns": [
+                        c.name for c in columns if c.property_of == column.name
+                    ],
+                }
+            )
+        return {"nodes": nodes, "relationships": relationships}
+
+    def _generate_node_batches(self, nodes, batch_size):
+        # nodes with the same labels and key share a query
+        groups = {}
+        for (type_label, key, key_value), node in nodes.items():
+            groups.setdefault((type_label, key, tuple(node["type_labels"])), []).append(
+                {"key": key_value, "properties": node["properties"]}
+            )
+        for (type_label, key, extra_type_labels), rows in groups.items():
+            query = (
+                "UNWIND $rows AS row"
+                + f" MERGE (node:{type_label} {{{key}: row.key}})"
+                + "".join(f" SET node:{label}" for label in extra_type_labels)
+                + " SET node += row.properties"
+            )
+            yield from self._batch_rows(query, rows, batch_size)
+
+    def _generate_relationship_batches(self, relationship_types, batch_size):
+        # relationships with the same endpoints, type and property names share a query
+        groups = {}
+        for relationship_type, relationships in relationship_types.items():
+            for relationship in relationships:
+                groups.setdefault(
+                    relationship_type + (tuple(relationship["properties"]),), []
+                ).append(relationship)
+        for (
+            from_type,
+            from_key,
+            to_type,
+            to_key,
+            type_label,
+            property_names,
+        ), rows in groups.items():
+            property_assignments = ", ".join(
+                f"{name}: row.properties.{name}" for name in property_names
+            )
+            query = (
+                "UNWIND $rows AS row"
+                + f" MATCH (from:{from_type} {{{from_key}: row.from}})"
+                + f" MATCH (to:{to_type} {{{to_key}: row.to}})"
+                + f" MERGE (from)-[:{type_label} {{{property_assignments}}}]->(to)"
+            )
+            yield from self._batch_rows(query, rows, batch_size)
+
+    def _collect_nodes(self, tables, plans) -> dict:
+        """Returns the nodes in the tables, deduplicated by label and key, as
+        {(type_label, key, key_value): {"type_labels": [...], "properties": {}}}.
+        The extra type labels and properties of a node are gathered from every
+        row it appears in."""
+        nodes = {}
+        for table, plan in zip(tables, plans):
+            for row in table:
+                for node_plan in plan["nodes"]:
+                    key_value = row[node_plan["key"]]
+                    if key_value is None or key_value == "":
+                        continue
+                    node = nodes.setdefault(
+                        (node_plan["type_label"], node_plan["key"], key_value),
+                        {"type_labels": [], "properties": {}},
+                    )
+                    for column_name in node_plan["type_label_columns"]:
+                        type_label = row[column_name]
+                        if type_label and type_label not in node["type_labels"]:
+                            node["type_labels"].append(type_label)
+                    for column_name in node_plan["property_columns"]:
+                        if row[column_name] is not None:
+                            node["properties"][column_name] = row[column_name]
+        return nodes
+
+    def _collect_relationships(self, tables, plans) -> dict:
+        """Returns the distinct relationships in the tables, as
+        {(from_type, from_key, to_type, to_key, type_label): [relationship, ...]}
+        where each relationship is {"from": ..., "to": ..., "properties": {}}."""
+        groups = {}
+        for table, plan in zip(tables, plans):
+            for row in table:
+                for relationship_plan in plan["relationships"]:
+                    from_value = row[relationship_plan["from_value_column"]]
+                    to_value = row[relationship_plan["to_value_column"]]
+                    if from_value in ("", None) or to_value in ("", None):
+                        continue
+                    # values are matched and saved as strings, as in translate_tables
+                    properties = {
+                        column_name: str(row[column_name])
+                        for column_name in relationship_plan["property_columns"]
+                        if row[column_name] is not None
+                    }
+                    group = groups.setdefault(
+                        (
+                            relationship_plan["from_type"],
+                            relationship_plan["from_key"],
+                            relationship_plan["to_type"],
+                            relationship_plan["to_key"],
+                            relationship_plan["type_label"],
+                        ),
+                        {},
+                    )
+                    relationship = {
+                        "from": str(from_value),
+                        "to": str(to_value),
+                        "properties": properties,
+                    }
+                    group[json.dumps(relationship, sort_keys=True)] = relationship
+        return {
+            relationship_type: list(relationships.values())
+            for relationship_type, relationships in groups.items()
+        }
+
+    def _batch_rows(self, query, rows, batch_size):
+        for start in range(0, len(rows), batch_size):
+            yield query, {"rows": rows[start : start + batch_size]}
+
     def _generate_nodes(self, table, output_file):
         for row in table:
             nodes = self._get_nodes_from_row(table, row)
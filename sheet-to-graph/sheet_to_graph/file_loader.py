@@ -1,7 +1,14 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import json
 
-from sheet_to_graph.sheet_sources import make_sheet_source
+from sheet_to_graph.sheet_sources import (
+    CachedSheetSource,
+    ExcelSheetSource,
+    GoogleSheetSource,
+    make_sheet_source,
+)
 
 
 class FileLoader:
@@ -9,23 +16,139 @@ class FileLoader:
     Initialize with the classmethod from_config_file.
     Use the method get_sheet_as_list_of_lists to load data from the specified sheet_name.
     The sheet_name must match with a sheet pointed to in the config file.
+
+    Each sheet is fetched from its source once per FileLoader and cached,
+    keyed by backend, file (or spreadsheet id) and sheet name.
+    Cached rows are returned as tuples of tuples so they can be shared safely
+    between callers. Use invalidate to force a sheet to be fetched again.
+    Use prefetch to load every sheet a run needs concurrently before it is used.
+
+    If the config sets sheet_cache_directory, sheets are also cached on disk between
+    runs and only re-read when their file (or Google spreadsheet revision) changes.
+    Google spreadsheet revisions are only checked if a drive_service is supplied.
     """
 
-    def __init__(self, values, google_service=None):
+    def __init__(self, values, google_service=None, drive_service=None):
         self.values = values
         self.google_service = google_service
+        self.drive_service = drive_service
+        self._sheet_cache = {}
 
     @classmethod
-    def from_config_file(cls, filename: str, google_service=None):
+    def from_config_file(cls, filename: str, google_service=None, drive_service=None):
         with open(filename, "r", encoding="utf-8") as f:
             values = json.load(f)
-        return cls(values, google_service=google_service)
+        return cls(values, google_service=google_service, drive_service=drive_service)
 
     def get_sheet_as_list_of_lists(self, sheet_name: str):
+        sheet_config = self._get_sheet_config(sheet_name)
+        cache_key = self._cache_key(sheet_config)
+        try:
+            return self._sheet_cache[cache_key]
+        except KeyError:
+            pass
+        rows = self._fetch_rows(sheet_config)
+        self._sheet_cache[cache_key] = rows
+        ExcelSheetSource.close_workbooks()
+        return rows
+
+    def prefetch(self, sheet_names: list = None, max_workers: int = 8):
+        """Loads sheet_names (by default every sheet in the config) into the cache
+        concurrently on a thread pool.
+        Sheets that share a Google spreadsheet are fetched with one batchGet request.
+        Google requests are made from a single worker because the API client
+        is not thread-safe.
+        The xlsx workbooks the sheets were read from are closed once they are loaded.
+        """
+        sheet_names = self.values["sheets"] if sheet_names is None else sheet_names
+        sheet_configs = {}
+        for sheet_name in sheet_names:
+            sheet_config = self._get_sheet_config(sheet_name)
+            cache_key = self._cache_key(sheet_config)
+            if cache_key not in self._sheet_cache:
+                sheet_configs[cache_key] = sheet_config
+
+        google_sheets = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for cache_key, sheet_config in sheet_configs.items():
+                if sheet_config.get("backend", "csv") == "google":
+                    google_sheets[sheet_config["spreadsheet_id"]].append(sheet_config)
+                else:
+                    future = executor.submit(self._fetch_rows, sheet_config)
+                    futures[future] = cache_key
+            if len(google_sheets) > 0:
+                google_future = executor.submit(self._fetch_google_rows, google_sheets)
+            for future, cache_key in futures.items():
+                self._sheet_cache[cache_key] = future.result()
+            if len(google_sheets) > 0:
+                self._sheet_cache |= google_future.result()
+        ExcelSheetSource.close_workbooks()
+
+    def invalidate(self, sheet_name: str = None):
+        """Removes sheet_name from the cache, or every sheet if sheet_name is None."""
+        if sheet_name is None:
+            self._sheet_cache.clear()
+            return
+        sheet_config = self._get_sheet_config(sheet_name)
+        self._sheet_cache.pop(self._cache_key(sheet_config), None)
+
+    def _make_sheet_source(self, sheet_config: dict):
+        return make_sheet_source(
+            sheet_config,
+            google_service=self.google_service,
+            drive_service=self.drive_service,
+        )
+
+    def _fetch_rows(self, sheet_config: dict) -> tuple:
+        source = self._make_sheet_source(sheet_config)
+        return tuple(tuple(row) for row in source.get_rows())
+
+    def _fetch_google_rows(self, google_sheets: dict) -> dict:
+        fetched = {}
+        for spreadsheet_id, sheet_configs in google_sheets.items():
+            sources = {
+                sheet_config["sheet"]: self._make_sheet_source(sheet_config)
+                for sheet_config in sheet_configs
+            }
+            rows_by_sheet = {}
+            for sheet_name, source in sources.items():
+                if isinstance(source, CachedSheetSource):
+                    rows = source.load()
+                    if rows is not None:
+                        rows_by_sheet[sheet_name] = rows
+            sheets_to_fetch = [
+                sheet_name for sheet_name in sources if sheet_name not in rows_by_sheet
+            ]
+            if len(sheets_to_fetch) > 0:
+                fetched_rows = GoogleSheetSource.batch_get_rows(
+                    self.google_service, spreadsheet_id, sheets_to_fetch
+                )
+                for sheet_name, rows in fetched_rows.items():
+                    if isinstance(sources[sheet_name], CachedSheetSource):
+                        sources[sheet_name].store(rows)
+                rows_by_sheet |= fetched_rows
+            for sheet_name, rows in rows_by_sheet.items():
+                cache_key = ("google", spreadsheet_id, sheet_name)
+                fetched[cache_key] = tuple(tuple(row) for row in rows)
+        return fetched
+
+    def _get_sheet_config(self, sheet_name: str) -> dict:
         sheet_config = copy.deepcopy(self.values["sheets"][sheet_name])
 
         if sheet_config.get("file", "") == "":
             sheet_config["file"] = self.values["dispersal_sheet_anon"]
 
-        source = make_sheet_source(sheet_config, google_service=self.google_service)
-        return source.get_rows()
+        if self.values.get("sheet_cache_directory", "") != "":
+            sheet_config["cache_directory"] = self.values["sheet_cache_directory"]
+
+        return sheet_config
+
+    def _cache_key(self, sheet_config: dict) -> tuple:
+        backend = sheet_config.get("backend", "csv")
+        location = (
+            sheet_config["spreadsheet_id"]
+            if backend == "google"
+            else sheet_config["file"]
+        )
+        return (backend, location, sheet_config.get("sheet", ""))
@@ -79,6 +79,23 @@ def get_place_id(table, row_index):
     return f"place{row_index}"
 
 
+def get_geo_info(
+    postcode_to_lat_long,
+    table,
+    row_index,
+    postcode_column,
+    town_city_column,
+    county_column,
+    country_column,
+):
+    return postcode_to_lat_long.get_geo_info(
+        postcode=table[row_index][postcode_column],
+        town_city=table[row_index][town_city_column],
+        county=table[row_index][county_column],
+        country=table[row_index][country_column],
+    )
+
+
 def get_longitude(
     postcode_to_lat_long,
     table,
@@ -0,0 +1,144 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+
+
+class GeoLookupStore:
+    """A persistent store for the geographic lookups built by PostcodeToLatLong
+    (postcode, city_country, town_county).
+
+    Entries are kept in a SQLite database in WAL mode, so new entries are appended
+    in batched transactions instead of rewriting a whole file, a crash cannot
+    corrupt entries that have already been committed, and other processes can
+    read the store while it is being written to.
+    Entries are committed once batch_size are pending, or when commit is called.
+
+    When the store is first opened, entries from any old {lookup_name}_lookup.json
+    files in json_directory are imported into it.
+    """
+
+    def __init__(
+        self,
+        file_name: str = "geo_lookups.sqlite",
+        batch_size: int = 100,
+        json_directory: str = ".",
+    ):
+        self.file_name = file_name
+        self.batch_size = batch_size
+        self.json_directory = json_directory
+        self._connection = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def load(self, lookup_name: str) -> dict:
+        """Returns every entry in lookup_name as a dict of key -> geo_info."""
+        with self._lock:
+            rows = (
+                self._get_connection()
+                .execute(
+                    "SELECT key, geo_info FROM lookups WHERE lookup_name = ?",
+                    (lookup_name,),
+                )
+                .fetchall()
+            )
+        return {key: json.loads(geo_info) for key, geo_info in rows}
+
+    def get_many(self, lookup_name: str, keys) -> dict:
+        """Returns the entries in lookup_name for keys that are in the store."""
+        keys = list(set(keys))
+        found = {}
+        with self._lock:
+            connection = self._get_connection()
+            # stay well below SQLite's limit on the number of query parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = connection.execute(
+                    "SELECT key, geo_info FROM lookups "
+                    + f"WHERE lookup_name = ? AND key IN ({placeholders})",
+                    [lookup_name] + chunk,
+                ).fetchall()
+                found |= {key: json.loads(geo_info) for key, geo_info in rows}
+        return found
+
+    def put(self, lookup_name: str, key: str, geo_info: dict):
+        self.put_many(lookup_name, {key: geo_info})
+
+    def put_many(self, lookup_name: str, entries: dict):
+        """Adds or replaces entries (a dict of key -> geo_info) in lookup_name."""
+        with self._lock:
+            connection = self._get_connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?)",
+                [
+                    (lookup_name, key, json.dumps(geo_info))
+                    for key, geo_info in entries.items()
+                ],
+            )
+            self._pending += len(entries)
+            if self._pending >= self.batch_size:
+                self._commit(connection)
+
+    def commit(self):
+        with self._lock:
+            if self._connection is not None:
+                self._commit(self._connection)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._commit(self._connection)
+                self._connection.close()
+                self._connection = None
+
+    def _commit(self, connection):
+        connection.commit()
+        self._pending = 0
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.file_name, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS lookups ("
+                + "lookup_name TEXT, key TEXT, geo_info TEXT, "
+                + "PRIMARY KEY (lookup_name, key))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS imported_json_lookups ("
+                + "lookup_name TEXT PRIMARY KEY)"
+            )
+            self._connection.commit()
+            for json_file_name in glob.glob(
+                os.path.join(self.json_directory, "*_lookup.json")
+            ):
+                self._import_json_lookup(self._connection, json_file_name)
+        return self._connection
+
+    def _import_json_lookup(self, connection, json_file_name: str):
+        lookup_name = os.path.basename(json_file_name)[: -len("_lookup.json")]
+        already_imported = connection.execute(
+            "SELECT 1 FROM imported_json_lookups WHERE lookup_name = ?",
+            (lookup_name,),
+        ).fetchone()
+        if already_imported is not None:
+            return
+        try:
+            with open(json_file_name, "r") as f:
+                entries = json.load(f)
+        except json.decoder.JSONDecodeError:
+            entries = {}
+        # entries already in the store are newer than those in the json file
+        connection.executemany(
+            "INSERT OR IGNORE INTO lookups VALUES (?, ?, ?)",
+            [
+                (lookup_name, key, json.dumps(geo_info))
+                for key, geo_info in entries.items()
+            ],
+        )
+        connection.execute(
+            "INSERT INTO imported_json_lookups VALUES (?)", (lookup_name,)
+        )
+        self._commit(connection)
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+class HttpResponseCache:
+    """A persistent cache of HTTP response bodies, stored in a SQLite database.
+
+    Responses are keyed by their normalised request (see make_key), so the same
+    request made with its parameters in a different order is served from the cache.
+    Responses younger than ttl seconds are fresh and can be used without a request.
+    Stale responses are kept so that they can be revalidated with their
+    ETag (If-None-Match) or Last-Modified (If-Modified-Since) header.
+    Once the bodies stored take up more than max_size_bytes,
+    the least recently used responses are evicted.
+    Reading a response does not write to the database: the time it was used
+    is saved with the next put, refresh or close.
+    """
+
+    def __init__(
+        self,
+        file_name: str = "http_cache.sqlite",
+        ttl: float = 7 * 24 * 60 * 60,
+        max_size_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.file_name = file_name
+        self.ttl = ttl
+        self.max_size_bytes = max_size_bytes
+        self._connection = None
+        self._lock = threading.Lock()
+        # the total size of the bodies stored, counted when the database is opened
+        self._total_size = 0
+        # used_at = {key: time}, for responses read since the last write
+        self._used_at = {}
+
+    @staticmethod
+    def make_key(url: str, params: dict = None) -> str:
+        """Normalises a GET request to url with params: the scheme and host are
+        lower-cased and the query parameters (from both url and params) are sorted."""
+        scheme, netloc, path, query, _ = urlsplit(url)
+        query_params = parse_qsl(query, keep_blank_values=True)
+        query_params += [(str(k), str(v)) for k, v in (params or {}).items()]
+        return urlunsplit(
+            (
+                scheme.lower(),
+                netloc.lower(),
+                path,
+                urlencode(sorted(query_params)),
+                "",
+            )
+        )
+
+    def get(self, key: str) -> dict:
+        """Returns the cached response for key as a dict of
+        body, etag, last_modified and fresh, or None if nothing is cached."""
+        with self._lock:
+            connection = self._get_connection()
+            row = connection.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses "
+                + "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._used_at[key] = time.time()
+        body, etag, last_modified, fetched_at = row
+        return {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - fetched_at < self.ttl,
+        }
+
+    def put(self, key: str, body: bytes, etag: str = None, last_modified: str = None):
+        now = time.time()
+        with self._lock:
+            connection = self._get_connection()
+            self._save_used_at(connection)
+            row = connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, len(body), etag, last_modified, now, now),
+            )
+            self._total_size += len(body) - (0 if row is None else row[0])
+            self._evict(connection)
+            connection.commit()
+
+    def refresh(self, key: str):
+        """Marks the response for key as fresh again, after it has been revalidated."""
+        now = time.time()
+        with self._lock:
+            connection = self._get_connection()
+            self._save_used_at(connection)
+            connection.execute(
+                "UPDATE responses SET fetched_at = ?, used_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._save_used_at(self._connection)
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
+
+    def _save_used_at(self, connection):
+        # written in the transaction of the caller, and committed with it
+        connection.executemany(
+            "UPDATE responses SET used_at = ? WHERE key = ?",
+            [(used_at, key) for key, used_at in self._used_at.items()],
+        )
+        self._used_at = {}
+
+    def _evict(self, connection):
+        if self._total_size <= self.max_size_bytes:
+            return
+        evicted_keys = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM responses ORDER BY used_at"
+        ):
+            if self._total_size <= self.max_size_bytes:
+                break
+            evicted_keys.append((key,))
+            self._total_size -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.file_name, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                + "key TEXT PRIMARY KEY, body BLOB, size INTEGER, "
+                + "etag TEXT, last_modified TEXT, fetched_at REAL, used_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)"
+            )
+            self._connection.commit()
+            self._total_size = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+        return self._connection
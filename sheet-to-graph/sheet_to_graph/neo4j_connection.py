@@ -1,18 +1,40 @@
 from collections import defaultdict, Counter
 import csv
+from itertools import islice
+import threading
+import time
+
 import neo4j
 
 from .queries import Queries
+from .query_metrics import QueryMetrics
 
 
 class Neo4jConnection:
-    """Manages a connection with a neo4j database."""
+    """Manages a connection with a neo4j database.
+
+    Queries that fail with an error the driver reports as retryable (such as a
+    dropped connection or a deadlock) are retried up to max_retries times,
+    reconnecting and waiting backoff_factor * 2 ** attempt seconds before each retry.
+    The connection is shared by every thread using it, so when several of them
+    lose it at once, it is only reconnected once.
+
+    The latency, rows and server timings of every query run are recorded in
+    metrics (a QueryMetrics), grouped by statement template.
+    Use profile_query to run a query with PROFILE and get its plan.
+    """
 
-    def __init__(self, credentials: dict):
+    def __init__(
+        self, credentials: dict, max_retries: int = 5, backoff_factor: float = 1
+    ):
         self.uri = credentials["uri"]
         self.user = credentials["user"]
         self.password = credentials["password"]
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
         self.driver = None
+        self.metrics = QueryMetrics()
+        self._reconnect_lock = threading.Lock()
 
     def open(self):
         self.driver = neo4j.GraphDatabase.driver(
@@ -26,16 +48,167 @@ class Neo4jConnection:
         self.run_query(Queries.delete_everything)
 
     def run_query(self, query: str, arguments: dict = None):
-        def _run_query(query, arguments):
-            arguments = {} if arguments is None else arguments
-            with self.driver.session() as session:
-                return [record.data() for record in session.run(query, **arguments)]
+        return list(self.stream_query(query, arguments))
 
+    def stream_query(
+        self,
+        query: str,
+        arguments: dict = None,
+        fetch_size: int = 1000,
+        on_profile: callable = None,
+    ):
+        """Yields the records of a query, as dicts, as they arrive from the database,
+        which sends them fetch_size records at a time, so the whole result
+        is never held in memory.
+        A query that fails is retried as long as none of its records have been
+        yielded yet.
+        If on_profile is given, the query is run with PROFILE, and once its records
+        have all been read on_profile is called with its profile
+        (see profile_query)."""
+        arguments = {} if arguments is None else arguments
+        if on_profile is not None:
+            query = f"PROFILE {query}"
+        if self.driver is None:
+            self.open()
+        for attempt in range(self.max_retries + 1):
+            number_of_records = 0
+            start = time.perf_counter()
+            driver = self.driver
+            try:
+                with driver.session(fetch_size=fetch_size) as session:
+                    result = session.run(query, **arguments)
+                    for record in result:
+                        number_of_records += 1
+                        yield record.data()
+                    summary = result.consume()
+                break
+            except (neo4j.exceptions.DriverError, neo4j.exceptions.Neo4jError) as e:
+                if (
+                    attempt == self.max_retries
+                    or number_of_records > 0
+                    or not e.is_retryable()
+                ):
+                    raise
+                self._wait_to_retry(e, attempt, driver)
+        # the latency includes the time taken by the caller to process the records
+        self.metrics.record(
+            query,
+            time.perf_counter() - start,
+            number_of_records,
+            summary.result_available_after,
+            summary.result_consumed_after,
+        )
+        if on_profile is not None:
+            on_profile(
+                {
+                    "server": summary.server.agent,
+                    "db_hits": self._count_db_hits(summary.profile),
+                    "result_available_after_ms": summary.result_available_after,
+                    "result_consumed_after_ms": summary.result_consumed_after,
+                    "plan": summary.profile,
+                }
+            )
+
+    def profile_query(self, query: str, arguments: dict = None) -> tuple:
+        """Runs a query with PROFILE and returns its records and a profile:
+        a dict of the plan (each operator with its rows, dbHits and children),
+        the total db_hits of its operators, and the server version."""
+        profiles = []
+        records = list(self.stream_query(query, arguments, on_profile=profiles.append))
+        return records, profiles[0]
+
+    def run_write_queries(
+        self,
+        queries,
+        transaction_size: int = 1000,
+        on_commit: callable = None,
+        retry: bool = True,
+    ) -> int:
+        """Runs an iterable of (query, parameters) tuples in a single session,
+        grouped into explicit transactions of up to transaction_size queries.
+        The results are not read, so only use this for queries that write.
+        A transaction that fails is retried, in a new session, as run_query is,
+        unless retry is False. A transaction can fail after it has been committed,
+        so only retry queries that are safe to run twice (such as MERGE).
+        If given, on_commit is called with the list of queries in each transaction
+        once it has been committed.
+        Returns the number of queries run."""
+        if self.driver is None:
+            self.open()
+        queries = iter(queries)
+        number_of_queries = 0
+        driver = None
+        session = None
         try:
-            return _run_query(query, arguments)
-        except (AttributeError, neo4j.exceptions.DriverError):
+            while True:
+                transaction_queries = list(islice(queries, transaction_size))
+                if len(transaction_queries) == 0:
+                    break
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        if session is None:
+                            driver = self.driver
+                            session = driver.session()
+                        with session.begin_transaction() as transaction:
+                            for query, parameters in transaction_queries:
+                                start = time.perf_counter()
+                                summary = transaction.run(query, parameters).consume()
+                                self.metrics.record(
+                                    query,
+                                    time.perf_counter() - start,
+                                    0,
+                                    summary.result_available_after,
+                                    summary.result_consumed_after,
+                                )
+                            transaction.commit()
+                        break
+                    except (
+                        neo4j.exceptions.DriverError,
+                        neo4j.exceptions.Neo4jError,
+                    ) as e:
+                        if (
+                            not retry
+                            or attempt == self.max_retries
+                            or not e.is_retryable()
+                        ):
+                            raise
+                        if session is not None:
+                            session.close()
+                        session = None
+                        self._wait_to_retry(e, attempt, driver)
+                number_of_queries += len(transaction_queries)
+                if on_commit is not None:
+                    on_commit(transaction_queries)
+        finally:
+            if session is not None:
+                session.close()
+        return number_of_queries
+
+    def _count_db_hits(self, plan: dict) -> int:
+        if plan is None:
+            return 0
+        return plan.get("dbHits", 0) + sum(
+            self._count_db_hits(child) for child in plan.get("children", [])
+        )
+
+    def _wait_to_retry(self, error, attempt: int, driver):
+        delay = self.backoff_factor * 2**attempt
+        print(f"{error}: retrying in {delay}s")
+        time.sleep(delay)
+        if isinstance(error, neo4j.exceptions.DriverError):
+            self._reconnect(driver)
+
+    def _reconnect(self, failed_driver):
+        """Replaces failed_driver with a new one, unless another thread
+        already has."""
+        with self._reconnect_lock:
+            if self.driver is not failed_driver:
+                return
+            try:
+                failed_driver.close()
+            except Exception as e:
+                print(str(e))
             self.open()
-            return _run_query(query, arguments)
 
     def get_event_type_paths(self):
         records = self.run_query(Queries.get_all_event_paths_as_event_types)
@@ -0,0 +1,183 @@
+import csv
+import glob
+import os
+import sqlite3
+
+from .british_national_grid import wgs84_to_osgb36
+
+
+class PostcodeIndex:
+    """An indexed copy of the ONS postcode directory (ONSPD).
+
+    Build the index once with the classmethod build, which compiles the ONSPD
+    multi_csv files into a SQLite table mapping normalised postcodes to
+    lat, long, bng_x, bng_y, rgn and oslaua. After that, looking up a postcode
+    is a single primary key probe instead of a scan of the csv file for its
+    postcode area.
+    Partial postcodes can be looked up by outward code (e.g. "SW1A").
+
+    National grid references are converted from lat and long a batch at a time
+    while the index is built.
+
+    Initialize with the name of a previously built index file.
+    """
+
+    # increase when the table changes, so that old indexes are rebuilt
+    schema_version = 1
+
+    def __init__(self, index_file_name: str):
+        self.index_file_name = index_file_name
+        self._connection = None
+
+    @classmethod
+    def build(
+        cls, postcode_directory_path: str, index_file_name: str, batch_size=50000
+    ) -> "PostcodeIndex":
+        """Reads every ONSPD csv file in postcode_directory_path/Data/multi_csv
+        and writes them to a new index at index_file_name."""
+        postcode_files = sorted(
+            glob.glob(f"{postcode_directory_path}/Data/multi_csv/*.csv")
+        )
+        if len(postcode_files) == 0:
+            raise FileNotFoundError(
+                f"No ONSPD csv files found in {postcode_directory_path}/Data/multi_csv"
+            )
+        # build into a temporary file so an interrupted build never replaces
+        # a working index with a partial one
+        temporary_file_name = f"{index_file_name}.tmp"
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+        connection = sqlite3.connect(temporary_file_name)
+        connection.execute(
+            "CREATE TABLE postcodes ("
+            "postcode TEXT PRIMARY KEY, "
+            "pcds TEXT, "
+            "outward_code TEXT, "
+            "lat REAL, "
+            "long REAL, "
+            "bng_x REAL, "
+            "bng_y REAL, "
+            "rgn TEXT, "
+            "oslaua TEXT"
+            ") WITHOUT ROWID"
+        )
+        for postcode_file in postcode_files:
+            with open(postcode_file, "r") as f:
+                batch = []
+                for row in csv.DictReader(f):
+                    batch.append(
+                        (
+                            cls.normalise(row["pcds"]),
+                            row["pcds"],
+                            row["pcds"].split(" ")[0],
+                            float(row["lat"]),
+                            float(row["long"]),
+                            row["rgn"],
+                            row["oslaua"],
+                        )
+                    )
+                    if len(batch) >= batch_size:
+                        cls._insert_rows(connection, batch)
+                        batch = []
+                cls._insert_rows(connection, batch)
+        connection.execute(
+            "CREATE INDEX postcodes_outward_code ON postcodes (outward_code)"
+        )
+        connection.execute(f"PRAGMA user_version = {cls.schema_version}")
+        connection.commit()
+        connection.close()
+        os.replace(temporary_file_name, index_file_name)
+        return cls(index_file_name)
+
+    @staticmethod
+    def normalise(postcode: str) -> str:
+        """Removes all whitespace and upper-cases the postcode,
+        so that the pcd, pcd2 and pcds forms of a postcode are all equal."""
+        return "".join(postcode.split()).upper()
+
+    def lookup(self, postcode: str) -> dict:
+        """Returns the ONSPD details for postcode, or None if it is not in the index."""
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT pcds, lat, long, bng_x, bng_y, rgn, oslaua FROM postcodes "
+                + "WHERE postcode = ?",
+                (self.normalise(postcode),),
+            )
+            .fetchone()
+        )
+        return None if row is None else self._row_to_dict(row)
+
+    def lookup_outward_code(self, outward_code: str) -> list:
+        """Returns the ONSPD details for every postcode with the given outward code
+        that has coordinates."""
+        # ONSPD gives postcodes without a grid reference a latitude of 99.999999
+        rows = (
+            self._get_connection()
+            .execute(
+                "SELECT pcds, lat, long, bng_x, bng_y, rgn, oslaua FROM postcodes "
+                + "WHERE outward_code = ? AND lat <= 90",
+                (self.normalise(outward_code),),
+            )
+            .fetchall()
+        )
+        return [self._row_to_dict(row) for row in rows]
+
+    def get_grid_references(self) -> list:
+        """Returns (bng_x, bng_y, oslaua) for every postcode with coordinates."""
+        # ONSPD gives postcodes without a grid reference a latitude of 99.999999
+        return (
+            self._get_connection()
+            .execute(
+                "SELECT bng_x, bng_y, oslaua FROM postcodes "
+                + "WHERE lat <= 90 AND oslaua != ''"
+            )
+            .fetchall()
+        )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                f"file:{self.index_file_name}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < self.schema_version:
+                self.close()
+                raise ValueError(
+                    f"{self.index_file_name} was built by an older version, "
+                    + "rebuild it with build_postcode_index.py"
+                )
+        return self._connection
+
+    @staticmethod
+    def _insert_rows(connection, rows: list):
+        if len(rows) == 0:
+            return
+        # rows are (postcode, pcds, outward_code, lat, long, rgn, oslaua)
+        xs, ys = wgs84_to_osgb36([row[3] for row in rows], [row[4] for row in rows])
+        connection.executemany(
+            "INSERT OR REPLACE INTO postcodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                row[:5] + (round(float(x), 4), round(float(y), 4)) + row[5:]
+                for row, x, y in zip(rows, xs, ys)
+            ],
+        )
+
+    @staticmethod
+    def _row_to_dict(row) -> dict:
+        return {
+            "pcds": row[0],
+            "lat": row[1],
+            "long": row[2],
+            "bng_x": row[3],
+            "bng_y": row[4],
+            "rgn": row[5],
+            "oslaua": row[6],
+        }
@@ -1,8 +1,12 @@
+from collections import defaultdict
 import csv
-import json
-
-from bng_latlon import WGS84toOSGB36
+import os
 
+from .british_national_grid import wgs84_to_osgb36
+from .file_preprocessor import FilePreprocessor
+from .geo_lookup_store import GeoLookupStore
+from .postcode_index import PostcodeIndex
+from .reverse_geocoder import ReverseGeocoder
 from .wikidata_connection import WikidataConnection
 
 
@@ -10,12 +14,22 @@ class PostcodeToLatLong:
     """This class is used to define a mapping from postcodes to latitudes, longitudes,
     and other geographic information from the Office for National Statistics.
     The first time this is run, information is loaded from the ONS postcode directory.
-    Information used by the sheet is saved in self.saved_geo_info_file_name.
-    This saves time in future uploads.
+    Information used by the sheet is saved in self.geo_lookup_store.
+    This saves time in future uploads. Call commit once the tables are loaded
+    to save any entries still waiting to be written.
 
     Provide the location of where the ONS postcode directory is saved on your machine.
     Download from:
     https://geoportal.statistics.gov.uk/datasets/e14b1475ecf74b58804cf667b6740706/about
+
+    If a PostcodeIndex has been built (see build_postcode_index.py) new postcodes
+    are looked up in the index, and partial postcodes are matched by outward code.
+    Otherwise the ONSPD csv file for the postcode's area is scanned.
+
+    UK places without postcodes that are given coordinates are assigned the
+    local authority (and its region) found by local_authority_assigner, which by
+    default is a ReverseGeocoder built from the PostcodeIndex. Places without
+    coordinates, or that the assigner cannot place, are matched by LAD name.
     """
 
     regions_map = {
@@ -36,13 +50,45 @@ class PostcodeToLatLong:
     }
 
     def __init__(
-        self, postcode_directory_path: str, wikidata_connection: WikidataConnection
+        self,
+        postcode_directory_path: str,
+        wikidata_connection: WikidataConnection,
+        postcode_index_file_name: str = None,
+        geo_lookup_store: GeoLookupStore = None,
+        local_authority_assigner=None,
     ):
         self.postcode_directory_path = postcode_directory_path
         self.wikidata_connection = wikidata_connection
+        self.postcode_index_file_name = (
+            f"{postcode_directory_path}/postcode_index.sqlite"
+            if postcode_index_file_name is None
+            else postcode_index_file_name
+        )
+        self._postcode_index = None
+        self.geo_lookup_store = (
+            GeoLookupStore() if geo_lookup_store is None else geo_lookup_store
+        )
         self._saved_lookups = {}
+        self._local_authority_assigner = local_authority_assigner
         self._lads_map = None
         self._lads_to_regions_map = None
+        self._lads_by_name = None
+
+    @property
+    def postcode_index(self):
+        if self._postcode_index is None and os.path.exists(
+            self.postcode_index_file_name
+        ):
+            self._postcode_index = PostcodeIndex(self.postcode_index_file_name)
+        return self._postcode_index
+
+    @property
+    def local_authority_assigner(self):
+        if self._local_authority_assigner is None and self.postcode_index is not None:
+            self._local_authority_assigner = ReverseGeocoder.from_postcode_index(
+                self.postcode_index
+            )
+        return self._local_authority_assigner
 
     @property
     def postcode_lookup(self):
@@ -63,6 +109,10 @@ class PostcodeToLatLong:
             self._open_lookup(lookup_name)
         return self._saved_lookups[lookup_name]
 
+    def commit(self):
+        """Writes any new lookup entries that have not been saved yet."""
+        self.geo_lookup_store.commit()
+
     def get_latitude(self, postcode: str, town_city: str, county: str, country: str):
         return self._get_geo_info(postcode, town_city, county, country)["lat"]
 
@@ -77,14 +127,7 @@ class PostcodeToLatLong:
         return self._get_geo_info(postcode, town_city, county, country)["bng_y"]
 
     def get_region(self, postcode: str, town_city: str, county: str, country: str):
-        try:
-            if postcode[:2] == "IM":
-                return "Isle of Man"
-            if postcode[:2] in ("GY", "JE"):
-                return "Channel Islands"
-        except IndexError:
-            pass
-        return self._get_geo_info(postcode, town_city, county, country)["region"]
+        return self.get_geo_info(postcode, town_city, county, country)["region"]
 
     def get_local_authority_code(
         self, postcode: str, town_city: str, county: str, country: str
@@ -96,24 +139,136 @@ class PostcodeToLatLong:
     ):
         return self._get_geo_info(postcode, town_city, county, country)["lad23nm"]
 
-    def _get_geo_info(self, postcode: str, town_city: str, county: str, country: str):
+    def get_geo_info(self, postcode: str, town_city: str, county: str, country: str):
+        """Returns all of the geographic information for a location in one dict,
+        with keys lat, long, bng_x, bng_y, region, lad23cd and lad23nm."""
+        geo_info = dict(self._get_geo_info(postcode, town_city, county, country))
+        if postcode[:2] == "IM":
+            geo_info["region"] = "Isle of Man"
+        if postcode[:2] in ("GY", "JE"):
+            geo_info["region"] = "Channel Islands"
+        return geo_info
+
+    def resolve_sheets(self, sheets):
+        """Resolves the locations of the places in sheets with resolve_many.
+        sheets is a list of (rows, preprocessor, header_mapping) tuples, which are
+        preprocessed as Table.import_from_list_of_lists would, so that the places
+        resolved are the ones imported. Once mapped, each sheet should have
+        postcode, village_town_city and county columns, and may have actor_country.
+        """
+        self.resolve_many(
+            (
+                place["postcode"],
+                place["village_town_city"],
+                place["county"],
+                place.get("actor_country", ""),
+            )
+            for rows, preprocessor, header_mapping in sheets
+            for place in (
+                FilePreprocessor() if preprocessor is None else preprocessor
+            ).preprocess(rows, header_mapping=header_mapping)
+        )
+
+    def resolve_many(self, locations):
+        """Looks up every location that is not already known in one pass,
+        so that the formula columns that need them find them in the lookups.
+        locations is an iterable of (postcode, town_city, county, country) tuples.
+        Duplicate locations are looked up once, postcodes are grouped by ONSPD file
+        so that each file is read at most once, places without postcodes are looked up
+        on Wikidata concurrently, and new entries are committed together.
+        Places whose Wikidata search or entities could not be fetched are not saved,
+        so they are looked up again when they are next needed.
+        """
+        new_keys = {"postcode": set(), "city_country": set(), "town_county": set()}
+        for location in set(locations):
+            lookup_name, key = self._get_lookup_key(*location)
+            if lookup_name is not None and key not in self.get_lookup(lookup_name):
+                new_keys[lookup_name].add(key)
+        self._add_new_postcodes(new_keys["postcode"])
+        wikidata_keys = new_keys["city_country"] | new_keys["town_county"]
+        if len(wikidata_keys) > 0:
+            # search for every place, then fetch the results they use, concurrently
+            search_results, failed_keys = (
+                self.wikidata_connection.search_entities_many(wikidata_keys)
+            )
+            new_geo_info = self._get_wikidata_geo_info(
+                [
+                    (lookup_name, key)
+                    for lookup_name in ("city_country", "town_county")
+                    for key in new_keys[lookup_name] - failed_keys
+                ],
+                search_results,
+            )
+            self._set_bng(new_geo_info.values())
+            self._set_local_authorities(
+                [
+                    geo_info
+                    for (lookup_name, _), geo_info in new_geo_info.items()
+                    if lookup_name == "town_county"
+                ]
+            )
+            for (lookup_name, key), geo_info in new_geo_info.items():
+                self._update_saved_info(lookup_name, key, geo_info)
+        self.commit()
+
+    def _get_wikidata_geo_info(self, lookup_keys: list, search_results: dict) -> dict:
+        """Returns {(lookup name, key): geo_info} for each (lookup name, key) of a
+        place searched for on Wikidata, leaving out places whose entities failed.
+        The entities are fetched in rounds: each round fetches, for every place,
+        the next search result that _get_city_country_info or _get_town_county_info
+        reads, so only the results a place looked up on its own would use are fetched
+        (usually just the first)."""
+        get_info = {
+            "city_country": self._get_city_country_info,
+            "town_county": self._get_town_county_info,
+        }
+        entity_properties = {}
+        new_geo_info = {}
+        pending_keys = lookup_keys
+        while len(pending_keys) > 0:
+            # next_qids = {(lookup name, key): qid of the next result to fetch}
+            next_qids = {}
+            for lookup_name, key in pending_keys:
+                read_qids = []
+
+                def get_entity_properties(qid):
+                    read_qids.append(qid)
+                    return entity_properties.get(qid, {})
+
+                new_geo_info[(lookup_name, key)] = get_info[lookup_name](
+                    key, search_results[key], get_entity_properties
+                )
+                unfetched_qids = [
+                    qid for qid in read_qids if qid not in entity_properties
+                ]
+                if len(unfetched_qids) > 0:
+                    next_qids[(lookup_name, key)] = unfetched_qids[0]
+            if len(next_qids) == 0:
+                break
+            fetched_properties, failed_qids = (
+                self.wikidata_connection.get_entity_properties_many(
+                    next_qids.values(), ["P625", "P1082"]
+                )
+            )
+            entity_properties |= fetched_properties
+            pending_keys = []
+            for lookup_key, qid in next_qids.items():
+                if qid in failed_qids:
+                    del new_geo_info[lookup_key]
+                else:
+                    pending_keys.append(lookup_key)
+        return new_geo_info
+
+    def _get_lookup_key(self, postcode: str, town_city: str, county: str, country: str):
+        """Returns the name of the lookup holding a location, and its key in the lookup,
+        or (None, None) if there is not enough information to find it."""
         if country not in ("", "England", "Scotland", "Wales", "Northern Ireland"):
             # find coordinates of non-UK locations
             key = f"{town_city}, {country}" if town_city != "" else country
-            try:
-                info = self.city_country_lookup[key]
-            except KeyError:
-                self._add_new_city_country(key)
-                info = self._get_geo_info(postcode, town_city, county, country)
-            return info
+            return "city_country", key
         if postcode != "":
             # find geographical information for UK locations with postcodes
-            try:
-                info = self.postcode_lookup[postcode]
-            except KeyError:
-                self._add_new_postcode(postcode)
-                info = self._get_geo_info(postcode, town_city, county, country)
-            return info
+            return "postcode", postcode
         if town_city != "" or county != "":
             # find geographical information for UK locations without postcodes
             if town_city != "" and county != "":
@@ -122,13 +277,42 @@ class PostcodeToLatLong:
                 key = town_city
             else:
                 key = county
-            try:
-                info = self.town_county_lookup[key]
-            except KeyError:
-                self._add_new_town_county(key)
-                info = self._get_geo_info(postcode, town_city, county, country)
-            return info
-        return {
+            return "town_county", key
+        return None, None
+
+    def _get_geo_info(self, postcode: str, town_city: str, county: str, country: str):
+        lookup_name, key = self._get_lookup_key(postcode, town_city, county, country)
+        if lookup_name is None:
+            return {
+                "lat": None,
+                "long": None,
+                "bng_x": None,
+                "bng_y": None,
+                "region": None,
+                "lad23cd": None,
+                "lad23nm": None,
+            }
+        lookup = self.get_lookup(lookup_name)
+        try:
+            return lookup[key]
+        except KeyError:
+            pass
+        if lookup_name == "city_country":
+            self._add_new_city_country(key)
+        elif lookup_name == "postcode":
+            self._add_new_postcode(key)
+        else:
+            self._add_new_town_county(key)
+        return lookup[key]
+
+    def _open_lookup(self, lookup_name: str):
+        self._saved_lookups[lookup_name] = self.geo_lookup_store.load(lookup_name)
+
+    def _add_new_postcode(self, postcode: str):
+        self._add_new_postcodes([postcode])
+
+    def _add_new_postcodes(self, postcodes):
+        blank_details = {
             "lat": None,
             "long": None,
             "bng_x": None,
@@ -137,16 +321,51 @@ class PostcodeToLatLong:
             "lad23cd": None,
             "lad23nm": None,
         }
+        new_geo_info = {}
+        postcodes_by_file = defaultdict(set)
+        for postcode in postcodes:
+            if postcode == "":
+                new_geo_info[postcode] = dict(blank_details)
+            elif self.postcode_index is not None:
+                new_geo_info[postcode] = self._get_indexed_postcode_info(postcode)
+            else:
+                postcodes_by_file[self._get_initial_letters(postcode)].add(postcode)
+        for initial_letter, unmatched_postcodes in postcodes_by_file.items():
+            postcode_file = (
+                f"{self.postcode_directory_path}/Data/multi_csv/"
+                + f"ONSPD_FEB_2024_UK_{initial_letter}.csv"
+            )
+            try:
+                with open(postcode_file, "r") as f:
+                    postcode_table = csv.DictReader(f)
+                    for row in postcode_table:
+                        matches = unmatched_postcodes & {
+                            row["pcd"],
+                            row["pcd2"],
+                            row["pcds"],
+                        }
+                        for postcode in matches:
+                            unmatched_postcodes.remove(postcode)
+                            try:
+                                geo_info = self._postcode_row_to_geo_info(row)
+                            except Exception as e:
+                                print(str(e))
+                                geo_info = dict(blank_details)
+                            new_geo_info[postcode] = geo_info
+                        if len(unmatched_postcodes) == 0:
+                            break
+            except FileNotFoundError:
+                print(f"No postcode directory found for postcode '{initial_letter}'")
+            except Exception as e:
+                print(str(e))
+            for postcode in unmatched_postcodes:
+                new_geo_info[postcode] = dict(blank_details)
+        self._set_bng(new_geo_info.values())
+        for postcode, geo_info in new_geo_info.items():
+            self._update_saved_info("postcode", postcode, geo_info)
 
-    def _open_lookup(self, lookup_name: str):
-        try:
-            with open(f"{lookup_name}_lookup.json", "r") as f:
-                self._saved_lookups[lookup_name] = json.load(f)
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
-            self._saved_lookups[lookup_name] = {}
-
-    def _add_new_postcode(self, postcode: str):
-        blank_details = {
+    def _get_indexed_postcode_info(self, postcode: str):
+        geo_info = {
             "lat": None,
             "long": None,
             "bng_x": None,
@@ -155,41 +374,52 @@ class PostcodeToLatLong:
             "lad23cd": None,
             "lad23nm": None,
         }
-        if postcode == "":
-            return self._update_saved_info("postcode", postcode, blank_details)
-        initial_letter = self._get_initial_letters(postcode)
-        postcode_file = (
-            f"{self.postcode_directory_path}/Data/multi_csv/"
-            + f"ONSPD_FEB_2024_UK_{initial_letter}.csv"
-        )
         try:
-            with open(postcode_file, "r") as f:
-                postcode_table = csv.DictReader(f)
-                for row in postcode_table:
-                    if postcode in {row["pcd"], row["pcd2"], row["pcds"]}:
-                        lat = float(row["lat"])
-                        lon = float(row["long"])
-                        bng = WGS84toOSGB36(lat, lon)
-                        return self._update_saved_info(
-                            "postcode",
-                            postcode,
-                            {
-                                "lat": lat,
-                                "long": lon,
-                                "bng_x": bng[0],
-                                "bng_y": bng[1],
-                                "region": self.regions_map[row["rgn"]],
-                                "lad23cd": row["oslaua"],
-                                "lad23nm": self.lads_map.get(row["oslaua"], None),
-                            },
-                        )
-        except FileNotFoundError:
-            print(f"No postcode directory found for postcode '{initial_letter}'")
+            row = self.postcode_index.lookup(postcode)
+            if row is not None:
+                return self._postcode_row_to_geo_info(row)
+            # a partial postcode is placed at the centre of its outward code
+            # and only given a region and LAD if all of its postcodes agree
+            rows = self.postcode_index.lookup_outward_code(postcode)
+            if len(rows) == 0:
+                return geo_info
+            lat = sum(row["lat"] for row in rows) / len(rows)
+            lon = sum(row["long"] for row in rows) / len(rows)
+            geo_info |= {"lat": lat, "long": lon}
+            if len({row["rgn"] for row in rows}) == 1:
+                geo_info["region"] = self.regions_map[rows[0]["rgn"]]
+            if len({row["oslaua"] for row in rows}) == 1:
+                geo_info["lad23cd"] = rows[0]["oslaua"]
+                geo_info["lad23nm"] = self.lads_map.get(rows[0]["oslaua"], None)
         except Exception as e:
             print(str(e))
-        return self._update_saved_info("postcode", postcode, blank_details)
+        return geo_info
+
+    def _postcode_row_to_geo_info(self, row: dict):
+        # rows from the PostcodeIndex already have national grid references
+        return {
+            "lat": float(row["lat"]),
+            "long": float(row["long"]),
+            "bng_x": row.get("bng_x", None),
+            "bng_y": row.get("bng_y", None),
+            "region": self.regions_map[row["rgn"]],
+            "lad23cd": row["oslaua"],
+            "lad23nm": self.lads_map.get(row["oslaua"], None),
+        }
 
     def _add_new_city_country(self, key: str):
+        results = None
+        try:
+            results = self.wikidata_connection.search_entities(key)
+        except Exception as e:
+            print(e)
+        geo_info = self._get_city_country_info(
+            key, results, self.wikidata_connection.get_entity_properties
+        )
+        self._set_bng([geo_info])
+        return self._update_saved_info("city_country", key, geo_info)
+
+    def _get_city_country_info(self, key: str, results: list, get_entity_properties):
         region = (
             "Channel Islands"
             if "Channel Islands" in key
@@ -207,27 +437,28 @@ class PostcodeToLatLong:
             "lad23cd": None,
             "lad23nm": lad,
         }
-        results = None
-        try:
-            results = self.wikidata_connection.search_entities(key)
-        except Exception as e:
-            print(e)
         results = results if results is not None else []
         for result in results:
-            properties = self.wikidata_connection.get_entity_properties(result["id"])
+            properties = get_entity_properties(result["id"])
             try:
                 coordinates = properties["P625"]
                 geo_info["lat"] = coordinates["latitude"]
                 geo_info["long"] = coordinates["longitude"]
-                bng = WGS84toOSGB36(geo_info["lat"], geo_info["long"])
-                geo_info["bng_x"] = bng[0]
-                geo_info["bng_y"] = bng[1]
                 break
             except KeyError:
                 continue
-        return self._update_saved_info("city_country", key, geo_info)
+        return geo_info
 
     def _add_new_town_county(self, key: str):
+        results = self.wikidata_connection.search_entities(key)
+        geo_info = self._get_town_county_info(
+            key, results, self.wikidata_connection.get_entity_properties
+        )
+        self._set_bng([geo_info])
+        self._set_local_authorities([geo_info])
+        return self._update_saved_info("town_county", key, geo_info)
+
+    def _get_town_county_info(self, key: str, results: list, get_entity_properties):
         # town -> located in the administrative territorial entity (P131) -> LAD
         # -> population (P1082) less than 100,000 then get coordinates (P625)
         geo_info = {
@@ -239,19 +470,21 @@ class PostcodeToLatLong:
             "lad23cd": None,
             "lad23nm": None,
         }
-        for lad_code, lad_name in self.lads_map.items():
-            lad_name = lad_name.split(", ")[0]  # remove ", City of" from lad names
-            keys = key.split(", ")  # split town/city from county
-            for k in keys:
-                if k == lad_name:
-                    geo_info["lad23cd"] = lad_code
-                    geo_info["lad23nm"] = lad_name
-                    geo_info["region"] = self.lads_to_regions_map[lad_code]
-                    break
-        results = self.wikidata_connection.search_entities(key)
+        # match the town/city or county exactly to a LAD name;
+        # if several match, the LAD that comes last in the LAD file wins
+        matches = [
+            self.lads_by_name[name]
+            for name in key.split(", ")
+            if name in self.lads_by_name
+        ]
+        if len(matches) > 0:
+            _, lad_code, lad_name = max(matches)
+            geo_info["lad23cd"] = lad_code
+            geo_info["lad23nm"] = lad_name
+            geo_info["region"] = self.lads_to_regions_map[lad_code]
         results = results if results is not None else []
         for result in results:
-            properties = self.wikidata_connection.get_entity_properties(result["id"])
+            properties = get_entity_properties(result["id"])
             try:
                 population = int(properties["P1082"]["amount"][1:]) * int(
                     properties["P1082"]["unit"]
@@ -261,18 +494,54 @@ class PostcodeToLatLong:
                     coordinates = properties["P625"]
                     geo_info["lat"] = coordinates["latitude"]
                     geo_info["long"] = coordinates["longitude"]
-                    bng = WGS84toOSGB36(geo_info["lat"], geo_info["long"])
-                    geo_info["bng_x"] = bng[0]
-                    geo_info["bng_y"] = bng[1]
                 break
             except KeyError:
                 continue
-        return self._update_saved_info("town_county", key, geo_info)
+        return geo_info
+
+    def _set_bng(self, geo_infos):
+        """Fills in bng_x and bng_y for every geo_info that has coordinates
+        but no national grid reference yet, converting them all in one call."""
+        geo_infos = [
+            geo_info
+            for geo_info in geo_infos
+            if geo_info["lat"] is not None and geo_info["bng_x"] is None
+        ]
+        if len(geo_infos) == 0:
+            return
+        xs, ys = wgs84_to_osgb36(
+            [geo_info["lat"] for geo_info in geo_infos],
+            [geo_info["long"] for geo_info in geo_infos],
+        )
+        for geo_info, x, y in zip(geo_infos, xs, ys):
+            # rounded like bng_latlon, which was used to save earlier lookups
+            geo_info["bng_x"] = round(float(x), 4)
+            geo_info["bng_y"] = round(float(y), 4)
+
+    def _set_local_authorities(self, geo_infos):
+        """Replaces the local authority and region of every geo_info with
+        a national grid reference by the ones found by local_authority_assigner.
+        The region is not looked up from boundaries, but is the region of the
+        LAD in the LAD file, which LADs lie within."""
+        geo_infos = [
+            geo_info for geo_info in geo_infos if geo_info["bng_x"] is not None
+        ]
+        if len(geo_infos) == 0 or self.local_authority_assigner is None:
+            return
+        lad_codes = self.local_authority_assigner.assign_local_authorities(
+            [geo_info["bng_x"] for geo_info in geo_infos],
+            [geo_info["bng_y"] for geo_info in geo_infos],
+        )
+        for geo_info, lad_code in zip(geo_infos, lad_codes):
+            if lad_code is None:
+                continue
+            geo_info["lad23cd"] = lad_code
+            geo_info["lad23nm"] = self.lads_map.get(lad_code, None)
+            geo_info["region"] = self.lads_to_regions_map.get(lad_code, None)
 
     def _update_saved_info(self, lookup_name: str, key: str, geo_info: dict):
-        self._saved_lookups[lookup_name][key] = geo_info
-        with open(f"{lookup_name}_lookup.json", "w") as f:
-            f.write(json.dumps(self._saved_lookups[lookup_name]))
+        self.get_lookup(lookup_name)[key] = geo_info
+        self.geo_lookup_store.put(lookup_name, key, geo_info)
 
     def _get_initial_letters(self, postcode: str):
         letters = ""
@@ -284,20 +553,28 @@ class PostcodeToLatLong:
 
     @property
     def lads_map(self):
+        """LAD code -> LAD name."""
         if self._lads_map is None:
-            lads_map_file_name = "LAD23_LAU121_ITL321_ITL221_ITL121_UK_LU.csv"
-            lads_map_file = (
-                f"{self.postcode_directory_path}/Documents/{lads_map_file_name}"
-            )
-            with open(lads_map_file, "r") as f:
-                lad_table = csv.DictReader(f)
-                self._lads_map = {
-                    row["\ufeffLAD23CD"]: row["LAD23NM"] for row in lad_table
-                }
+            self._load_lads()
         return self._lads_map
 
     @property
     def lads_to_regions_map(self):
+        """LAD code -> region name."""
+        if self._lads_to_regions_map is None:
+            self._load_lads()
+        return self._lads_to_regions_map
+
+    @property
+    def lads_by_name(self):
+        """LAD name -> (position in the LAD file, LAD code, LAD name).
+        Names are without suffixes such as ", City of", which is also how they are
+        saved in the lookups. If LADs share a name, the last in the file is kept."""
+        if self._lads_by_name is None:
+            self._load_lads()
+        return self._lads_by_name
+
+    def _load_lads(self):
         def tidy_region_name(region_name: str):
             region_name = region_name.split(" (")[0]
             if region_name == "Yorkshire and The Humber":
@@ -306,15 +583,19 @@ class PostcodeToLatLong:
                 region_name = "East of England"
             return region_name
 
-        if self._lads_to_regions_map is None:
-            lads_map_file_name = "LAD23_LAU121_ITL321_ITL221_ITL121_UK_LU.csv"
-            lads_map_file = (
-                f"{self.postcode_directory_path}/Documents/{lads_map_file_name}"
-            )
-            with open(lads_map_file, "r") as f:
-                lad_table = csv.DictReader(f)
-                self._lads_to_regions_map = {
-                    row["\ufeffLAD23CD"]: tidy_region_name(row["ITL121NM"])
-                    for row in lad_table
-                }
-        return self._lads_to_regions_map
+        lads_map_file_name = "LAD23_LAU121_ITL321_ITL221_ITL121_UK_LU.csv"
+        lads_map_file = f"{self.postcode_directory_path}/Documents/{lads_map_file_name}"
+        lads_map = {}
+        lads_to_regions_map = {}
+        with open(lads_map_file, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                lads_map[row["LAD23CD"]] = row["LAD23NM"]
+                lads_to_regions_map[row["LAD23CD"]] = tidy_region_name(row["ITL121NM"])
+        lads_by_name = {}
+        for position, (lad_code, lad_name) in enumerate(lads_map.items()):
+            short_lad_name = lad_name.split(", ")[0]
+            lad = (position, lad_code, short_lad_name)
+            lads_by_name[short_lad_name] = lad
+        self._lads_map = lads_map
+        self._lads_to_regions_map = lads_to_regions_map
+        self._lads_by_name = lads_by_name
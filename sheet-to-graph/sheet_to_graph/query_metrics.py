@@ -0,0 +1,105 @@
+import bisect
+import json
+import re
+import threading
+
+
+class QueryMetrics:
+    """Collects timings of Cypher queries, grouped by statement template.
+
+    A query's template is its text with whitespace collapsed and any string
+    and number literals replaced by ?, so that queries which only differ in the
+    values written into them (as when CypherTranslator writes one query per node)
+    are counted together. Parameterised queries are their own template.
+
+    For each template, record keeps the number of queries, the number of rows
+    they returned, a histogram of their latencies (the time taken by the client
+    to run the query and read its results, in milliseconds, counted in
+    latency_buckets), and the total of the server's result_available_after and
+    result_consumed_after counters (the time until the first record was available,
+    and the time then taken to stream every record, in milliseconds).
+    """
+
+    # upper bounds, in milliseconds, of the latency histogram buckets,
+    # the last bucket counts every latency above the last bound
+    latency_buckets = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+    _literal_pattern = re.compile(
+        r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|(?<![\w$])-?\d+(?:\.\d+)?(?![\w])"
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # templates = {template: {count, rows, ...}}
+        self.templates = {}
+
+    @classmethod
+    def get_template(cls, query: str) -> str:
+        return cls._literal_pattern.sub("?", " ".join(query.split()))
+
+    def record(
+        self,
+        query: str,
+        latency: float,
+        rows: int = 0,
+        result_available_after: int = None,
+        result_consumed_after: int = None,
+    ):
+        """Records a query that took latency seconds and returned rows rows."""
+        template = self.get_template(query)
+        latency_ms = latency * 1000
+        with self._lock:
+            metrics = self.templates.setdefault(
+                template,
+                {
+                    "count": 0,
+                    "rows": 0,
+                    "total_latency_ms": 0,
+                    "max_latency_ms": 0,
+                    "latency_histogram": [0] * (len(self.latency_buckets) + 1),
+                    "result_available_after_ms": 0,
+                    "result_consumed_after_ms": 0,
+                },
+            )
+            metrics["count"] += 1
+            metrics["rows"] += rows
+            metrics["total_latency_ms"] += latency_ms
+            metrics["max_latency_ms"] = max(metrics["max_latency_ms"], latency_ms)
+            metrics["latency_histogram"][
+                bisect.bisect_left(self.latency_buckets, latency_ms)
+            ] += 1
+            metrics["result_available_after_ms"] += result_available_after or 0
+            metrics["result_consumed_after_ms"] += result_consumed_after or 0
+
+    def get_summary(self) -> list:
+        """Returns the metrics of each template as a list of dicts,
+        slowest (by total latency) first."""
+        with self._lock:
+            summary = [
+                {"template": template, **metrics}
+                for template, metrics in self.templates.items()
+            ]
+        return sorted(summary, key=lambda metrics: -metrics["total_latency_ms"])
+
+    def print_summary(self, number_of_templates: int = 5):
+        """Prints the templates that took longest in total."""
+        for metrics in self.get_summary()[:number_of_templates]:
+            template = metrics["template"]
+            if len(template) > 80:
+                template = template[:77] + "..."
+            print(
+                f"{metrics['total_latency_ms'] / 1000:.1f}s "
+                + f"({metrics['count']} queries, {metrics['rows']} rows, "
+                + f"max {metrics['max_latency_ms']:.0f}ms): {template}"
+            )
+
+    def save(self, file_name: str):
+        with open(file_name, "w") as f:
+            json.dump(
+                {
+                    "latency_buckets_ms": self.latency_buckets,
+                    "templates": self.get_summary(),
+                },
+                f,
+                indent=4,
+            )
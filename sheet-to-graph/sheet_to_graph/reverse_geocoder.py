@@ -0,0 +1,44 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class ReverseGeocoder:
+    """Finds the local authority of points from the nearest ONSPD postcode centroid.
+
+    Postcode centroids are held in a KD-tree on their British National Grid
+    coordinates, so arrays of points are matched in one call.
+    Points further than max_distance metres from every postcode
+    (e.g. out at sea or outside the UK) are not assigned a local authority.
+
+    Initialize with arrays of centroid eastings, northings and local authority codes,
+    or from a built PostcodeIndex with the classmethod from_postcode_index.
+    """
+
+    def __init__(self, bng_x, bng_y, local_authority_codes, max_distance=5000):
+        self.tree = cKDTree(np.column_stack([bng_x, bng_y]))
+        self.local_authority_codes = np.asarray(local_authority_codes, dtype=object)
+        self.max_distance = max_distance
+
+    @classmethod
+    def from_postcode_index(cls, postcode_index, max_distance=5000):
+        rows = postcode_index.get_grid_references()
+        if len(rows) == 0:
+            raise ValueError(f"{postcode_index.index_file_name} has no grid references")
+        bng_x, bng_y, local_authority_codes = zip(*rows)
+        return cls(bng_x, bng_y, local_authority_codes, max_distance=max_distance)
+
+    def nearest(self, bng_x, bng_y) -> tuple:
+        """Returns the distance to, and the local authority code of,
+        the nearest postcode centroid to each point, as two arrays."""
+        points = np.column_stack([np.ravel(bng_x), np.ravel(bng_y)])
+        distances, indices = self.tree.query(points)
+        return distances, self.local_authority_codes[indices]
+
+    def assign_local_authorities(self, bng_x, bng_y) -> list:
+        """Returns the local authority code for each point,
+        or None for points further than max_distance from every postcode."""
+        distances, codes = self.nearest(bng_x, bng_y)
+        return [
+            code if distance <= self.max_distance else None
+            for distance, code in zip(distances, codes)
+        ]
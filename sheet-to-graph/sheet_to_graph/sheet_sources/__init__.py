@@ -1,10 +1,33 @@
 from .base import SheetSource
+from .cached_sheet_source import CachedSheetSource
 from .csv_sheet_source import CsvSheetSource
 from .excel_sheet_source import ExcelSheetSource
 from .google_sheet_source import GoogleSheetSource
 
 
-def make_sheet_source(sheet_config, *, google_service=None) -> SheetSource:
+def make_sheet_source(
+    sheet_config, *, google_service=None, drive_service=None
+) -> SheetSource:
+    source = _make_uncached_sheet_source(
+        sheet_config, google_service=google_service, drive_service=drive_service
+    )
+    cache_directory = sheet_config.get("cache_directory", "")
+    if cache_directory == "":
+        return source
+    return CachedSheetSource(source, cache_directory, sheet_cache_name(sheet_config))
+
+
+def sheet_cache_name(sheet_config) -> str:
+    backend = sheet_config.get("backend", "csv")
+    location = (
+        sheet_config["spreadsheet_id"] if backend == "google" else sheet_config["file"]
+    )
+    return f"{backend}:{location}:{sheet_config.get('sheet', '')}"
+
+
+def _make_uncached_sheet_source(
+    sheet_config, *, google_service=None, drive_service=None
+) -> SheetSource:
     backend = sheet_config.get("backend", "csv")
 
     if backend == "csv":
@@ -20,6 +43,7 @@ def make_sheet_source(sheet_config, *, google_service=None) -> SheetSource:
             google_service,
             sheet_config["spreadsheet_id"],
             sheet_config["sheet"],
+            drive_service=drive_service,
         )
 
     raise ValueError(f"Unknown backend: {backend}")
@@ -1,7 +1,23 @@
 from abc import ABC, abstractmethod
+import os
 
 
 class SheetSource(ABC):
     @abstractmethod
     def get_rows(self):
         pass
+
+    def iter_rows(self):
+        """Yields rows one at a time. Sources that can stream should override this."""
+        return iter(self.get_rows())
+
+    def get_version(self):
+        """Returns a string that changes whenever the sheet's contents may have changed,
+        or None if the source cannot tell. Used to validate persistent caches."""
+        return None
+
+
+def file_version(filename: str) -> str:
+    """Identifies the current revision of a local file by its path, mtime and size."""
+    stat = os.stat(filename)
+    return f"{os.path.abspath(filename)}:{stat.st_mtime_ns}:{stat.st_size}"
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import pickle
+
+from .base import SheetSource
+
+
+class CachedSheetSource(SheetSource):
+    """Serves the rows of another SheetSource from a persistent cache on disk.
+    Rows are pickled to one file per sheet in cache_directory, together with the
+    version of the source they were read from (see SheetSource.get_version).
+    While the source reports the same version the cached rows are returned,
+    so an unchanged sheet costs one metadata check instead of a full read.
+    Sources that cannot report a version are always read directly.
+    """
+
+    def __init__(self, source: SheetSource, cache_directory: str, cache_name: str):
+        self.source = source
+        self.cache_directory = cache_directory
+        self.cache_file_name = os.path.join(
+            cache_directory,
+            hashlib.sha1(cache_name.encode("utf-8")).hexdigest() + ".pickle",
+        )
+        self._version = None
+
+    def get_rows(self):
+        rows = self.load()
+        if rows is None:
+            rows = self.source.get_rows()
+            self.store(rows)
+        return rows
+
+    def get_version(self):
+        if self._version is None:
+            self._version = self.source.get_version()
+        return self._version
+
+    def load(self):
+        """Returns the cached rows if they match the source's version, otherwise None."""
+        version = self.get_version()
+        if version is None:
+            return None
+        try:
+            with open(self.cache_file_name, "rb") as f:
+                cached = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if cached["version"] != version:
+            return None
+        return cached["rows"]
+
+    def store(self, rows):
+        """Saves rows to the cache under the version read before they were fetched."""
+        version = self.get_version()
+        if version is None:
+            return
+        os.makedirs(self.cache_directory, exist_ok=True)
+        # write to a temporary file first so that an interrupted run cannot leave
+        # a truncated cache file behind
+        temporary_file_name = f"{self.cache_file_name}.{os.getpid()}.tmp"
+        with open(temporary_file_name, "wb") as f:
+            pickle.dump(
+                {"version": version, "rows": tuple(tuple(row) for row in rows)},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temporary_file_name, self.cache_file_name)
@@ -1,6 +1,6 @@
 import csv
 
-from .base import SheetSource
+from .base import SheetSource, file_version
 
 
 class CsvSheetSource(SheetSource):
@@ -10,3 +10,6 @@ class CsvSheetSource(SheetSource):
     def get_rows(self):
         with open(self.filename, "r", encoding="utf-8-sig") as f:
             return list(csv.reader(f, skipinitialspace=True))
+
+    def get_version(self):
+        return file_version(self.filename)
@@ -1,18 +1,65 @@
+import os
+import threading
+
 import openpyxl
 
-from .base import SheetSource
+from .base import SheetSource, file_version
 
 
 class ExcelSheetSource(SheetSource):
+    """Reads the rows of one sheet in an Excel workbook.
+    Workbooks are opened once in read-only mode and the handle is shared by every
+    ExcelSheetSource that points at the same file, so a workbook holding several
+    configured sheets is only opened once per run.
+    The handles stay open until close_workbooks is called, which FileLoader does
+    once it has read the sheets it was asked for.
+    Use iter_rows to stream rows lazily, or get_rows to load the whole sheet.
+    """
+
+    _workbooks = {}
+    _workbooks_lock = threading.Lock()
+
     def __init__(self, filename: str, sheet_name: str):
         self.filename = filename
         self.sheet_name = sheet_name
 
     def get_rows(self):
-        workbook = openpyxl.load_workbook(self.filename)
-        spreadsheet = workbook[self.sheet_name]
-        return [
-            ["" if cell is None else str(cell) for cell in row]
-            for row in spreadsheet.iter_rows(values_only=True)
-            if not all(cell is None for cell in row)
-        ]
+        return list(self.iter_rows())
+
+    def iter_rows(self):
+        spreadsheet = self._get_workbook(self.filename)[self.sheet_name]
+        # read-only mode trusts the size the file records for the sheet,
+        # which can be out of date, so read every row and column there is
+        spreadsheet.reset_dimensions()
+        for row in spreadsheet.iter_rows(values_only=True):
+            if all(cell is None for cell in row):
+                continue
+            yield ["" if cell is None else str(cell) for cell in row]
+
+    def get_version(self):
+        return file_version(self.filename)
+
+    @classmethod
+    def close_workbooks(cls):
+        """Closes every shared workbook handle."""
+        with cls._workbooks_lock:
+            for workbook in cls._workbooks.values():
+                workbook.close()
+            cls._workbooks = {}
+
+    @classmethod
+    def _get_workbook(cls, filename: str):
+        # the key includes mtime and size so that an edited file is reopened
+        stat = os.stat(filename)
+        path = os.path.abspath(filename)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with cls._workbooks_lock:
+            try:
+                return cls._workbooks[key]
+            except KeyError:
+                pass
+            for stale_key in [k for k in cls._workbooks if k[0] == path]:
+                cls._workbooks.pop(stale_key).close()
+            workbook = openpyxl.load_workbook(filename, read_only=True)
+            cls._workbooks[key] = workbook
+            return workbook
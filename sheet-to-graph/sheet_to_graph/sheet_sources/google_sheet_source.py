@@ -2,10 +2,13 @@ from .base import SheetSource
 
 
 class GoogleSheetSource(SheetSource):
-    def __init__(self, service, spreadsheet_id: str, sheet_name: str):
+    def __init__(
+        self, service, spreadsheet_id: str, sheet_name: str, drive_service=None
+    ):
         self.service = service
         self.spreadsheet_id = spreadsheet_id
         self.sheet_name = sheet_name
+        self.drive_service = drive_service
 
     def get_rows(self):
         sheet = self.service.spreadsheets()
@@ -19,3 +22,36 @@ class GoogleSheetSource(SheetSource):
         )
         values = result.get("values", [])
         return values
+
+    def get_version(self):
+        """Uses the spreadsheet's Drive modifiedTime and revision number, if a Drive
+        service was supplied."""
+        if self.drive_service is None:
+            return None
+        metadata = (
+            self.drive_service.files()
+            .get(fileId=self.spreadsheet_id, fields="modifiedTime, version")
+            .execute()
+        )
+        return f"{self.spreadsheet_id}:{metadata['modifiedTime']}:{metadata['version']}"
+
+    @staticmethod
+    def batch_get_rows(service, spreadsheet_id: str, sheet_names: list) -> dict:
+        """Fetches several sheets of one spreadsheet in a single batchGet request.
+        Returns a dict mapping each sheet name to its rows."""
+        result = (
+            service.spreadsheets()
+            .values()
+            .batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=list(sheet_names),
+                majorDimension="ROWS",
+            )
+            .execute()
+        )
+        # value ranges are returned in the same order as the requested ranges
+        value_ranges = result.get("valueRanges", [])
+        return {
+            sheet_name: value_range.get("values", [])
+            for sheet_name, value_range in zip(sheet_names, value_ranges)
+        }
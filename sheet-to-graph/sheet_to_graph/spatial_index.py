@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+METRES_PER_MILE = 1609.344
+
+
+class SpatialIndex:
+    """Radius and nearest-neighbour queries over points in British National Grid
+    coordinates, such as the x and y columns of places_df and museums_df.
+
+    The points are held in a KD-tree, so arrays of query points are answered
+    in one call rather than by comparing every pair of points.
+    Distances are straight-line distances in metres on the national grid,
+    which are within a fraction of a percent of geodesic distances within the UK.
+    Points without coordinates are left out of the index,
+    and query points without coordinates have no neighbours.
+
+    Initialize with arrays of ids, eastings and northings,
+    or from a DataFrame with the classmethod from_dataframe.
+    """
+
+    def __init__(self, ids, bng_x, bng_y):
+        xs = np.ravel(np.asarray(bng_x, dtype=float))
+        ys = np.ravel(np.asarray(bng_y, dtype=float))
+        has_coordinates = np.isfinite(xs) & np.isfinite(ys)
+        self.ids = np.ravel(np.asarray(ids, dtype=object))[has_coordinates]
+        self.tree = cKDTree(np.column_stack([xs[has_coordinates], ys[has_coordinates]]))
+
+    @classmethod
+    def from_dataframe(cls, df, id_column, x_column="x", y_column="y"):
+        return cls(
+            df[id_column].to_numpy(),
+            pd.to_numeric(df[x_column], errors="coerce").to_numpy(),
+            pd.to_numeric(df[y_column], errors="coerce").to_numpy(),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def within_radius(self, bng_x, bng_y, radius) -> list:
+        """Returns, for each query point, a list of the ids of the points
+        within radius metres of it, nearest first."""
+        points, has_coordinates = self._get_points(bng_x, bng_y)
+        results = [[] for _ in range(len(points))]
+        if len(self) == 0:
+            return results
+        for point_index, indices in zip(
+            np.flatnonzero(has_coordinates),
+            self.tree.query_ball_point(points[has_coordinates], radius),
+        ):
+            distances = np.hypot(*(self.tree.data[indices] - points[point_index]).T)
+            results[point_index] = list(
+                self.ids[np.asarray(indices)[np.argsort(distances)]]
+            )
+        return results
+
+    def k_nearest(self, bng_x, bng_y, k=1) -> tuple:
+        """Returns the distances to, and the ids of, the k nearest points to each
+        query point, nearest first, as two arrays of shape (number of points, k).
+        Where there are fewer than k points, or the query point has no coordinates,
+        the remaining distances are inf and the ids None."""
+        points, has_coordinates = self._get_points(bng_x, bng_y)
+        distances = np.full((len(points), k), np.inf)
+        ids = np.full((len(points), k), None, dtype=object)
+        if len(self) == 0 or not np.any(has_coordinates):
+            return distances, ids
+        # k=[1] rather than k=1, so the results keep their second dimension
+        found_distances, indices = self.tree.query(
+            points[has_coordinates], k=k if k > 1 else [1]
+        )
+        found = indices < len(self)
+        found_ids = np.full(indices.shape, None, dtype=object)
+        found_ids[found] = self.ids[indices[found]]
+        distances[has_coordinates] = found_distances
+        ids[has_coordinates] = found_ids
+        return distances, ids
+
+    @staticmethod
+    def _get_points(bng_x, bng_y) -> tuple:
+        xs = np.ravel(np.asarray(bng_x, dtype=float))
+        ys = np.ravel(np.asarray(bng_y, dtype=float))
+        return np.column_stack([xs, ys]), np.isfinite(xs) & np.isfinite(ys)
+
+
+def get_nearest_open_museums(
+    museums_df, bng_x, bng_y, years, exclude_ids=None, id_column="mm_id"
+) -> tuple:
+    """Finds the nearest museum that was open in the given year to each point.
+
+    A museum counts as open in a year if it had certainly opened by then
+    (year_opened_2) and had not certainly closed before it (year_closed_1,
+    which is 9999 for museums that are still open).
+    The museum exclude_ids[i] (e.g. the museum the objects came from)
+    is never chosen for point i.
+    Returns the distances in metres and the ids of the museums, as two arrays.
+    The distances are straight lines on the British National Grid, not geodesic
+    distances, so they are only meaningful for points in Great Britain.
+    Points without coordinates or a year have a distance of nan and an id of None.
+    """
+    bng_x = np.ravel(np.asarray(bng_x, dtype=float))
+    bng_y = np.ravel(np.asarray(bng_y, dtype=float))
+    years = pd.to_numeric(pd.Series(np.ravel(years)), errors="coerce").to_numpy()
+    if exclude_ids is None:
+        exclude_ids = [None] * len(years)
+    exclude_ids = np.ravel(np.asarray(exclude_ids, dtype=object))
+    opened = pd.to_numeric(museums_df["year_opened_2"], errors="coerce").to_numpy()
+    closed = pd.to_numeric(museums_df["year_closed_1"], errors="coerce").to_numpy()
+
+    distances = np.full(len(years), np.nan)
+    ids = np.full(len(years), None, dtype=object)
+    for year in np.unique(years[np.isfinite(years)]):
+        in_year = np.flatnonzero(years == year)
+        index = SpatialIndex.from_dataframe(
+            museums_df[(opened <= year) & (year <= closed)], id_column
+        )
+        # the excluded museum can be at most one of the two nearest
+        year_distances, year_ids = index.k_nearest(bng_x[in_year], bng_y[in_year], k=2)
+        is_excluded = year_ids[:, 0] == exclude_ids[in_year]
+        nearest = np.where(is_excluded, 1, 0)
+        rows = np.arange(len(in_year))
+        distances[in_year] = year_distances[rows, nearest]
+        ids[in_year] = year_ids[rows, nearest]
+    distances[np.isinf(distances)] = np.nan
+    return distances, ids
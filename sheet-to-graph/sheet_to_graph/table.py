@@ -121,7 +121,7 @@ class Table:
             if keep_blank_rows and all(
                 [
                     row[column.name] == ""
-                    for column in self.columns_list
+                    for column in self.columns.values()
                     if not column.unique
                 ]
             ):
@@ -131,7 +131,7 @@ class Table:
                     any(
                         [
                             row[column.name] != new_row[column.name]
-                            for column in self.columns_list
+                            for column in self.columns.values()
                             if not column.unique
                         ]
                     )
@@ -201,7 +201,7 @@ class Table:
                 clean_row[column_name] = ""
         for column_name in self.calculated_columns_ordered:
             try:
-                clean_row[column_name] = self.columns[column_name].formula(
+                clean_row |= self.calculated_columns[column_name].calculate_as_dict(
                     self, row_index
                 )
             except Exception as e:
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class UploadCheckpoint:
+    """Records which queries of an upload have been committed, in a text file,
+    so that an interrupted upload can be resumed where it stopped.
+
+    Each committed query is recorded by its index in the upload
+    and a hash of its content (the query and its parameters), so a query is only
+    skipped on resume if the same query was committed at the same position.
+    One line is appended to the file for each committed query, and the file is
+    deleted with clear once the upload is complete.
+    A line cut short by a crash matches no query, so it is ignored.
+    """
+
+    def __init__(self, file_name: str = "upload_checkpoint.txt"):
+        self.file_name = file_name
+        self._lock = threading.Lock()
+        self.completed = set()
+        if os.path.exists(file_name):
+            with open(file_name, "r") as f:
+                lines = f.readlines()
+            self.completed = {line.strip() for line in lines}
+            if len(lines) > 0 and not lines[-1].endswith("\n"):
+                # end the cut line, so the next entry starts on a line of its own
+                with open(file_name, "a") as f:
+                    f.write("\n")
+
+    @staticmethod
+    def hash_query(query: tuple) -> str:
+        return hashlib.sha256(
+            json.dumps(query, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def is_completed(self, index: int, query: tuple) -> bool:
+        return f"{index}:{self.hash_query(query)}" in self.completed
+
+    def mark_completed(self, indexed_queries: list):
+        """Records a list of (index, query) as committed."""
+        entries = [
+            f"{index}:{self.hash_query(query)}" for index, query in indexed_queries
+        ]
+        with self._lock:
+            self.completed.update(entries)
+            with open(self.file_name, "a") as f:
+                f.writelines(f"{entry}\n" for entry in entries)
+
+    def clear(self):
+        with self._lock:
+            self.completed = set()
+            if os.path.exists(self.file_name):
+                os.remove(self.file_name)
@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+import zlib
+
+import neo4j
+
+from .cypher_translator import CypherTranslator
+
+
+class UploadScheduler:
+    """Runs (query, parameters) tuples from a CypherTranslator on several sessions at once.
+
+    Queries are run in order, in phases of consecutive queries of the same kind
+    (see CypherTranslator.get_batch_kind).
+    Batches of nodes do not depend on each other, so each phase of them is shared
+    between workers concurrent sessions.
+    Batches of relationships lock the nodes at both ends, so their rows are split
+    into partitions by hashing the keys of their end nodes into 2 * workers - 1
+    buckets, and the partitions are run in rounds (as in a round-robin tournament)
+    in which no two partitions share a bucket, and so cannot wait on each other's locks.
+    Any other query runs on its own, after everything before it.
+
+    With workers=1, or if a concurrent phase fails with a transient error
+    (such as a deadlock), the queries are run serially in their original order,
+    which is always safe as the batched queries MERGE.
+    """
+
+    def __init__(self, neo4j_connection, workers: int = 4, transaction_size: int = 100):
+        self.neo4j_connection = neo4j_connection
+        self.workers = workers
+        self.transaction_size = transaction_size
+        self.checkpoint = None
+
+    def run(self, queries, checkpoint=None) -> int:
+        """Runs the queries and returns the number of queries run.
+        If a checkpoint (an UploadCheckpoint) is given, queries it records as
+        committed are skipped, and queries are recorded in it as they are committed."""
+        self.checkpoint = checkpoint
+        indexed_queries = list(enumerate(queries))
+        if checkpoint is not None:
+            number_of_queries = len(indexed_queries)
+            indexed_queries = [
+                (index, query)
+                for index, query in indexed_queries
+                if not checkpoint.is_completed(index, query)
+            ]
+            number_of_skipped_queries = number_of_queries - len(indexed_queries)
+            if number_of_skipped_queries > 0:
+                print(f"Skipping {number_of_skipped_queries} queries already uploaded")
+        if self.workers <= 1:
+            return self._run_serially(indexed_queries)
+        number_of_queries = 0
+        for kind, phase_queries in groupby(
+            indexed_queries,
+            key=lambda indexed_query: CypherTranslator.get_batch_kind(
+                indexed_query[1][0]
+            ),
+        ):
+            phase_queries = list(phase_queries)
+            try:
+                if kind == "nodes":
+                    number_of_queries += self._run_node_batches(phase_queries)
+                elif kind == "relationships":
+                    number_of_queries += self._run_relationship_batches(phase_queries)
+                else:
+                    number_of_queries += self._run_serially(phase_queries)
+            except neo4j.exceptions.TransientError as e:
+                print(str(e))
+                print("Running the phase again serially")
+                number_of_queries += self._run_serially(phase_queries)
+        return number_of_queries
+
+    def _run_serially(self, indexed_queries: list, record: bool = True) -> int:
+        indices = [index for index, _ in indexed_queries]
+        number_committed = 0
+
+        def mark_completed(committed_queries):
+            nonlocal number_committed
+            committed_indices = indices[
+                number_committed : number_committed + len(committed_queries)
+            ]
+            number_committed += len(committed_queries)
+            if record and self.checkpoint is not None:
+                self.checkpoint.mark_completed(
+                    list(zip(committed_indices, committed_queries))
+                )
+
+        return self.neo4j_connection.run_write_queries(
+            [query for _, query in indexed_queries],
+            self.transaction_size,
+            on_commit=mark_completed,
+        )
+
+    def _run_concurrently(self, query_lists: list, record: bool = True) -> int:
+        query_lists = [queries for queries in query_lists if len(queries) > 0]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return sum(
+                executor.map(
+                    lambda queries: self._run_serially(queries, record), query_lists
+                )
+            )
+
+    def _run_node_batches(self, indexed_queries: list) -> int:
+        return self._run_concurrently(
+            [indexed_queries[worker :: self.workers] for worker in range(self.workers)]
+        )
+
+    def _run_relationship_batches(self, indexed_queries: list) -> int:
+        number_of_buckets = 2 * self.workers - 1
+        # partitions = {(bucket, bucket): {query: [row, ...]}}
+        partitions = {}
+        batch_size = 1
+        for _, (query, parameters) in indexed_queries:
+            batch_size = max(batch_size, len(parameters["rows"]))
+            for row in parameters["rows"]:
+                buckets = tuple(
+                    sorted(
+                        zlib.crc32(str(row[end]).encode("utf-8")) % number_of_buckets
+                        for end in ("from", "to")
+                    )
+                )
+                partitions.setdefault(buckets, {}).setdefault(query, []).append(row)
+        number_of_queries = 0
+        for round_number in range(number_of_buckets):
+            # the partitions whose buckets add up to round_number share no bucket
+            round_partitions = [
+                partitions.get(
+                    tuple(
+                        sorted((bucket, (round_number - bucket) % number_of_buckets))
+                    ),
+                    {},
+                )
+                for bucket in range(number_of_buckets)
+                if bucket <= (round_number - bucket) % number_of_buckets
+            ]
+            # the repartitioned batches are not the ones in the checkpoint,
+            # so the phase's queries are only recorded once all of them are committed
+            number_of_queries += self._run_concurrently(
+                [
+                    [
+                        (None, (query, {"rows": rows[start : start + batch_size]}))
+                        for query, rows in partition.items()
+                        for start in range(0, len(rows), batch_size)
+                    ]
+                    for partition in round_partitions
+                ],
+                record=False,
+            )
+        if self.checkpoint is not None:
+            self.checkpoint.mark_completed(indexed_queries)
+        return number_of_queries
@@ -1,18 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+
 import requests
 
+from .http_response_cache import HttpResponseCache
+
+
+class TokenBucket:
+    """A thread-safe token bucket that limits how often requests are made.
+    Tokens are added at rate per second, up to capacity.
+    acquire blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last_refill) * self.rate
+                )
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
 
 class WikidataConnection:
-    def __init__(self, email):
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": f"museum-object-flows/1.0 (contact: {email})",
-                "Accept": "application/json",
-            }
-        )
+    """A client for the Wikidata API.
+
+    search_entities and get_entity_properties make one request each.
+    search_entities_many and get_entity_properties_many make their requests
+    concurrently on up to max_workers threads, and get_entity_properties_many
+    fetches entities in batches.
+    All requests share a token bucket, so no more than requests_per_second are made,
+    and requests that fail with a connection error, a timeout, a 429 or a 5xx response are
+    retried up to max_retries times with exponential backoff
+    (backoff_factor * 2 ** attempt seconds, or the server's Retry-After if longer).
+
+    api_url and entity_data_url can be changed to point at a mirror or a test server.
+
+    If a response_cache (an HttpResponseCache) is given, responses are saved in it
+    and served from it while they are fresh, so searches and entities that have been
+    fetched before, in this run or an earlier one, are not downloaded again.
+    Stale responses are revalidated with a conditional request.
+    """
+
+    retry_status_codes = {429, 500, 502, 503, 504}
+    # the most ids wbgetentities accepts in one request
+    max_ids_per_request = 50
+
+    def __init__(
+        self,
+        email,
+        max_workers: int = 4,
+        requests_per_second: float = 5,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        api_url: str = "https://www.wikidata.org/w/api.php",
+        entity_data_url: str = "https://www.wikidata.org/wiki/Special:EntityData",
+        response_cache: HttpResponseCache = None,
+    ):
+        self.headers = {
+            "User-Agent": f"museum-object-flows/1.0 (contact: {email})",
+            "Accept": "application/json",
+        }
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.api_url = api_url
+        self.entity_data_url = entity_data_url
+        self.response_cache = response_cache
+        self.rate_limiter = TokenBucket(requests_per_second, capacity=max_workers)
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # requests.Session is not guaranteed to be thread-safe, so each thread gets one
+        try:
+            return self._local.session
+        except AttributeError:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+            return session
 
     def search_entities(self, search_term, limit=3):
-        url = "https://www.wikidata.org/w/api.php"
         params = {
             "action": "wbsearchentities",
             "format": "json",
@@ -20,9 +102,7 @@ class WikidataConnection:
             "search": search_term,
             "limit": limit,
         }
-        response = self.session.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        response_data = response.json()
+        response_data = self._get(self.api_url, params=params)
         return [
             {
                 "id": item.get("id"),
@@ -32,13 +112,70 @@ class WikidataConnection:
             for item in response_data.get("search", [])
         ]
 
+    def search_entities_many(self, search_terms, limit=3) -> tuple:
+        """Searches for every term concurrently.
+        Returns (a dict of search term -> results, a set of terms whose search failed).
+        Failed terms are reported and left out of the results."""
+        return self._map(
+            lambda search_term: self.search_entities(search_term, limit),
+            search_terms,
+        )
+
     def get_entity_properties(self, qid):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
-        response = self.session.get(url)
-        response.raise_for_status()
-        response_data = response.json()
+        response_data = self._get(f"{self.entity_data_url}/{qid}.json")
         entity = response_data["entities"][qid]
-        claims = entity.get("claims", {})
+        return self._parse_claims(entity.get("claims", {}))
+
+    def get_entity_properties_many(self, qids, property_ids=None) -> tuple:
+        """Fetches the properties of every entity with wbgetentities, asking for
+        claims only and batching up to max_ids_per_request entities per request.
+        The batches are fetched concurrently.
+        If property_ids is given, only those properties are parsed and returned.
+        Returns (a dict of qid -> properties, a set of qids that could not be fetched).
+        Entities that could not be fetched, or that Wikidata reports as missing,
+        are reported and left out of the properties.
+        """
+        qids = sorted(set(qids))
+        batches = [
+            tuple(qids[start : start + self.max_ids_per_request])
+            for start in range(0, len(qids), self.max_ids_per_request)
+        ]
+        properties_by_batch, failed_batches = self._map(
+            lambda batch: self._get_entity_claims(batch, property_ids),
+            batches,
+        )
+        properties = {}
+        for batch_properties in properties_by_batch.values():
+            properties |= batch_properties
+        failed_qids = {qid for batch in failed_batches for qid in batch}
+        missing_qids = {
+            qid for qid in qids if qid not in properties and qid not in failed_qids
+        }
+        if len(missing_qids) > 0:
+            print(f"Entities missing from Wikidata: {', '.join(sorted(missing_qids))}")
+        failed_qids |= missing_qids
+        return {
+            qid: properties[qid] for qid in qids if qid not in failed_qids
+        }, failed_qids
+
+    def _get_entity_claims(self, qids: tuple, property_ids=None) -> dict:
+        params = {
+            "action": "wbgetentities",
+            "format": "json",
+            "ids": "|".join(qids),
+            "props": "claims",
+        }
+        response_data = self._get(self.api_url, params=params)
+        return {
+            qid: self._parse_claims(entity.get("claims", {}), property_ids)
+            for qid, entity in response_data.get("entities", {}).items()
+            if "missing" not in entity
+        }
+
+    @staticmethod
+    def _parse_claims(claims: dict, property_ids=None) -> dict:
+        if property_ids is not None:
+            claims = {pid: claims[pid] for pid in property_ids if pid in claims}
         properties = {}
         for pid, statements in claims.items():
             for stmt in statements:
@@ -56,3 +193,79 @@ class WikidataConnection:
                     except KeyError:
                         continue
         return properties
+
+    def _map(self, function, keys) -> tuple:
+        keys = list(dict.fromkeys(keys))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {key: executor.submit(function, key) for key in keys}
+        results = {}
+        failed_keys = set()
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(str(e))
+                failed_keys.add(key)
+        return results, failed_keys
+
+    def _get(self, url, params=None):
+        if self.response_cache is None:
+            return self._parse_response(self._request(url, params).content)
+        key = HttpResponseCache.make_key(url, params)
+        cached = self.response_cache.get(key)
+        if cached is not None and cached["fresh"]:
+            return json.loads(cached["body"])
+        headers = {}
+        if cached is not None and cached["etag"] is not None:
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached["last_modified"] is not None:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        response = self._request(url, params, headers)
+        if response.status_code == 304 and cached is not None:
+            self.response_cache.refresh(key)
+            return json.loads(cached["body"])
+        # errors are raised before the response is cached, so they are not served again
+        response_data = self._parse_response(response.content)
+        self.response_cache.put(
+            key,
+            response.content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return response_data
+
+    @staticmethod
+    def _parse_response(content: bytes) -> dict:
+        # the API reports errors such as a bad parameter with a 200 response
+        response_data = json.loads(content)
+        if "error" in response_data:
+            raise Exception(f"Wikidata API error: {response_data['error']}")
+        return response_data
+
+    def _request(self, url, params=None, headers=None):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(
+                    url, params=params, headers=headers, timeout=10
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff_factor * 2**attempt)
+                continue
+            if (
+                response.status_code in self.retry_status_codes
+                and attempt < self.max_retries
+            ):
+                time.sleep(self._get_retry_delay(response, attempt))
+                continue
+            response.raise_for_status()
+            return response
+
+    def _get_retry_delay(self, response, attempt: int) -> float:
+        delay = self.backoff_factor * 2**attempt
+        try:
+            return max(delay, float(response.headers.get("Retry-After", 0)))
+        except ValueError:
+            return delay
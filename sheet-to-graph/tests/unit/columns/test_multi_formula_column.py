@@ -0,0 +1,36 @@
+from sheet_to_graph import Column, Table
+from sheet_to_graph.columns import FormulaColumn, MultiFormulaColumn
+
+
+def test_formula_is_evaluated_once_per_row_for_all_sub_columns():
+    calls = []
+
+    def get_coordinates(table, row_index):
+        calls.append(row_index)
+        return {"lat": f"lat-{table[row_index]['place']}", "long": "0"}
+
+    tab = Table(
+        "test",
+        [
+            Column("place"),
+            MultiFormulaColumn(
+                "coordinates",
+                formula=get_coordinates,
+                sub_columns=[Column("latitude"), Column("long")],
+                outputs={"latitude": "lat"},
+            ),
+            FormulaColumn(
+                "label",
+                formula=lambda table, row_index: table[row_index]["latitude"] + "!",
+            ),
+        ],
+    )
+    tab.import_from_list_of_dicts([{"place": "a"}, {"place": "b"}])
+
+    assert calls == [0, 1]
+    assert tab.rows == [
+        {"place": "a", "latitude": "lat-a", "long": "0", "label": "lat-a!"},
+        {"place": "b", "latitude": "lat-b", "long": "0", "label": "lat-b!"},
+    ]
+    assert list(tab.columns) == ["place", "latitude", "long", "label"]
+    assert tab.columns["latitude"].values == ["lat-a", "lat-b"]
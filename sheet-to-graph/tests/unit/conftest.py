@@ -0,0 +1,31 @@
+import pytest
+
+ONSPD_HEADER = "pcd,pcd2,pcds,lat,long,rgn,oslaua\n"
+
+
+@pytest.fixture
+def postcode_directory(tmp_path):
+    multi_csv = tmp_path / "Data" / "multi_csv"
+    multi_csv.mkdir(parents=True)
+    (multi_csv / "ONSPD_FEB_2024_UK_AB.csv").write_text(
+        ONSPD_HEADER
+        + "AB1 0AA,AB1  0AA,AB1 0AA,57.10,-2.24,S99999999,S12000033\n"
+        + "AB1 0AB,AB1  0AB,AB1 0AB,57.20,-2.26,S99999999,S12000033\n"
+        + "AB10 1AB,AB10 1AB,AB10 1AB,57.15,-2.10,S99999999,S12000033\n",
+        encoding="utf-8",
+    )
+    (multi_csv / "ONSPD_FEB_2024_UK_WC.csv").write_text(
+        ONSPD_HEADER + "WC1E7HX,WC1E 7HX,WC1E 7HX,51.52,-0.13,E12000007,E09000007\n",
+        encoding="utf-8",
+    )
+    documents = tmp_path / "Documents"
+    documents.mkdir()
+    (documents / "LAD23_LAU121_ITL321_ITL221_ITL121_UK_LU.csv").write_text(
+        "\ufeffLAD23CD,LAD23NM,ITL121NM\n"
+        + "S12000033,Aberdeen City,Scotland\n"
+        + "E09000007,Camden,London\n"
+        + 'E06000023,"Bristol, City of",South West (England)\n'
+        + 'E06000023,"Bristol, City of",South West (England)\n',
+        encoding="utf-8",
+    )
+    return tmp_path
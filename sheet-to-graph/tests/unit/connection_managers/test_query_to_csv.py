@@ -0,0 +1,73 @@
+import csv
+import json
+
+from sheet_to_graph import QueryMetrics
+from sheet_to_graph.connection_managers import QueryToCsv
+
+
+class FakeNeo4jConnection:
+    def __init__(self, records):
+        self.records = records
+        self.metrics = QueryMetrics()
+        self.profiled_queries = []
+        self.fetch_sizes = []
+
+    def stream_query(self, query, arguments=None, fetch_size=1000, on_profile=None):
+        self.fetch_sizes.append(fetch_size)
+        for record in self.records:
+            yield record
+        if on_profile is not None:
+            self.profiled_queries.append(query)
+            on_profile({"db_hits": 7, "plan": {"operatorType": "Filter"}})
+
+
+def make_query_to_csv(tmp_path, records, **kwargs):
+    query_to_csv = QueryToCsv(
+        {"results/people": "MATCH (n) RETURN n.name AS name"},
+        output_directory_name=str(tmp_path),
+        **kwargs,
+    )
+    connection = FakeNeo4jConnection(records)
+    query_to_csv._initialize_neo4j_connection = lambda: connection
+    (tmp_path / "results").mkdir()
+    return query_to_csv, connection
+
+
+def test_results_are_streamed_to_csv(tmp_path):
+    query_to_csv, connection = make_query_to_csv(
+        tmp_path, [{"name": "a"}, {"name": "b"}], fetch_size=50
+    )
+
+    query_to_csv.make_queries_and_save_outputs()
+
+    with open(tmp_path / "results" / "people.csv", newline="") as f:
+        assert list(csv.reader(f)) == [["name"], ["a"], ["b"]]
+    assert connection.profiled_queries == []
+    assert connection.fetch_sizes == [50]
+
+
+def test_no_file_is_written_without_results(tmp_path):
+    query_to_csv, connection = make_query_to_csv(tmp_path, [])
+
+    query_to_csv.make_queries_and_save_outputs()
+
+    assert not (tmp_path / "results" / "people.csv").exists()
+
+
+def test_selected_queries_are_profiled(tmp_path):
+    query_to_csv, connection = make_query_to_csv(
+        tmp_path,
+        [{"name": "a"}],
+        profile_query_names=["results/people"],
+        profile_directory_name=str(tmp_path / "profiles"),
+    )
+
+    query_to_csv.make_queries_and_save_outputs()
+
+    assert connection.profiled_queries == ["MATCH (n) RETURN n.name AS name"]
+    with open(tmp_path / "profiles" / "results" / "people.json") as f:
+        profile = json.load(f)
+    assert profile["query_name"] == "results/people"
+    assert profile["db_hits"] == 7
+    assert profile["plan"] == {"operatorType": "Filter"}
+    assert (tmp_path / "results" / "people.csv").exists()
@@ -0,0 +1,178 @@
+import neo4j
+import pytest
+
+from sheet_to_graph.connection_managers import TablesToGraph
+
+
+class DummyColumn:
+    def __init__(self, name, *, primary_key=False, type_label=None, property_of=None):
+        self.name = name
+        self.primary_key = primary_key
+        self.type_label = type_label
+        self.property_of = property_of
+        self.ignore = False
+        self.type_label_of = None
+        self.relation_from = None
+        self.relation_to = None
+
+
+class DummyTable:
+    def __init__(self, *columns, rows=()):
+        self.name = "table"
+        self.columns = {column.name: column for column in columns}
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeMetrics:
+    def print_summary(self):
+        pass
+
+
+class FakeNeo4jConnection:
+    def __init__(self, failing_labels=()):
+        self.failing_labels = failing_labels
+        self.queries = []
+        self.metrics = FakeMetrics()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def run_write_queries(self, queries, transaction_size=1000, **kwargs):
+        queries = list(queries)
+        for query, arguments in queries:
+            self.run_query(query, arguments)
+        if kwargs.get("on_commit") is not None:
+            kwargs["on_commit"](queries)
+        return len(queries)
+
+    def run_query(self, query, arguments=None):
+        if "CONSTRAINT" in query and any(
+            f":{label})" in query for label in self.failing_labels
+        ):
+            raise neo4j.exceptions.DatabaseError("duplicate keys")
+        self.queries.append(query)
+        return []
+
+
+def make_tables_to_graph():
+    return TablesToGraph(
+        DummyTable(
+            DummyColumn("type_name", primary_key=True, type_label="Type"),
+            DummyColumn("sub_type_of"),
+        ),
+        DummyTable(DummyColumn("type_name", primary_key=True, type_label="Type")),
+        DummyTable(
+            DummyColumn("actor_id", primary_key=True, type_label="Actor"),
+            DummyColumn("place_id", primary_key=True, type_label="Place"),
+        ),
+    )
+
+
+def test_node_keys_come_from_primary_key_columns():
+    assert make_tables_to_graph().get_node_keys() == [
+        ("Type", "type_name"),
+        ("Actor", "actor_id"),
+        ("Place", "place_id"),
+    ]
+
+
+def test_create_constraints_falls_back_to_an_index():
+    connection = FakeNeo4jConnection(failing_labels=["Actor"])
+    make_tables_to_graph().create_constraints(connection)
+    assert connection.queries == [
+        "CREATE CONSTRAINT type_type_name_unique IF NOT EXISTS "
+        "FOR (node:Type) REQUIRE node.type_name IS UNIQUE",
+        "CREATE INDEX actor_actor_id_index IF NOT EXISTS "
+        "FOR (node:Actor) ON (node.actor_id)",
+        "CREATE CONSTRAINT place_place_id_unique IF NOT EXISTS "
+        "FOR (node:Place) REQUIRE node.place_id IS UNIQUE",
+    ]
+
+
+def test_inference_queries_turn_off_uploading_the_difference(tmp_path):
+    manifest_file_name = tmp_path / "manifest.json"
+    manifest_file_name.write_text('{"nodes": {}, "relationships": {}}')
+    tables_to_graph = TablesToGraph(
+        inference_queries=["MATCH (n) DETACH DELETE n"],
+        query_file_name=str(tmp_path / "queries.txt"),
+        manifest_file_name=str(manifest_file_name),
+    )
+
+    tables_to_graph.translate_tables_into_cypher_queries()
+
+    assert tables_to_graph.manifest is None
+    assert not manifest_file_name.exists()
+
+
+def test_keys_shared_with_other_node_types_get_an_index():
+    connection = FakeNeo4jConnection()
+    TablesToGraph(
+        DummyTable(
+            DummyColumn("type_name"),
+            DummyColumn("type_id", primary_key=True, type_label="Type"),
+        ),
+        DummyTable(DummyColumn("type_name", primary_key=True, type_label="Type")),
+    ).create_constraints(connection)
+    assert connection.queries == [
+        "CREATE CONSTRAINT type_type_id_unique IF NOT EXISTS "
+        "FOR (node:Type) REQUIRE node.type_id IS UNIQUE",
+        "CREATE INDEX type_type_name_index IF NOT EXISTS "
+        "FOR (node:Type) ON (node.type_name)",
+    ]
+
+
+def test_literal_queries_keep_nodes_with_duplicate_keys(tmp_path):
+    connection = FakeNeo4jConnection()
+    tables_to_graph = TablesToGraph(
+        DummyTable(
+            DummyColumn("actor_id", primary_key=True, type_label="Actor"),
+            DummyColumn("actor_name", property_of="actor_id"),
+            rows=[
+                {"actor_id": "1", "actor_name": "Smith"},
+                {"actor_id": "1", "actor_name": "Jones"},
+            ],
+        ),
+        query_file_name=str(tmp_path / "queries.txt"),
+    )
+    tables_to_graph._initialize_neo4j_connection = lambda: connection
+
+    tables_to_graph.translate_tables_into_cypher_queries()
+    tables_to_graph.upload_to_neo4j_database()
+
+    assert [query.strip() for query in connection.queries] == [
+        "CREATE INDEX actor_actor_id_index IF NOT EXISTS "
+        "FOR (node:Actor) ON (node.actor_id)",
+        'MERGE (node:Actor {actor_id: "1", actor_name: "Smith"})',
+        'MERGE (node:Actor {actor_id: "1", actor_name: "Jones"})',
+    ]
+
+
+def test_inference_queries_are_not_run_again_on_resume(tmp_path):
+    class CrashingNeo4jConnection(FakeNeo4jConnection):
+        def close(self):
+            raise neo4j.exceptions.ServiceUnavailable("connection lost")
+
+    tables_to_graph = TablesToGraph(
+        inference_queries=["MATCH (n:Actor) CREATE (n)-[:IS]->(:Type)"],
+        query_file_name=str(tmp_path / "queries.txt"),
+        checkpoint_file_name=str(tmp_path / "checkpoint.txt"),
+    )
+    tables_to_graph.queries = [("MERGE (node:Actor {actor_id: 1})", None)]
+
+    connection = CrashingNeo4jConnection()
+    tables_to_graph._initialize_neo4j_connection = lambda: connection
+    with pytest.raises(neo4j.exceptions.ServiceUnavailable):
+        tables_to_graph.upload_to_neo4j_database()
+    assert connection.queries[-1] == "MATCH (n:Actor) CREATE (n)-[:IS]->(:Type)"
+
+    connection = FakeNeo4jConnection()
+    tables_to_graph._initialize_neo4j_connection = lambda: connection
+    tables_to_graph.upload_to_neo4j_database()
+    assert connection.queries == []
+    assert not (tmp_path / "checkpoint.txt").exists()
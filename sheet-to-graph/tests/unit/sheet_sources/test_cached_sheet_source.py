@@ -0,0 +1,71 @@
+from sheet_to_graph.sheet_sources import CsvSheetSource, make_sheet_source
+from sheet_to_graph.sheet_sources.cached_sheet_source import CachedSheetSource
+
+
+class CountingSource:
+    """A sheet source that records how often its rows are read."""
+
+    def __init__(self, rows, version):
+        self.rows = rows
+        self.version = version
+        self.reads = 0
+
+    def get_rows(self):
+        self.reads += 1
+        return self.rows
+
+    def get_version(self):
+        return self.version
+
+
+def test_unchanged_sheet_is_served_from_disk(tmp_path):
+    source = CountingSource([["a", "b"], ["1", "2"]], version="v1")
+
+    first = CachedSheetSource(source, str(tmp_path), "sheet").get_rows()
+    second = CachedSheetSource(source, str(tmp_path), "sheet").get_rows()
+
+    assert first == [["a", "b"], ["1", "2"]]
+    assert second == (("a", "b"), ("1", "2"))
+    assert source.reads == 1
+
+
+def test_changed_version_reads_the_source_again(tmp_path):
+    source = CountingSource([["a"]], version="v1")
+    CachedSheetSource(source, str(tmp_path), "sheet").get_rows()
+
+    source.rows = [["b"]]
+    source.version = "v2"
+    rows = CachedSheetSource(source, str(tmp_path), "sheet").get_rows()
+
+    assert rows == [["b"]]
+    assert source.reads == 2
+
+
+def test_sources_without_a_version_are_not_cached(tmp_path):
+    source = CountingSource([["a"]], version=None)
+
+    CachedSheetSource(source, str(tmp_path), "sheet").get_rows()
+    CachedSheetSource(source, str(tmp_path), "sheet").get_rows()
+
+    assert source.reads == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_make_sheet_source_wraps_sources_when_cache_directory_is_set(tmp_path):
+    csv_path = tmp_path / "test.csv"
+    csv_path.write_text("col1,col2\n1,2\n", encoding="utf-8")
+    cache_directory = tmp_path / "cache"
+
+    source = make_sheet_source(
+        {
+            "backend": "csv",
+            "file": str(csv_path),
+            "cache_directory": str(cache_directory),
+        }
+    )
+    uncached_source = make_sheet_source({"backend": "csv", "file": str(csv_path)})
+
+    assert isinstance(source, CachedSheetSource)
+    assert isinstance(uncached_source, CsvSheetSource)
+    assert source.get_rows() == [["col1", "col2"], ["1", "2"]]
+    assert len(list(cache_directory.iterdir())) == 1
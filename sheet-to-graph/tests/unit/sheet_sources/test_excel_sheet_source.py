@@ -1,8 +1,17 @@
+import zipfile
+
 import openpyxl
+import pytest
 
 from sheet_to_graph.sheet_sources.excel_sheet_source import ExcelSheetSource
 
 
+@pytest.fixture(autouse=True)
+def close_shared_workbooks():
+    yield
+    ExcelSheetSource.close_workbooks()
+
+
 def test_excel_sheet_source_reads_xlsx_and_skips_empty_rows(tmp_path):
     xlsx_path = tmp_path / "test.xlsx"
 
@@ -21,3 +30,53 @@ def test_excel_sheet_source_reads_xlsx_and_skips_empty_rows(tmp_path):
         ["col1", "col2"],
         ["1", "2"],
     ]
+
+
+def test_excel_sheet_sources_share_one_read_only_workbook(tmp_path, monkeypatch):
+    xlsx_path = tmp_path / "test.xlsx"
+
+    wb = openpyxl.Workbook()
+    first = wb.active
+    first.title = "First"
+    first.append(["a", "b"])
+    second = wb.create_sheet("Second")
+    second.append(["c", "d"])
+    wb.save(xlsx_path)
+
+    load_calls = []
+    load_workbook = openpyxl.load_workbook
+
+    def counting_load_workbook(filename, **kwargs):
+        load_calls.append(kwargs)
+        return load_workbook(filename, **kwargs)
+
+    monkeypatch.setattr(openpyxl, "load_workbook", counting_load_workbook)
+
+    first_rows = ExcelSheetSource(str(xlsx_path), "First").get_rows()
+    second_rows = list(ExcelSheetSource(str(xlsx_path), "Second").iter_rows())
+
+    assert first_rows == [["a", "b"]]
+    assert second_rows == [["c", "d"]]
+    assert load_calls == [{"read_only": True}]
+
+
+def test_excel_sheet_source_ignores_a_stale_sheet_dimension(tmp_path):
+    saved_path = tmp_path / "saved.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.title = "DataSheet"
+    wb.active.append(["col1", "col2"])
+    wb.active.append([1, 2])
+    wb.save(saved_path)
+    # record the sheet's size as a single cell, as some writers leave it
+    xlsx_path = tmp_path / "test.xlsx"
+    with zipfile.ZipFile(saved_path) as saved, zipfile.ZipFile(xlsx_path, "w") as f:
+        for item in saved.infolist():
+            data = saved.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                assert b'<dimension ref="A1:B2" />' in data
+                data = data.replace(b'ref="A1:B2"', b'ref="A1"')
+            f.writestr(item, data)
+
+    rows = ExcelSheetSource(str(xlsx_path), "DataSheet").get_rows()
+
+    assert rows == [["col1", "col2"], ["1", "2"]]
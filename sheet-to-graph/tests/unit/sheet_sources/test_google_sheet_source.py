@@ -99,3 +99,83 @@ def test_google_sheet_source_returns_empty_list_when_no_values():
 
     assert rows == []
     assert fake_values.calls == [("sid", "Sheet1!A1:B2")]
+
+
+def test_batch_get_rows_maps_value_ranges_to_sheet_names():
+    """batch_get_rows should make one batchGet call and key results by sheet name."""
+
+    class FakeRequest:
+        def __init__(self, result):
+            self._result = result
+
+        def execute(self):
+            return self._result
+
+    class FakeValues:
+        def __init__(self):
+            self.calls = []
+
+        def batchGet(self, spreadsheetId, ranges, majorDimension):
+            self.calls.append((spreadsheetId, ranges, majorDimension))
+            return FakeRequest(
+                {
+                    "valueRanges": [
+                        {"range": "'Sheet 1'!A1:B2", "values": [["a", "b"]]},
+                        {"range": "Sheet2!A1:Z1000"},
+                    ]
+                }
+            )
+
+    class FakeSpreadsheets:
+        def __init__(self, values):
+            self._values = values
+
+        def values(self):
+            return self._values
+
+    class FakeService:
+        def __init__(self, spreadsheets):
+            self._spreadsheets = spreadsheets
+
+        def spreadsheets(self):
+            return self._spreadsheets
+
+    fake_values = FakeValues()
+    fake_service = FakeService(FakeSpreadsheets(fake_values))
+
+    rows = GoogleSheetSource.batch_get_rows(fake_service, "sid", ["Sheet 1", "Sheet2"])
+
+    assert rows == {"Sheet 1": [["a", "b"]], "Sheet2": []}
+    assert fake_values.calls == [("sid", ["Sheet 1", "Sheet2"], "ROWS")]
+
+
+def test_google_sheet_source_version_comes_from_drive_metadata():
+    """get_version should use Drive modifiedTime and version, or None without Drive."""
+
+    class FakeRequest:
+        def execute(self):
+            return {"modifiedTime": "2025-08-01T10:00:00.000Z", "version": "42"}
+
+    class FakeFiles:
+        def __init__(self):
+            self.calls = []
+
+        def get(self, fileId, fields):
+            self.calls.append((fileId, fields))
+            return FakeRequest()
+
+    class FakeDriveService:
+        def __init__(self, files):
+            self._files = files
+
+        def files(self):
+            return self._files
+
+    fake_files = FakeFiles()
+    source = GoogleSheetSource(
+        None, "sid", "Sheet1", drive_service=FakeDriveService(fake_files)
+    )
+
+    assert source.get_version() == "sid:2025-08-01T10:00:00.000Z:42"
+    assert fake_files.calls == [("sid", "modifiedTime, version")]
+    assert GoogleSheetSource(None, "sid", "Sheet1").get_version() is None
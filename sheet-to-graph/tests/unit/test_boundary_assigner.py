@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("shapely")
+
+from sheet_to_graph import BoundaryAssigner
+
+
+def square(x, y, size):
+    return {
+        "type": "Polygon",
+        "coordinates": [
+            [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+        ],
+    }
+
+
+@pytest.fixture
+def boundaries_file(tmp_path):
+    boundaries = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"LAD23CD": "E1", "LAD23NM": "West"},
+                "geometry": square(0, 0, 1000),
+            },
+            {
+                "type": "Feature",
+                "properties": {"LAD23CD": "E2", "LAD23NM": "East"},
+                "geometry": square(1000, 0, 1000),
+            },
+        ],
+    }
+    file_name = tmp_path / "boundaries.geojson"
+    file_name.write_text(json.dumps(boundaries), encoding="utf-8")
+    return str(file_name)
+
+
+def test_points_are_assigned_the_boundary_containing_them(boundaries_file):
+    boundary_assigner = BoundaryAssigner(boundaries_file)
+    assert boundary_assigner.assign_local_authorities(
+        [500, 1500, 1000, 2500], [500, 500, 500, 500]
+    ) == ["E1", "E2", "E1", None]
+
+
+def test_many_points_are_assigned_in_one_call(boundaries_file):
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, 3000, 10000)
+    ys = rng.uniform(0, 1000, 10000)
+    codes = BoundaryAssigner(boundaries_file).assign_local_authorities(xs, ys)
+    expected = np.where(xs <= 1000, "E1", np.where(xs <= 2000, "E2", None))
+    assert codes == list(expected)
@@ -0,0 +1,34 @@
+from bng_latlon import OSGB36toWGS84, WGS84toOSGB36
+import numpy as np
+import pytest
+
+from sheet_to_graph.british_national_grid import osgb36_to_wgs84, wgs84_to_osgb36
+
+
+def test_wgs84_to_osgb36_matches_bng_latlon():
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(49.8, 60.9, 500)
+    longs = rng.uniform(-8.0, 1.8, 500)
+    xs, ys = wgs84_to_osgb36(lats, longs)
+    expected = np.array([WGS84toOSGB36(lat, long) for lat, long in zip(lats, longs)])
+    # bng_latlon rounds to 4 decimal places
+    np.testing.assert_allclose(xs, expected[:, 0], rtol=0, atol=1e-4)
+    np.testing.assert_allclose(ys, expected[:, 1], rtol=0, atol=1e-4)
+
+
+def test_osgb36_to_wgs84_matches_bng_latlon():
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, 700000, 500)
+    ys = rng.uniform(0, 1250000, 500)
+    lats, longs = osgb36_to_wgs84(xs, ys)
+    expected = np.array([OSGB36toWGS84(x, y) for x, y in zip(xs, ys)])
+    # bng_latlon rounds to 6 decimal places
+    np.testing.assert_allclose(lats, expected[:, 0], rtol=0, atol=1e-6)
+    np.testing.assert_allclose(longs, expected[:, 1], rtol=0, atol=1e-6)
+
+
+def test_scalars_are_converted():
+    x, y = wgs84_to_osgb36(51.4778, -0.0014)
+    assert (float(x), float(y)) == pytest.approx((538890.1053, 177320.4965), abs=1e-4)
+    lat, long = osgb36_to_wgs84(538890, 177320)
+    assert (float(lat), float(long)) == pytest.approx((51.477795, -0.001402), abs=1e-6)
@@ -0,0 +1,190 @@
+import csv
+
+from sheet_to_graph import BulkImportTranslator
+
+
+class DummyColumn:
+    def __init__(
+        self,
+        name,
+        *,
+        primary_key=False,
+        type_label=None,
+        ignore=False,
+        type_label_of=None,
+        property_of=None,
+        relation_from=None,
+        relation_to=None,
+        reference_column=None,
+    ):
+        self.name = name
+        self.primary_key = primary_key
+        self.type_label = type_label
+        self.ignore = ignore
+        self.type_label_of = type_label_of
+        self.property_of = property_of
+        self.relation_from = relation_from
+        self.relation_to = relation_to
+        self.reference_column = reference_column
+
+
+class DummyTable:
+    def __init__(self, columns, rows):
+        self.columns = {column.name: column for column in columns}
+        self._rows = rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+def make_tables():
+    place_id = DummyColumn("place_id", primary_key=True, type_label="Place")
+    places = DummyTable(
+        [place_id, DummyColumn("lat", property_of="place_id")],
+        [{"place_id": "p1", "lat": 51.5}, {"place_id": "p2", "lat": None}],
+    )
+    actor_id = DummyColumn("actor_id", primary_key=True, type_label="Actor")
+    actors = DummyTable(
+        [
+            actor_id,
+            DummyColumn("kind", type_label_of="actor_id"),
+            DummyColumn("name", property_of="actor_id"),
+            DummyColumn("aliases", property_of="actor_id"),
+            DummyColumn("is_uk_based", property_of="actor_id"),
+            DummyColumn(
+                "has_location",
+                type_label="HAS_LOCATION",
+                relation_from="actor_id",
+                reference_column=place_id,
+            ),
+            DummyColumn("since", property_of="has_location"),
+        ],
+        [
+            {
+                "actor_id": "a1",
+                "kind": "Museum",
+                "name": 'The "Big" Museum',
+                "aliases": ["Big", "BM"],
+                "is_uk_based": True,
+                "has_location": "p1",
+                "since": 1990,
+            },
+            {
+                "actor_id": "a1",
+                "kind": "",
+                "name": None,
+                "aliases": None,
+                "is_uk_based": None,
+                "has_location": "p1",
+                "since": 1990,
+            },
+            {
+                "actor_id": "a2",
+                "kind": "",
+                "name": "Nowhere",
+                "aliases": [],
+                "is_uk_based": False,
+                "has_location": "p9",
+                "since": None,
+            },
+        ],
+    )
+    return places, actors
+
+
+def read_csv(file_name):
+    with open(file_name, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_nodes_are_written_with_id_spaces_typed_headers_and_labels(tmp_path):
+    translator = BulkImportTranslator(str(tmp_path))
+
+    file_names = translator.translate_tables(*make_tables())
+
+    places, actors = [read_csv(file_name) for file_name in file_names["nodes"]]
+    assert places == [
+        ["place_id:ID(Place_place_id)", "lat:double", ":LABEL"],
+        ["p1", "51.5", "Place"],
+        ["p2", "", "Place"],
+    ]
+    assert actors == [
+        [
+            "actor_id:ID(Actor_actor_id)",
+            "name:string",
+            "aliases:string[]",
+            "is_uk_based:boolean",
+            ":LABEL",
+        ],
+        ["a1", 'The "Big" Museum', "Big;BM", "true", "Actor;Museum"],
+        ["a2", "Nowhere", "", "false", "Actor"],
+    ]
+
+
+def test_relationships_to_missing_nodes_are_left_out(tmp_path):
+    translator = BulkImportTranslator(str(tmp_path))
+
+    file_names = translator.translate_tables(*make_tables())
+
+    assert [read_csv(file_name) for file_name in file_names["relationships"]] == [
+        [
+            [":START_ID(Actor_actor_id)", ":END_ID(Place_place_id)", "since", ":TYPE"],
+            ["a1", "p1", "1990", "HAS_LOCATION"],
+        ]
+    ]
+
+
+def test_import_command_lists_every_file(tmp_path):
+    translator = BulkImportTranslator(str(tmp_path))
+    file_names = {"nodes": ["n1.csv", "n2.csv"], "relationships": ["r1.csv"]}
+
+    command = translator.get_import_command(file_names, database="museums")
+
+    assert command.startswith(
+        "neo4j-admin database import full"
+        " --nodes=n1.csv --nodes=n2.csv --relationships=r1.csv"
+    )
+    assert command.endswith(" museums")
+
+
+def read_as_neo4j_admin(file_name, array_delimiter):
+    """Reads a node file (whose values contain no commas or quotes) as
+    neo4j-admin import would: an empty field is null, and a quoted one a string."""
+    with open(file_name, newline="", encoding="utf-8") as f:
+        header, *rows = [line.rstrip("\r\n").split(",") for line in f]
+    header = [name.strip('"') for name in header]
+    nodes = []
+    for row in rows:
+        node = {}
+        for name, field in zip(header, row):
+            if field == "" or name == ":LABEL":
+                continue
+            value = field[1:-1]
+            if name.endswith("[]"):
+                value = value.split(array_delimiter)
+            node[name.split(":")[0]] = value
+        nodes.append(node)
+    return nodes
+
+
+def test_nodes_are_imported_with_the_properties_cypher_gives_them(tmp_path):
+    actors = DummyTable(
+        [
+            DummyColumn("actor_id", primary_key=True, type_label="Actor"),
+            DummyColumn("name", property_of="actor_id"),
+            DummyColumn("aliases", property_of="actor_id"),
+        ],
+        [
+            {"actor_id": "a1", "name": "", "aliases": ["a;b", "c"]},
+            {"actor_id": "a2", "name": None, "aliases": ["d"]},
+        ],
+    )
+    translator = BulkImportTranslator(str(tmp_path))
+
+    file_names = translator.translate_tables(actors)
+
+    [(_, parameters)] = translator.translate_tables_in_batches(actors)
+    assert read_as_neo4j_admin(file_names["nodes"][0], translator.array_delimiter) == [
+        {"actor_id": row["key"], **row["properties"]} for row in parameters["rows"]
+    ]
+    assert translator.array_delimiter == "|"
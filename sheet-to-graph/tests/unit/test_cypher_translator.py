@@ -166,3 +166,194 @@ def test_relationship_skips_empty_values(tmp_path: Path):
 
     assert len(node_lines) == 2
     assert len(rel_lines) == 1
+
+
+def make_people_table(rows):
+    rows = [{"kind": "", "friend_id": "", "since": None} | row for row in rows]
+    person_id = DummyColumn("person_id", primary_key=True, type_label="Person")
+    columns = {
+        "person_id": person_id,
+        "kind": DummyColumn("kind", type_label_of="person_id"),
+        "name": DummyColumn("name", property_of="person_id"),
+        "friend_id": DummyColumn(
+            "friend_id",
+            type_label="FRIENDS_WITH",
+            relation_from="person_id",
+            reference_column=person_id,
+        ),
+        "since": DummyColumn("since", property_of="friend_id"),
+    }
+    return DummyTable(columns, rows)
+
+
+def test_batches_dedupe_nodes_by_label_and_key():
+    table = make_people_table(
+        [
+            {"person_id": "1", "kind": "", "name": "Alice"},
+            {"person_id": "1", "kind": "", "name": None},
+            {"person_id": "2", "kind": "", "name": "Bob"},
+        ]
+    )
+    translator = CypherTranslator()
+
+    node_queries = [
+        (query, parameters)
+        for query, parameters in translator.translate_tables_in_batches(table)
+        if "MERGE (node" in query
+    ]
+
+    assert node_queries == [
+        (
+            "UNWIND $rows AS row MERGE (node:Person {person_id: row.key})"
+            " SET node += row.properties",
+            {
+                "rows": [
+                    {"key": "1", "properties": {"name": "Alice"}},
+                    {"key": "2", "properties": {"name": "Bob"}},
+                ]
+            },
+        )
+    ]
+
+
+def test_batches_group_rows_by_labels_and_batch_size():
+    table = make_people_table(
+        [
+            {"person_id": str(n), "kind": "Curator" if n < 3 else "", "name": None}
+            for n in range(5)
+        ]
+    )
+    translator = CypherTranslator()
+
+    batches = list(translator.translate_tables_in_batches(table, batch_size=2))
+
+    assert [query.split(" SET ")[1] for query, _ in batches] == [
+        "node:Curator",
+        "node:Curator",
+        "node += row.properties",
+    ]
+    assert [len(parameters["rows"]) for _, parameters in batches] == [2, 1, 2]
+
+
+def test_batches_merge_relationships_after_nodes(tmp_path: Path):
+    table = make_people_table(
+        [
+            {"person_id": "1", "name": None, "friend_id": "2", "since": "2020"},
+            {"person_id": "1", "name": None, "friend_id": "2", "since": "2020"},
+            {"person_id": "3", "name": None, "friend_id": "", "since": None},
+        ]
+    )
+    output_file = tmp_path / "batches.jsonl"
+    translator = CypherTranslator(str(output_file))
+
+    batches = list(translator.translate_tables_in_batches(table))
+
+    query, parameters = batches[-1]
+    assert query == (
+        "UNWIND $rows AS row"
+        " MATCH (from:Person {person_id: row.from})"
+        " MATCH (to:Person {person_id: row.to})"
+        " MERGE (from)-[:FRIENDS_WITH {since: row.properties.since}]->(to)"
+    )
+    assert parameters == {
+        "rows": [{"from": "1", "to": "2", "properties": {"since": "2020"}}]
+    }
+    saved = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert saved == [
+        {"query": query, "parameters": parameters} for query, parameters in batches
+    ]
+
+
+def test_diff_without_a_manifest_uploads_everything():
+    table = make_people_table(
+        [
+            {"person_id": "1", "name": "Alice", "friend_id": "2", "since": "2020"},
+            {"person_id": "2", "name": "Bob"},
+        ]
+    )
+    translator = CypherTranslator()
+
+    queries, manifest = translator.translate_tables_as_diff(table)
+
+    assert queries == list(translator.translate_tables_in_batches(table))
+    assert len(manifest["nodes"]) == 2
+    assert len(manifest["relationships"]) == 1
+
+
+def test_diff_against_the_same_tables_is_empty():
+    rows = [
+        {"person_id": "1", "name": "Alice", "friend_id": "2", "since": "2020"},
+        {"person_id": "2", "name": "Bob"},
+    ]
+    translator = CypherTranslator()
+    _, manifest = translator.translate_tables_as_diff(make_people_table(rows))
+    manifest = json.loads(json.dumps(manifest))
+
+    queries, new_manifest = translator.translate_tables_as_diff(
+        make_people_table(rows), manifest=manifest
+    )
+
+    assert queries == []
+    assert new_manifest == manifest
+
+
+def test_diff_sends_only_changes():
+    translator = CypherTranslator()
+    _, manifest = translator.translate_tables_as_diff(
+        make_people_table(
+            [
+                {"person_id": "1", "kind": "Curator", "name": "Alice"}
+                | {"friend_id": "2", "since": "2020"},
+                {"person_id": "2", "name": "Bob"},
+                {"person_id": "3", "name": "Carol"},
+            ]
+        )
+    )
+
+    queries, _ = translator.translate_tables_as_diff(
+        make_people_table(
+            [
+                {"person_id": "1", "name": None, "friend_id": "2", "since": "2021"},
+                {"person_id": "2", "name": "Bob"},
+                {"person_id": "4", "name": "Dan"},
+            ]
+        ),
+        manifest=json.loads(json.dumps(manifest)),
+    )
+
+    assert queries == [
+        (
+            "UNWIND $rows AS row"
+            " MATCH (from:Person {person_id: row.from})"
+            "-[relationship:FRIENDS_WITH]->(to:Person {person_id: row.to})"
+            " WHERE properties(relationship) = row.properties DELETE relationship",
+            {"rows": [{"from": "1", "to": "2", "properties": {"since": "2020"}}]},
+        ),
+        (
+            "UNWIND $rows AS row MATCH (node:Person {person_id: row.key})"
+            " DETACH DELETE node",
+            {"rows": [{"key": "3"}]},
+        ),
+        (
+            "UNWIND $rows AS row MERGE (node:Person {person_id: row.key})"
+            " SET node += row.properties",
+            {
+                "rows": [
+                    {"key": "1", "properties": {}},
+                    {"key": "4", "properties": {"name": "Dan"}},
+                ]
+            },
+        ),
+        (
+            "UNWIND $rows AS row MATCH (node:Person {person_id: row.key})"
+            " REMOVE node:Curator REMOVE node.name",
+            {"rows": [{"key": "1"}]},
+        ),
+        (
+            "UNWIND $rows AS row"
+            " MATCH (from:Person {person_id: row.from})"
+            " MATCH (to:Person {person_id: row.to})"
+            " MERGE (from)-[:FRIENDS_WITH {since: row.properties.since}]->(to)",
+            {"rows": [{"from": "1", "to": "2", "properties": {"since": "2021"}}]},
+        ),
+    ]
@@ -1,7 +1,9 @@
 import json
+import openpyxl
 import pytest
 
 from sheet_to_graph.file_loader import FileLoader
+from sheet_to_graph.sheet_sources import ExcelSheetSource
 
 
 def test_from_config_file_loads_values(tmp_path):
@@ -44,7 +46,9 @@ def test_get_sheet_as_list_of_lists_delegates_to_sheet_source_factory(monkeypatc
         def get_rows(self):
             return self._rows
 
-    def fake_make_sheet_source(sheet_config, *, google_service=None):
+    def fake_make_sheet_source(
+        sheet_config, *, google_service=None, drive_service=None
+    ):
         captured["sheet_config"] = sheet_config
         captured["google_service"] = google_service
         return DummySource([["ok"]])
@@ -57,7 +61,7 @@ def test_get_sheet_as_list_of_lists_delegates_to_sheet_source_factory(monkeypatc
 
     rows = loader.get_sheet_as_list_of_lists("my_sheet")
 
-    assert rows == [["ok"]]
+    assert rows == (("ok",),)
     # It passed the right config dict
     assert captured["sheet_config"] == values["sheets"]["my_sheet"]
     # It forwarded google_service from the loader
@@ -91,7 +95,9 @@ def test_uses_dispersal_sheet_anon_when_file_is_blank(monkeypatch, tmp_path):
         def get_rows(self):
             return [["dummy"]]
 
-    def fake_make_sheet_source(sheet_config, *, google_service=None):
+    def fake_make_sheet_source(
+        sheet_config, *, google_service=None, drive_service=None
+    ):
         captured["sheet_config"] = dict(sheet_config)  # copy to inspect safely
         return DummySource()
 
@@ -102,7 +108,7 @@ def test_uses_dispersal_sheet_anon_when_file_is_blank(monkeypatch, tmp_path):
 
     rows = loader.get_sheet_as_list_of_lists("fallback_sheet")
 
-    assert rows == [["dummy"]]
+    assert rows == (("dummy",),)
     # The file field should have been replaced with the fallback path
     assert captured["sheet_config"]["file"] == str(fallback_csv)
 
@@ -117,3 +123,296 @@ def test_raises_key_error_for_unknown_sheet_name():
 
     with pytest.raises(KeyError):
         loader.get_sheet_as_list_of_lists("no_such_sheet")
+
+
+def test_each_sheet_is_fetched_once_and_shared(monkeypatch):
+    """Repeated requests for the same sheet should reuse the cached rows."""
+    values = {
+        "sheets": {
+            "events": {"backend": "excel", "file": "", "sheet": "model-v1-events"},
+            "events_again": {
+                "backend": "excel",
+                "file": "",
+                "sheet": "model-v1-events",
+            },
+            "actors": {"backend": "excel", "file": "", "sheet": "model-v1-actors"},
+        },
+        "dispersal_sheet_anon": "anon.xlsx",
+    }
+    loader = FileLoader(values)
+
+    calls = []
+
+    class DummySource:
+        def __init__(self, sheet):
+            self.sheet = sheet
+
+        def get_rows(self):
+            return [[self.sheet, "x"]]
+
+    def fake_make_sheet_source(
+        sheet_config, *, google_service=None, drive_service=None
+    ):
+        calls.append(sheet_config["sheet"])
+        return DummySource(sheet_config["sheet"])
+
+    monkeypatch.setattr(
+        "sheet_to_graph.file_loader.make_sheet_source",
+        fake_make_sheet_source,
+    )
+
+    first = loader.get_sheet_as_list_of_lists("events")
+    second = loader.get_sheet_as_list_of_lists("events")
+    same_sheet_other_name = loader.get_sheet_as_list_of_lists("events_again")
+    actors = loader.get_sheet_as_list_of_lists("actors")
+
+    assert first is second
+    assert first is same_sheet_other_name
+    assert actors == (("model-v1-actors", "x"),)
+    assert calls == ["model-v1-events", "model-v1-actors"]
+    with pytest.raises(TypeError):
+        first[0][0] = "changed"
+
+
+def test_invalidate_forces_sheet_to_be_fetched_again(monkeypatch):
+    """invalidate should drop one sheet, or every sheet when no name is given."""
+    values = {
+        "sheets": {
+            "a": {"backend": "csv", "file": "a.csv"},
+            "b": {"backend": "csv", "file": "b.csv"},
+        },
+        "dispersal_sheet_anon": "unused.csv",
+    }
+    loader = FileLoader(values)
+
+    calls = []
+
+    class DummySource:
+        def get_rows(self):
+            return [["row"]]
+
+    def fake_make_sheet_source(
+        sheet_config, *, google_service=None, drive_service=None
+    ):
+        calls.append(sheet_config["file"])
+        return DummySource()
+
+    monkeypatch.setattr(
+        "sheet_to_graph.file_loader.make_sheet_source",
+        fake_make_sheet_source,
+    )
+
+    loader.get_sheet_as_list_of_lists("a")
+    loader.get_sheet_as_list_of_lists("b")
+    loader.invalidate("a")
+    loader.get_sheet_as_list_of_lists("a")
+    loader.get_sheet_as_list_of_lists("b")
+    loader.invalidate()
+    loader.get_sheet_as_list_of_lists("b")
+
+    assert calls == ["a.csv", "b.csv", "a.csv", "b.csv"]
+
+
+class FakeBatchGetRequest:
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self):
+        return self._result
+
+
+class FakeSheetsValues:
+    """Local stand-in for the Sheets API values() resource."""
+
+    def __init__(self, spreadsheets):
+        # spreadsheets: dict[spreadsheet_id -> dict[sheet_name -> rows]]
+        self._spreadsheets = spreadsheets
+        self.get_calls = []
+        self.batch_get_calls = []
+
+    def get(self, spreadsheetId, range):
+        self.get_calls.append((spreadsheetId, range))
+        return FakeBatchGetRequest({"values": self._spreadsheets[spreadsheetId][range]})
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension):
+        self.batch_get_calls.append((spreadsheetId, list(ranges)))
+        return FakeBatchGetRequest(
+            {
+                "valueRanges": [
+                    {
+                        "range": f"'{sheet_name}'!A1:Z1000",
+                        "values": self._spreadsheets[spreadsheetId][sheet_name],
+                    }
+                    for sheet_name in ranges
+                ]
+            }
+        )
+
+
+class FakeSheetsService:
+    def __init__(self, values):
+        self._values = values
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self._values
+
+
+def test_prefetch_loads_every_sheet_and_batches_google_requests(tmp_path):
+    """prefetch should fill the cache, using one batchGet per spreadsheet."""
+    places_csv = tmp_path / "places.csv"
+    places_csv.write_text("place,postcode\nhere,AB1 2CD\n", encoding="utf-8")
+
+    fake_values = FakeSheetsValues(
+        {
+            "sheet-1": {
+                "actors": [["actor_id"], ["a1"]],
+                "events": [["event_id"], ["e1"]],
+            },
+            "sheet-2": {"museums": [["museum_id"], ["m1"]]},
+        }
+    )
+    values = {
+        "sheets": {
+            "actors": {
+                "backend": "google",
+                "spreadsheet_id": "sheet-1",
+                "sheet": "actors",
+            },
+            "events": {
+                "backend": "google",
+                "spreadsheet_id": "sheet-1",
+                "sheet": "events",
+            },
+            "museums": {
+                "backend": "google",
+                "spreadsheet_id": "sheet-2",
+                "sheet": "museums",
+            },
+            "places": {"backend": "csv", "file": str(places_csv)},
+        },
+        "dispersal_sheet_anon": "unused.xlsx",
+    }
+    loader = FileLoader(values, google_service=FakeSheetsService(fake_values))
+
+    loader.prefetch()
+
+    assert sorted(fake_values.batch_get_calls) == [
+        ("sheet-1", ["actors", "events"]),
+        ("sheet-2", ["museums"]),
+    ]
+    assert loader.get_sheet_as_list_of_lists("actors") == (("actor_id",), ("a1",))
+    assert loader.get_sheet_as_list_of_lists("events") == (("event_id",), ("e1",))
+    assert loader.get_sheet_as_list_of_lists("museums") == (("museum_id",), ("m1",))
+    assert loader.get_sheet_as_list_of_lists("places") == (
+        ("place", "postcode"),
+        ("here", "AB1 2CD"),
+    )
+    assert fake_values.get_calls == []
+
+
+def test_prefetch_skips_sheets_that_are_already_cached():
+    fake_values = FakeSheetsValues(
+        {"sheet-1": {"actors": [["actor_id"]], "events": [["event_id"]]}}
+    )
+    values = {
+        "sheets": {
+            "actors": {
+                "backend": "google",
+                "spreadsheet_id": "sheet-1",
+                "sheet": "actors",
+            },
+            "events": {
+                "backend": "google",
+                "spreadsheet_id": "sheet-1",
+                "sheet": "events",
+            },
+        },
+        "dispersal_sheet_anon": "unused.xlsx",
+    }
+    loader = FileLoader(values, google_service=FakeSheetsService(fake_values))
+
+    loader.get_sheet_as_list_of_lists("actors")
+    loader.prefetch(["actors", "events"])
+
+    assert fake_values.get_calls == [("sheet-1", "actors")]
+    assert fake_values.batch_get_calls == [("sheet-1", ["events"])]
+
+
+def test_sheet_cache_directory_is_passed_to_sheet_sources(monkeypatch):
+    """sheet_cache_directory in the config should reach make_sheet_source."""
+    values = {
+        "sheets": {"my_sheet": {"backend": "csv", "file": "dummy.csv"}},
+        "dispersal_sheet_anon": "unused.csv",
+        "sheet_cache_directory": "sheet_cache",
+    }
+    loader = FileLoader(values, drive_service="DRIVE_SERVICE_SENTINEL")
+
+    captured = {}
+
+    class DummySource:
+        def get_rows(self):
+            return [["ok"]]
+
+    def fake_make_sheet_source(
+        sheet_config, *, google_service=None, drive_service=None
+    ):
+        captured["sheet_config"] = sheet_config
+        captured["drive_service"] = drive_service
+        return DummySource()
+
+    monkeypatch.setattr(
+        "sheet_to_graph.file_loader.make_sheet_source",
+        fake_make_sheet_source,
+    )
+
+    loader.get_sheet_as_list_of_lists("my_sheet")
+
+    assert captured["sheet_config"]["cache_directory"] == "sheet_cache"
+    assert captured["drive_service"] == "DRIVE_SERVICE_SENTINEL"
+
+
+def test_prefetch_closes_the_xlsx_workbooks_it_read(tmp_path):
+    """prefetch should not leave read-only workbooks (and their files) open."""
+    xlsx_path = tmp_path / "test.xlsx"
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "actors"
+    workbook.active.append(["actor_id"])
+    workbook.active.append(["a1"])
+    workbook.save(xlsx_path)
+    values = {
+        "sheets": {
+            "actors": {"backend": "excel", "file": str(xlsx_path), "sheet": "actors"}
+        },
+        "dispersal_sheet_anon": "unused.xlsx",
+    }
+    loader = FileLoader(values)
+
+    loader.prefetch()
+
+    assert ExcelSheetSource._workbooks == {}
+    assert [list(row) for row in loader.get_sheet_as_list_of_lists("actors")] == [
+        ["actor_id"],
+        ["a1"],
+    ]
+
+
+def test_get_sheet_as_list_of_lists_closes_the_xlsx_workbook_it_read(tmp_path):
+    xlsx_path = tmp_path / "test.xlsx"
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "actors"
+    workbook.active.append(["actor_id"])
+    workbook.save(xlsx_path)
+    values = {
+        "sheets": {
+            "actors": {"backend": "excel", "file": str(xlsx_path), "sheet": "actors"}
+        },
+        "dispersal_sheet_anon": "unused.xlsx",
+    }
+
+    rows = FileLoader(values).get_sheet_as_list_of_lists("actors")
+
+    assert ExcelSheetSource._workbooks == {}
+    assert [list(row) for row in rows] == [["actor_id"]]
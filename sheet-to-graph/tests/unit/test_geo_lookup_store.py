@@ -0,0 +1,64 @@
+import json
+
+from sheet_to_graph import GeoLookupStore
+
+GEO_INFO = {
+    "lat": 51.52,
+    "long": -0.13,
+    "bng_x": 529900.0,
+    "bng_y": 182000.0,
+    "region": "London",
+    "lad23cd": "E09000007",
+    "lad23nm": "Camden",
+}
+
+
+def test_entries_are_persisted_between_stores(tmp_path):
+    file_name = str(tmp_path / "geo.sqlite")
+    store = GeoLookupStore(file_name, json_directory=str(tmp_path))
+    store.put("postcode", "WC1E 7HX", GEO_INFO)
+    store.put("town_county", "Camden", GEO_INFO)
+    store.close()
+
+    reopened = GeoLookupStore(file_name, json_directory=str(tmp_path))
+
+    assert reopened.load("postcode") == {"WC1E 7HX": GEO_INFO}
+    assert reopened.load("town_county") == {"Camden": GEO_INFO}
+    assert reopened.load("city_country") == {}
+
+
+def test_entries_are_committed_in_batches(tmp_path):
+    file_name = str(tmp_path / "geo.sqlite")
+    store = GeoLookupStore(file_name, batch_size=2, json_directory=str(tmp_path))
+    reader = GeoLookupStore(file_name, json_directory=str(tmp_path))
+
+    store.put("postcode", "A", GEO_INFO)
+    assert reader.load("postcode") == {}
+
+    store.put("postcode", "B", GEO_INFO)
+    assert set(reader.load("postcode")) == {"A", "B"}
+
+    store.put("postcode", "C", GEO_INFO)
+    store.commit()
+    assert set(reader.load("postcode")) == {"A", "B", "C"}
+
+
+def test_old_json_lookups_are_imported_once(tmp_path):
+    (tmp_path / "postcode_lookup.json").write_text(
+        json.dumps({"WC1E 7HX": GEO_INFO}), encoding="utf-8"
+    )
+    store = GeoLookupStore(str(tmp_path / "geo.sqlite"), json_directory=str(tmp_path))
+
+    assert store.load("postcode") == {"WC1E 7HX": GEO_INFO}
+
+    store.put("postcode", "WC1E 7HX", GEO_INFO | {"region": "changed"})
+    store.commit()
+
+    assert store.load("postcode")["WC1E 7HX"]["region"] == "changed"
+
+
+def test_get_many_returns_only_stored_keys(tmp_path):
+    store = GeoLookupStore(str(tmp_path / "geo.sqlite"), json_directory=str(tmp_path))
+    store.put_many("postcode", {"A": GEO_INFO, "B": GEO_INFO})
+
+    assert store.get_many("postcode", ["A", "C", "A"]) == {"A": GEO_INFO}
@@ -0,0 +1,89 @@
+import sqlite3
+
+from sheet_to_graph import HttpResponseCache
+
+
+def test_make_key_ignores_parameter_order():
+    assert HttpResponseCache.make_key(
+        "https://WWW.example.org/api?b=2", {"a": 1}
+    ) == HttpResponseCache.make_key("https://www.example.org/api", {"b": 2, "a": "1"})
+
+
+def test_responses_persist_between_caches(tmp_path):
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("key", b"body", etag='"v1"')
+    cache.close()
+
+    cached = HttpResponseCache(str(tmp_path / "cache.sqlite")).get("key")
+    assert cached == {
+        "body": b"body",
+        "etag": '"v1"',
+        "last_modified": None,
+        "fresh": True,
+    }
+
+
+def test_responses_older_than_ttl_are_stale(tmp_path):
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"), ttl=0)
+    cache.put("key", b"body")
+    assert cache.get("key")["fresh"] is False
+    assert cache.get("missing") is None
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"), max_size_bytes=10)
+    cache.put("first", b"12345")
+    cache.put("second", b"12345")
+    cache.get("first")
+    cache.put("third", b"12345")
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_reads_are_saved_with_the_next_write(tmp_path):
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("first", b"12345")
+    cache.put("second", b"12345")
+    connection = sqlite3.connect(str(tmp_path / "cache.sqlite"))
+
+    def get_used_at(key):
+        return connection.execute(
+            "SELECT used_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()[0]
+
+    used_at = get_used_at("first")
+    cache.get("first")
+    assert get_used_at("first") == used_at
+    cache.put("third", b"12345")
+    assert get_used_at("first") > used_at
+    connection.close()
+
+
+def test_size_of_stored_responses_is_counted_when_reopened(tmp_path):
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"), max_size_bytes=10)
+    cache.put("first", b"12345")
+    cache.put("second", b"12345")
+    cache.close()
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"), max_size_bytes=10)
+    cache.put("second", b"1234")
+    cache.put("third", b"1")
+    assert cache.get("first") is not None
+    cache.put("fourth", b"12")
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+
+
+def test_reads_are_saved_when_closed(tmp_path):
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("first", b"12345")
+    cache.close()
+    connection = sqlite3.connect(str(tmp_path / "cache.sqlite"))
+    used_at = connection.execute("SELECT used_at FROM responses").fetchone()[0]
+
+    cache = HttpResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.get("first")
+    cache.close()
+
+    assert connection.execute("SELECT used_at FROM responses").fetchone()[0] > used_at
+    connection.close()
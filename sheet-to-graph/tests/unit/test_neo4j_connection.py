@@ -0,0 +1,261 @@
+import neo4j
+import pytest
+
+from sheet_to_graph import Neo4jConnection
+
+PROFILE = {
+    "operatorType": "ProduceResults",
+    "dbHits": 0,
+    "rows": 2,
+    "children": [
+        {"operatorType": "Filter", "dbHits": 4, "rows": 2, "children": []},
+        {"operatorType": "NodeByLabelScan", "dbHits": 3, "rows": 3, "children": []},
+    ],
+}
+
+
+class FakeSummary:
+    def __init__(self, query):
+        self.server = type("FakeServerInfo", (), {"agent": "Neo4j/5.26.0"})
+        self.result_available_after = 3
+        self.result_consumed_after = 4
+        self.profile = PROFILE if query.startswith("PROFILE") else None
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakeResult:
+    def __init__(self, query, records=()):
+        self.query = query
+        self.records = [FakeRecord(record) for record in records]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def consume(self):
+        return FakeSummary(self.query)
+
+
+class FakeTransaction:
+    def __init__(self, session):
+        self.session = session
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def run(self, query, parameters=None):
+        self.queries.append((query, parameters))
+        return FakeResult(query)
+
+    def commit(self):
+        if self.session.driver.failures > 0:
+            self.session.driver.failures -= 1
+            raise neo4j.exceptions.TransientError("deadlock detected")
+        self.session.committed.append(self.queries)
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+        self.committed = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def run(self, query, **arguments):
+        if self.driver.run_failures > 0:
+            self.driver.run_failures -= 1
+            raise neo4j.exceptions.ServiceUnavailable("connection dropped")
+        return FakeResult(query, [{"name": "a"}, {"name": "b"}])
+
+    def begin_transaction(self):
+        return FakeTransaction(self)
+
+
+class FakeDriver:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.run_failures = 0
+        self.sessions = []
+        self.fetch_sizes = []
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def session(self, fetch_size=1000):
+        self.fetch_sizes.append(fetch_size)
+        session = FakeSession(self)
+        self.sessions.append(session)
+        return session
+
+
+def make_connection(failures=0):
+    connection = Neo4jConnection(
+        {"uri": "bolt://test", "user": "", "password": ""}, backoff_factor=0
+    )
+    connection.driver = FakeDriver(failures)
+    return connection
+
+
+def test_run_write_queries_uses_one_session_and_batched_transactions():
+    connection = make_connection()
+    queries = ((f"MERGE (:Node {{id: {n}}})", None) for n in range(5))
+
+    number_of_queries = connection.run_write_queries(queries, transaction_size=2)
+
+    assert number_of_queries == 5
+    assert len(connection.driver.sessions) == 1
+    committed = connection.driver.sessions[0].committed
+    assert [len(transaction) for transaction in committed] == [2, 2, 1]
+    assert committed[2] == [("MERGE (:Node {id: 4})", None)]
+
+
+def test_run_write_queries_with_no_queries_commits_nothing():
+    connection = make_connection()
+    assert connection.run_write_queries([]) == 0
+    assert connection.driver.sessions == []
+
+
+def test_failed_transactions_are_retried_in_a_new_session():
+    connection = make_connection(failures=2)
+    committed_transactions = []
+    queries = [(f"MERGE (:Node {{id: {n}}})", None) for n in range(3)]
+
+    number_of_queries = connection.run_write_queries(
+        queries, transaction_size=2, on_commit=committed_transactions.append
+    )
+
+    assert number_of_queries == 3
+    assert len(connection.driver.sessions) == 3
+    assert all(session.closed for session in connection.driver.sessions)
+    assert [
+        transaction
+        for session in connection.driver.sessions
+        for transaction in session.committed
+    ] == [queries[:2], queries[2:]]
+    assert committed_transactions == [queries[:2], queries[2:]]
+
+
+def test_transactions_fail_once_the_retries_are_used_up():
+    connection = make_connection(failures=3)
+    connection.max_retries = 2
+
+    with pytest.raises(neo4j.exceptions.TransientError):
+        connection.run_write_queries([("MERGE (:Node)", None)])
+
+
+def test_queries_are_recorded_by_template():
+    connection = make_connection()
+
+    assert connection.run_query("MATCH (n {id: 1}) RETURN n.name AS name") == [
+        {"name": "a"},
+        {"name": "b"},
+    ]
+    connection.run_query("MATCH (n {id: 2})\nRETURN n.name AS name")
+    connection.run_write_queries([("MERGE (:Node {id: 'x'})", None)])
+
+    summary = {
+        metrics["template"]: metrics for metrics in connection.metrics.get_summary()
+    }
+    assert summary.keys() == {
+        "MATCH (n {id: ?}) RETURN n.name AS name",
+        "MERGE (:Node {id: ?})",
+    }
+    metrics = summary["MATCH (n {id: ?}) RETURN n.name AS name"]
+    assert metrics["count"] == 2
+    assert metrics["rows"] == 4
+    assert metrics["result_available_after_ms"] == 6
+    assert metrics["result_consumed_after_ms"] == 8
+    assert sum(metrics["latency_histogram"]) == 2
+
+
+def test_profile_query_returns_records_and_total_db_hits():
+    connection = make_connection()
+
+    records, profile = connection.profile_query("MATCH (n) RETURN n.name AS name")
+
+    assert records == [{"name": "a"}, {"name": "b"}]
+    assert profile["db_hits"] == 7
+    assert profile["plan"] == PROFILE
+    assert profile["server"] == "Neo4j/5.26.0"
+
+
+def test_stream_query_yields_records_fetched_in_batches():
+    connection = make_connection()
+
+    records = connection.stream_query("MATCH (n) RETURN n.name AS name", fetch_size=10)
+
+    assert next(records) == {"name": "a"}
+    assert connection.metrics.get_summary() == []
+    assert list(records) == [{"name": "b"}]
+    assert connection.driver.fetch_sizes == [10]
+    assert connection.metrics.get_summary()[0]["rows"] == 2
+
+
+def test_stream_query_is_retried_on_a_new_driver_before_any_records_are_read(
+    monkeypatch,
+):
+    monkeypatch.setattr(
+        Neo4jConnection, "open", lambda self: setattr(self, "driver", FakeDriver())
+    )
+    connection = make_connection()
+    failed_driver = connection.driver
+    failed_driver.run_failures = 1
+
+    assert connection.run_query("MATCH (n) RETURN n.name AS name") == [
+        {"name": "a"},
+        {"name": "b"},
+    ]
+    assert failed_driver.closed
+    assert len(connection.driver.sessions) == 1
+
+
+def test_a_failed_driver_is_only_replaced_once(monkeypatch):
+    monkeypatch.setattr(
+        Neo4jConnection, "open", lambda self: setattr(self, "driver", FakeDriver())
+    )
+    connection = make_connection()
+    failed_driver = connection.driver
+
+    connection._reconnect(failed_driver)
+    new_driver = connection.driver
+    connection._reconnect(failed_driver)
+
+    assert failed_driver.closed
+    assert connection.driver is new_driver
+
+
+def test_errors_that_are_not_retryable_are_raised_at_once(monkeypatch):
+    connection = make_connection()
+
+    def run(self, query, parameters=None):
+        raise neo4j.exceptions.ClientError("syntax error")
+
+    monkeypatch.setattr(FakeTransaction, "run", run)
+
+    with pytest.raises(neo4j.exceptions.ClientError):
+        connection.run_write_queries([("MERGE (:Node", None)])
+    assert len(connection.driver.sessions) == 1
+
+
+def test_transactions_are_not_retried_without_retry():
+    connection = make_connection(failures=1)
+
+    with pytest.raises(neo4j.exceptions.TransientError):
+        connection.run_write_queries([("CREATE (:Node)", None)], retry=False)
+    assert len(connection.driver.sessions) == 1
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+from sheet_to_graph import PostcodeIndex, PostcodeToLatLong
+
+
+def test_lookup_matches_every_form_of_a_postcode(postcode_directory):
+    index = PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "index.sqlite")
+    )
+
+    expected = {
+        "pcds": "WC1E 7HX",
+        "lat": 51.52,
+        "long": -0.13,
+        "bng_x": pytest.approx(529840.2767, abs=1e-4),
+        "bng_y": pytest.approx(181777.357, abs=1e-4),
+        "rgn": "E12000007",
+        "oslaua": "E09000007",
+    }
+    assert index.lookup("WC1E 7HX") == expected
+    assert index.lookup("WC1E7HX") == expected
+    assert index.lookup("wc1e 7hx") == expected
+    assert index.lookup("WC1E 7HY") is None
+    index.close()
+
+
+def test_lookup_outward_code_does_not_match_longer_outward_codes(postcode_directory):
+    index = PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "index.sqlite")
+    )
+
+    assert sorted(row["pcds"] for row in index.lookup_outward_code("AB1")) == [
+        "AB1 0AA",
+        "AB1 0AB",
+    ]
+    assert [row["pcds"] for row in index.lookup_outward_code("AB10")] == ["AB10 1AB"]
+    index.close()
+
+
+def test_lookup_outward_code_leaves_out_postcodes_without_coordinates(
+    postcode_directory,
+):
+    with open(
+        postcode_directory / "Data" / "multi_csv" / "ONSPD_FEB_2024_UK_AB.csv",
+        "a",
+        encoding="utf-8",
+    ) as f:
+        f.write("AB1 0AC,AB1  0AC,AB1 0AC,99.999999,0.000000,S99999999,S12000033\n")
+    index = PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "index.sqlite")
+    )
+
+    assert sorted(row["pcds"] for row in index.lookup_outward_code("AB1")) == [
+        "AB1 0AA",
+        "AB1 0AB",
+    ]
+    index.close()
+
+
+def test_indexes_from_an_older_version_are_not_used(postcode_directory):
+    index = PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "index.sqlite")
+    )
+    connection = sqlite3.connect(index.index_file_name)
+    connection.execute("PRAGMA user_version = 0")
+    connection.commit()
+    connection.close()
+
+    with pytest.raises(ValueError):
+        index.lookup("WC1E 7HX")
+
+
+def test_build_raises_if_there_are_no_onspd_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        PostcodeIndex.build(str(tmp_path), str(tmp_path / "index.sqlite"))
+
+
+def test_postcode_to_lat_long_uses_index(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "postcode_index.sqlite")
+    )
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+
+    assert postcode_to_lat_long.get_latitude("WC1E7HX", "", "", "") == 51.52
+    assert postcode_to_lat_long.get_region("WC1E7HX", "", "", "") == "London"
+    assert (
+        postcode_to_lat_long.get_local_authority_name("WC1E7HX", "", "", "") == "Camden"
+    )
+
+
+def test_partial_postcode_is_placed_at_centre_of_outward_code(
+    postcode_directory, monkeypatch
+):
+    monkeypatch.chdir(postcode_directory)
+    PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "postcode_index.sqlite")
+    )
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+
+    assert postcode_to_lat_long.get_latitude("AB1", "", "", "") == pytest.approx(57.15)
+    assert postcode_to_lat_long.get_local_authority_code("AB1", "", "", "") == (
+        "S12000033"
+    )
@@ -0,0 +1,294 @@
+import builtins
+
+from bng_latlon import WGS84toOSGB36
+import pytest
+
+from sheet_to_graph import GeoLookupStore, PostcodeIndex, PostcodeToLatLong
+from sheet_to_graph.file_preprocessors import EventPlacesPreprocessor
+import sheet_to_graph.postcode_to_lat_long
+
+
+def test_resolve_many_reads_each_postcode_file_once(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    opened_files = []
+
+    def counting_open(file, *args, **kwargs):
+        opened_files.append(str(file))
+        return builtins.open(file, *args, **kwargs)
+
+    monkeypatch.setattr(
+        sheet_to_graph.postcode_to_lat_long, "open", counting_open, raising=False
+    )
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+    postcode_to_lat_long.resolve_many(
+        [
+            ("AB1 0AA", "", "", ""),
+            ("AB1 0AA", "Aberdeen", "", ""),
+            ("AB10 1AB", "", "", ""),
+            ("AB9 9ZZ", "", "", ""),
+            ("WC1E 7HX", "", "", "England"),
+            ("", "", "", ""),
+        ]
+    )
+    onspd_files = [f for f in opened_files if "ONSPD" in f]
+    assert sorted(onspd_files) == sorted(set(onspd_files))
+    assert len(onspd_files) == 2
+    assert postcode_to_lat_long.postcode_lookup["AB1 0AA"]["lat"] == 57.10
+    assert postcode_to_lat_long.postcode_lookup["AB1 0AA"]["bng_x"] == (
+        pytest.approx(WGS84toOSGB36(57.10, -2.24)[0], abs=1e-4)
+    )
+    assert postcode_to_lat_long.postcode_lookup["AB10 1AB"]["lad23nm"] == (
+        "Aberdeen City"
+    )
+    assert postcode_to_lat_long.postcode_lookup["AB9 9ZZ"]["lat"] is None
+    assert postcode_to_lat_long.postcode_lookup["WC1E 7HX"]["region"] == "London"
+    assert "" not in postcode_to_lat_long.postcode_lookup
+
+
+def test_resolve_many_saves_lookups_to_the_store(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+    postcode_to_lat_long.resolve_many([("AB1 0AB", "", "", "")])
+    postcode_to_lat_long.geo_lookup_store.close()
+
+    reloaded = PostcodeToLatLong(str(postcode_directory), None)
+    assert reloaded.postcode_lookup["AB1 0AB"]["lat"] == 57.20
+
+
+def test_resolve_sheets_preprocesses_sheets_as_they_are_imported(postcode_directory):
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+    resolved_locations = []
+    postcode_to_lat_long.resolve_many = lambda locations: resolved_locations.extend(
+        locations
+    )
+    header_mapping = {
+        "town": "village_town_city",
+        "county": "county",
+        "postcode": "postcode",
+    }
+    postcode_to_lat_long.resolve_sheets(
+        [
+            (
+                [["postcode", "county", "village_town_city"], ["AB1 0AA", "", ""]],
+                None,
+                None,
+            ),
+            (
+                [["town", "county", "postcode"], ["", "", ""], ["Leeds", "", ""]],
+                EventPlacesPreprocessor(),
+                header_mapping,
+            ),
+        ]
+    )
+    assert resolved_locations == [("AB1 0AA", "", "", ""), ("", "Leeds", "", "")]
+
+
+class FakeWikidataConnection:
+    def __init__(self):
+        self.searches = []
+
+    def search_entities_many(self, search_terms):
+        search_terms = list(search_terms)
+        self.searches.append(sorted(search_terms))
+        return {
+            term: [{"id": "Q90"}] if term == "Paris, France" else []
+            for term in search_terms
+        }, set()
+
+    def get_entity_properties_many(self, qids, property_ids=None):
+        return {
+            qid: {"P625": {"latitude": 48.86, "longitude": 2.35}} for qid in qids
+        }, set()
+
+
+def test_resolve_many_searches_wikidata_in_one_batch(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    wikidata_connection = FakeWikidataConnection()
+    postcode_to_lat_long = PostcodeToLatLong(
+        str(postcode_directory), wikidata_connection
+    )
+    postcode_to_lat_long.resolve_many(
+        [
+            ("", "Paris", "", "France"),
+            ("", "Paris", "", "France"),
+            ("", "Nowhere", "Camden", ""),
+        ]
+    )
+    assert wikidata_connection.searches == [["Nowhere, Camden", "Paris, France"]]
+    assert postcode_to_lat_long.city_country_lookup["Paris, France"]["lat"] == 48.86
+    town_county = postcode_to_lat_long.town_county_lookup["Nowhere, Camden"]
+    assert town_county["lad23cd"] == "E09000007"
+    assert town_county["lat"] is None
+
+
+def test_resolve_many_fetches_only_the_results_it_reads(
+    postcode_directory, monkeypatch
+):
+    monkeypatch.chdir(postcode_directory)
+
+    class ManyResultsWikidataConnection(FakeWikidataConnection):
+        def __init__(self):
+            super().__init__()
+            self.fetched_qids = []
+
+        def search_entities_many(self, search_terms):
+            return {
+                "Paris, France": [{"id": "Q90"}, {"id": "Q91"}],
+                "Lyon, France": [{"id": "Q1"}, {"id": "Q456"}, {"id": "Q2"}],
+            }, set()
+
+        def get_entity_properties_many(self, qids, property_ids=None):
+            qids = list(qids)
+            self.fetched_qids.append(sorted(qids))
+            return {
+                qid: (
+                    {}
+                    if qid == "Q1"
+                    else {"P625": {"latitude": 45.76, "longitude": 4.84}}
+                )
+                for qid in qids
+            }, set()
+
+    wikidata_connection = ManyResultsWikidataConnection()
+    postcode_to_lat_long = PostcodeToLatLong(
+        str(postcode_directory), wikidata_connection
+    )
+    postcode_to_lat_long.resolve_many(
+        [("", "Paris", "", "France"), ("", "Lyon", "", "France")]
+    )
+    assert wikidata_connection.fetched_qids == [["Q1", "Q90"], ["Q456"]]
+    assert postcode_to_lat_long.city_country_lookup["Lyon, France"]["lat"] == 45.76
+
+
+def test_lad_file_is_read_once(postcode_directory, monkeypatch):
+    opened_files = []
+
+    def counting_open(file, *args, **kwargs):
+        opened_files.append(str(file))
+        return builtins.open(file, *args, **kwargs)
+
+    monkeypatch.setattr(
+        sheet_to_graph.postcode_to_lat_long, "open", counting_open, raising=False
+    )
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+    assert postcode_to_lat_long.lads_map["E06000023"] == "Bristol, City of"
+    assert postcode_to_lat_long.lads_to_regions_map["E06000023"] == "South West"
+    assert postcode_to_lat_long.lads_by_name["Bristol"][1] == "E06000023"
+    assert len(opened_files) == 1
+
+
+def test_town_county_matches_lad_names(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    postcode_to_lat_long = PostcodeToLatLong(
+        str(postcode_directory), FakeWikidataConnection()
+    )
+    postcode_to_lat_long.resolve_many(
+        [
+            ("", "Clifton", "Bristol", ""),
+            ("", "Camden", "Bristol", ""),
+            ("", "Clifton", "bristol", ""),
+            ("", "", "Bristol, City of", ""),
+        ]
+    )
+    clifton = postcode_to_lat_long.town_county_lookup["Clifton, Bristol"]
+    assert clifton["lad23cd"] == "E06000023"
+    assert clifton["lad23nm"] == "Bristol"
+    assert clifton["region"] == "South West"
+    # names are matched exactly, and without their suffixes, as they always were
+    assert (
+        postcode_to_lat_long.town_county_lookup["Clifton, bristol"]["lad23cd"] is None
+    )
+    assert (
+        postcode_to_lat_long.town_county_lookup["Bristol, City of"]["lad23nm"]
+        == "Bristol"
+    )
+    # Bristol comes after Camden in the LAD file
+    assert (
+        postcode_to_lat_long.town_county_lookup["Camden, Bristol"]["lad23cd"]
+        == "E06000023"
+    )
+
+
+def test_get_geo_info_returns_every_field(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    postcode_to_lat_long = PostcodeToLatLong(str(postcode_directory), None)
+    geo_info = postcode_to_lat_long.get_geo_info("WC1E 7HX", "", "", "")
+    assert geo_info["lat"] == 51.52
+    assert geo_info["region"] == "London"
+    assert geo_info["lad23nm"] == "Camden"
+    # Crown Dependencies are not in the ONSPD region codes
+    assert postcode_to_lat_long.get_geo_info("IM1 1AA", "", "", "")["region"] == (
+        "Isle of Man"
+    )
+
+
+def test_places_with_coordinates_are_reverse_geocoded(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+    PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "postcode_index.sqlite")
+    )
+
+    class SmallTownWikidataConnection(FakeWikidataConnection):
+        def get_entity_properties_many(self, qids, property_ids=None):
+            # a small town near WC1E 7HX
+            return {
+                qid: {
+                    "P625": {"latitude": 51.521, "longitude": -0.131},
+                    "P1082": {"amount": "+5000", "unit": "1"},
+                }
+                for qid in qids
+            }, set()
+
+        def search_entities_many(self, search_terms):
+            return {term: [{"id": "Q1"}] for term in search_terms}, set()
+
+    postcode_to_lat_long = PostcodeToLatLong(
+        str(postcode_directory), SmallTownWikidataConnection()
+    )
+    postcode_to_lat_long.resolve_many([("", "Somewhere", "Bristol", "")])
+    geo_info = postcode_to_lat_long.town_county_lookup["Somewhere, Bristol"]
+    assert geo_info["lad23cd"] == "E09000007"
+    assert geo_info["lad23nm"] == "Camden"
+    assert geo_info["region"] == "London"
+
+
+def test_region_is_the_region_of_the_assigned_lad(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+
+    class BristolAssigner:
+        # as if Bristol's boundary reached the point near WC1E 7HX, in London
+        def assign_local_authorities(self, bng_x, bng_y):
+            return ["E06000023" for _ in bng_x]
+
+    postcode_to_lat_long = PostcodeToLatLong(
+        str(postcode_directory),
+        FakeWikidataConnection(),
+        local_authority_assigner=BristolAssigner(),
+    )
+    geo_info = {"lat": 51.521, "long": -0.131, "bng_x": None, "bng_y": None}
+    postcode_to_lat_long._set_bng([geo_info])
+    postcode_to_lat_long._set_local_authorities([geo_info])
+    assert geo_info["lad23cd"] == "E06000023"
+    assert geo_info["region"] == "South West"
+
+
+def test_places_that_failed_to_resolve_are_not_saved(postcode_directory, monkeypatch):
+    monkeypatch.chdir(postcode_directory)
+
+    class FailingWikidataConnection(FakeWikidataConnection):
+        def search_entities_many(self, search_terms):
+            return {"Paris, France": [{"id": "Q90"}]}, {"Nowhere, Camden"}
+
+        def get_entity_properties_many(self, qids, property_ids=None):
+            return {}, set(qids)
+
+    postcode_to_lat_long = PostcodeToLatLong(
+        str(postcode_directory), FailingWikidataConnection()
+    )
+    postcode_to_lat_long.resolve_many(
+        [("", "Paris", "", "France"), ("", "Nowhere", "Camden", "")]
+    )
+
+    assert "Paris, France" not in postcode_to_lat_long.city_country_lookup
+    assert "Nowhere, Camden" not in postcode_to_lat_long.town_county_lookup
+    assert GeoLookupStore().get_many("city_country", ["Paris, France"]) == {}
@@ -0,0 +1,46 @@
+import json
+
+from sheet_to_graph import QueryMetrics
+
+
+def test_literals_are_replaced_in_templates():
+    assert (
+        QueryMetrics.get_template(
+            "MERGE (n:Actor2 {actor_id: 'a\\'1', size: -3.5})\n  SET n.tags = [\"x\", 10]"
+        )
+        == "MERGE (n:Actor2 {actor_id: ?, size: ?}) SET n.tags = [?, ?]"
+    )
+    assert (
+        QueryMetrics.get_template("UNWIND $rows AS row MERGE (n {id: row.key})")
+        == "UNWIND $rows AS row MERGE (n {id: row.key})"
+    )
+
+
+def test_latencies_are_counted_in_histogram_buckets():
+    metrics = QueryMetrics()
+
+    for latency in [0.0005, 0.001, 0.003, 20]:
+        metrics.record("RETURN 1", latency, rows=1)
+
+    (summary,) = metrics.get_summary()
+    assert summary["count"] == 4
+    assert summary["rows"] == 4
+    assert summary["max_latency_ms"] == 20000
+    assert summary["latency_histogram"][:3] == [2, 0, 1]
+    assert summary["latency_histogram"][-1] == 1
+
+
+def test_summary_is_sorted_by_total_latency_and_saved(tmp_path):
+    metrics = QueryMetrics()
+    metrics.record("RETURN 1", 0.01)
+    metrics.record("MATCH (n) RETURN n", 0.5)
+
+    metrics.save(str(tmp_path / "metrics.json"))
+
+    with open(tmp_path / "metrics.json") as f:
+        saved = json.load(f)
+    assert [metrics["template"] for metrics in saved["templates"]] == [
+        "MATCH (n) RETURN n",
+        "RETURN ?",
+    ]
+    assert saved["latency_buckets_ms"] == QueryMetrics.latency_buckets
@@ -0,0 +1,24 @@
+from sheet_to_graph import PostcodeIndex, ReverseGeocoder
+
+
+def test_points_are_assigned_the_nearest_postcodes_local_authority():
+    reverse_geocoder = ReverseGeocoder(
+        [100000, 500000], [100000, 200000], ["E1", "E2"], max_distance=1000
+    )
+    assert reverse_geocoder.assign_local_authorities(
+        [100100, 499500, 300000], [100000, 200300, 150000]
+    ) == ["E1", "E2", None]
+
+
+def test_from_postcode_index(postcode_directory):
+    index = PostcodeIndex.build(
+        str(postcode_directory), str(postcode_directory / "index.sqlite")
+    )
+    reverse_geocoder = ReverseGeocoder.from_postcode_index(index)
+    wc1e_7hx = index.lookup("WC1E 7HX")
+    distances, codes = reverse_geocoder.nearest(
+        [wc1e_7hx["bng_x"] + 30], [wc1e_7hx["bng_y"] - 40]
+    )
+    assert list(codes) == ["E09000007"]
+    assert distances[0] == 50
+    index.close()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sheet_to_graph import SpatialIndex
+from sheet_to_graph.spatial_index import get_nearest_open_museums
+
+
+@pytest.fixture
+def museums_df():
+    return pd.DataFrame(
+        {
+            "mm_id": ["m1", "m2", "m3", "m4", "m5"],
+            "x": [0, 1000, 5000, 20000, None],
+            "y": [0, 0, 0, 0, None],
+            "year_opened_1": ["1950", "1950", "1990", "1950", "1950"],
+            "year_opened_2": ["1950", "1950", "1995", "1950", "1950"],
+            "year_closed_1": ["2005", "9999", "9999", "2000", "9999"],
+            "year_closed_2": ["2005", "9999", "9999", "2000", "9999"],
+        }
+    )
+
+
+def test_points_without_coordinates_are_not_indexed(museums_df):
+    index = SpatialIndex.from_dataframe(museums_df, "mm_id")
+    assert len(index) == 4
+
+
+def test_within_radius_returns_ids_nearest_first(museums_df):
+    index = SpatialIndex.from_dataframe(museums_df, "mm_id")
+    results = index.within_radius([900, 19000, np.nan], [0, 0, np.nan], 2000)
+    assert results == [["m2", "m1"], ["m4"], []]
+
+
+def test_k_nearest_returns_distances_and_ids(museums_df):
+    index = SpatialIndex.from_dataframe(museums_df, "mm_id")
+    distances, ids = index.k_nearest([4000, np.nan], [0, 0], k=2)
+    assert distances[0].tolist() == [1000, 3000]
+    assert ids[0].tolist() == ["m3", "m2"]
+    assert np.isinf(distances[1]).all()
+    assert ids[1].tolist() == [None, None]
+
+
+def test_k_nearest_pads_when_there_are_fewer_than_k_points():
+    index = SpatialIndex(["a"], [0], [0])
+    distances, ids = index.k_nearest([3], [4], k=2)
+    assert distances[0].tolist() == [5, np.inf]
+    assert ids[0].tolist() == ["a", None]
+
+
+def test_nearest_open_museum_depends_on_the_year(museums_df):
+    distances, ids = get_nearest_open_museums(
+        museums_df, [5000, 5000, 19000], [0, 0, 0], ["1992", "2010", "1999"]
+    )
+    # m3 had not certainly opened by 1992, and m4 had closed by 2010
+    assert ids.tolist() == ["m2", "m3", "m4"]
+    assert distances.tolist() == [4000, 0, 1000]
+
+
+def test_nearest_open_museum_excludes_the_given_museum(museums_df):
+    distances, ids = get_nearest_open_museums(
+        museums_df,
+        [0, 0, 0],
+        [0, 0, 0],
+        ["2000", "2000", None],
+        exclude_ids=["m1", "m2", "m1"],
+    )
+    assert ids.tolist() == ["m2", "m1", None]
+    assert distances[:2].tolist() == [1000, 0]
+    assert np.isnan(distances[2])
@@ -0,0 +1,159 @@
+import threading
+
+import neo4j
+
+from sheet_to_graph import UploadCheckpoint, UploadScheduler
+
+NODE_QUERY = (
+    "UNWIND $rows AS row MERGE (node:Person {person_id: row.key})"
+    " SET node += row.properties"
+)
+RELATIONSHIP_QUERY = (
+    "UNWIND $rows AS row"
+    " MATCH (from:Person {person_id: row.from})"
+    " MATCH (to:Person {person_id: row.to})"
+    " MERGE (from)-[:KNOWS {}]->(to)"
+)
+
+
+class FakeNeo4jConnection:
+    def __init__(self, fail_concurrent_calls=False):
+        self.fail_concurrent_calls = fail_concurrent_calls
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def run_write_queries(self, queries, transaction_size=1000, on_commit=None):
+        queries = list(queries)
+        if (
+            self.fail_concurrent_calls
+            and threading.current_thread().name != "MainThread"
+        ):
+            raise neo4j.exceptions.TransientError("deadlock detected")
+        with self.lock:
+            self.calls.append(queries)
+        if on_commit is not None:
+            on_commit(queries)
+        return len(queries)
+
+
+def make_queries():
+    node_batches = [
+        (NODE_QUERY, {"rows": [{"key": str(n), "properties": {}}]}) for n in range(6)
+    ]
+    relationship_rows = [
+        {"from": str(n), "to": str(m), "properties": {}}
+        for n in range(6)
+        for m in range(6)
+        if n != m
+    ]
+    relationship_batches = [
+        (RELATIONSHIP_QUERY, {"rows": relationship_rows[start : start + 10]})
+        for start in range(0, len(relationship_rows), 10)
+    ]
+    return node_batches + relationship_batches + [("CALL db.awaitIndexes()", None)]
+
+
+def test_one_worker_runs_queries_serially_in_order():
+    connection = FakeNeo4jConnection()
+    queries = make_queries()
+
+    UploadScheduler(connection, workers=1).run(queries)
+
+    assert connection.calls == [queries]
+
+
+def test_relationship_partitions_in_a_round_share_no_nodes(monkeypatch):
+    connection = FakeNeo4jConnection()
+    scheduler = UploadScheduler(connection, workers=3)
+    rounds = []
+    run_concurrently = scheduler._run_concurrently
+
+    def record_round(query_lists, record=True):
+        rounds.append(query_lists)
+        return run_concurrently(query_lists, record)
+
+    monkeypatch.setattr(scheduler, "_run_concurrently", record_round)
+
+    scheduler.run(make_queries())
+
+    relationship_rounds = rounds[1:]
+    assert len(relationship_rounds) == 5
+    uploaded_rows = []
+    for query_lists in relationship_rounds:
+        assert len(query_lists) <= 3
+        nodes_by_partition = []
+        for queries in query_lists:
+            rows = [row for _, (_, parameters) in queries for row in parameters["rows"]]
+            uploaded_rows += rows
+            nodes_by_partition.append(
+                {row["from"] for row in rows} | {row["to"] for row in rows}
+            )
+        for index, nodes in enumerate(nodes_by_partition):
+            for other_nodes in nodes_by_partition[index + 1 :]:
+                assert nodes.isdisjoint(other_nodes)
+    assert len(uploaded_rows) == 30
+    assert connection.calls[-1] == [("CALL db.awaitIndexes()", None)]
+
+
+def test_transient_errors_fall_back_to_serial_upload():
+    connection = FakeNeo4jConnection(fail_concurrent_calls=True)
+    queries = make_queries()
+
+    number_of_queries = UploadScheduler(connection, workers=3).run(queries)
+
+    assert number_of_queries == len(queries)
+    assert [query for call in connection.calls for query in call] == queries
+
+
+def test_checkpointed_queries_are_skipped_when_resuming(tmp_path):
+    checkpoint_file_name = str(tmp_path / "checkpoint.txt")
+    queries = make_queries()
+    UploadCheckpoint(checkpoint_file_name).mark_completed(list(enumerate(queries[:4])))
+    connection = FakeNeo4jConnection()
+
+    UploadScheduler(connection, workers=3).run(
+        queries, UploadCheckpoint(checkpoint_file_name)
+    )
+
+    uploaded_node_keys = {
+        row["key"]
+        for call in connection.calls
+        for query, parameters in call
+        if query == NODE_QUERY
+        for row in parameters["rows"]
+    }
+    assert uploaded_node_keys == {"4", "5"}
+    checkpoint = UploadCheckpoint(checkpoint_file_name)
+    assert all(
+        checkpoint.is_completed(index, query) for index, query in enumerate(queries)
+    )
+
+
+def test_changed_queries_are_not_skipped(tmp_path):
+    checkpoint = UploadCheckpoint(str(tmp_path / "checkpoint.txt"))
+    checkpoint.mark_completed([(0, ("CALL db.awaitIndexes()", None))])
+
+    assert checkpoint.is_completed(0, ("CALL db.awaitIndexes()", None))
+    assert not checkpoint.is_completed(1, ("CALL db.awaitIndexes()", None))
+    assert not checkpoint.is_completed(0, ("CALL db.awaitIndexes()", {"a": 1}))
+
+    checkpoint.clear()
+    assert not (tmp_path / "checkpoint.txt").exists()
+
+
+def test_checkpoint_appends_a_line_per_query_and_ignores_cut_lines(tmp_path):
+    checkpoint_file_name = tmp_path / "checkpoint.txt"
+    queries = make_queries()
+    checkpoint = UploadCheckpoint(str(checkpoint_file_name))
+    checkpoint.mark_completed(list(enumerate(queries[:2])))
+    checkpoint.mark_completed([(2, queries[2])])
+    with open(checkpoint_file_name, "a") as f:
+        f.write("3:" + UploadCheckpoint.hash_query(queries[3])[:10])
+
+    assert len(checkpoint_file_name.read_text().splitlines()) == 4
+    checkpoint = UploadCheckpoint(str(checkpoint_file_name))
+    assert [
+        checkpoint.is_completed(index, query) for index, query in enumerate(queries[:4])
+    ] == [True, True, True, False]
+    checkpoint.mark_completed([(4, queries[4])])
+    assert UploadCheckpoint(str(checkpoint_file_name)).is_completed(4, queries[4])
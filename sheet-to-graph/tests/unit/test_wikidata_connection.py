@@ -0,0 +1,238 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from sheet_to_graph import HttpResponseCache, WikidataConnection
+from sheet_to_graph.wikidata_connection import TokenBucket
+
+ENTITIES = {
+    "Q90": {"P625": {"latitude": 48.86, "longitude": 2.35}},
+    "Q84": {
+        "P625": {"latitude": 51.51, "longitude": -0.13},
+        "P1082": {"amount": "+8799728", "unit": "1"},
+        "P17": {"id": "Q145"},
+    },
+}
+
+
+def make_claims(qid):
+    return {
+        pid: [
+            {
+                "mainsnak": {
+                    "datatype": "wikibase-item" if "id" in value else "quantity",
+                    "datavalue": {"value": value},
+                }
+            }
+        ]
+        for pid, value in ENTITIES.get(qid, {}).items()
+    }
+
+
+class StubWikidataHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        with server.lock:
+            server.requests.append(self.path)
+            failures_left = server.failures.get(url.path, 0)
+            if failures_left > 0:
+                server.failures[url.path] = failures_left - 1
+        if failures_left > 0:
+            return self._send(429, {"error": "too many requests"})
+        if url.path == "/w/api.php" and "ids" in parse_qs(url.query):
+            qids = parse_qs(url.query)["ids"][0].split("|")
+            entities = {
+                qid: (
+                    {"id": qid, "missing": ""}
+                    if qid in server.missing_qids
+                    else {"claims": make_claims(qid)}
+                )
+                for qid in qids
+            }
+            return self._send(200, {"entities": entities})
+        if url.path == "/w/api.php":
+            search = parse_qs(url.query)["search"][0]
+            if search in server.error_searches:
+                error = {"code": "invalidsearch", "info": "Invalid search"}
+                return self._send(200, {"error": error})
+            results = [
+                {"id": qid, "label": search}
+                for qid in server.search_results.get(search, [])
+            ]
+            return self._send(200, {"search": results})
+        if url.path.startswith("/wiki/Special:EntityData/"):
+            qid = url.path.split("/")[-1][: -len(".json")]
+            claims = make_claims(qid)
+            etag = f'"{qid}-v1"'
+            if self.headers.get("If-None-Match") == etag:
+                with server.lock:
+                    server.revalidated.append(url.path)
+                return self._send(304, None, {"ETag": etag})
+            return self._send(
+                200, {"entities": {qid: {"claims": claims}}}, {"ETag": etag}
+            )
+        return self._send(404, {})
+
+    def _send(self, status, body, headers=None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWikidataHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures = {}
+    server.revalidated = []
+    server.missing_qids = set()
+    server.error_searches = set()
+    server.search_results = {"Paris, France": ["Q90"], "London": ["Q84"]}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_connection(server, **kwargs):
+    host, port = server.server_address
+    return WikidataConnection(
+        "test@example.com",
+        api_url=f"http://{host}:{port}/w/api.php",
+        entity_data_url=f"http://{host}:{port}/wiki/Special:EntityData",
+        backoff_factor=0,
+        **kwargs,
+    )
+
+
+def test_search_entities_many_returns_results_for_every_term(stub_server):
+    connection = make_connection(stub_server, requests_per_second=100)
+    results, failed_terms = connection.search_entities_many(
+        ["Paris, France", "London", "Nowhere"]
+    )
+    assert failed_terms == set()
+    assert [result["id"] for result in results["Paris, France"]] == ["Q90"]
+    assert [result["id"] for result in results["London"]] == ["Q84"]
+    assert results["Nowhere"] == []
+
+
+def test_get_entity_properties_many_fetches_entities_in_batches(stub_server):
+    connection = make_connection(stub_server, requests_per_second=100)
+    qids = ["Q90", "Q84", "Q90"] + [f"Q{n}" for n in range(1000, 1100)]
+    properties, failed_qids = connection.get_entity_properties_many(qids)
+    assert failed_qids == set()
+    assert properties["Q90"]["P625"]["latitude"] == 48.86
+    assert properties["Q84"]["P625"]["longitude"] == -0.13
+    assert properties["Q84"]["P17"] == "Q145"
+    assert properties["Q1000"] == {}
+    # 102 distinct entities in batches of 50
+    assert len(stub_server.requests) == 3
+    assert all("props=claims" in request for request in stub_server.requests)
+
+
+def test_get_entity_properties_many_parses_only_requested_properties(stub_server):
+    connection = make_connection(stub_server, requests_per_second=100)
+    properties, _ = connection.get_entity_properties_many(["Q84"], ["P625", "P1082"])
+    assert set(properties["Q84"]) == {"P625", "P1082"}
+
+
+def test_requests_are_retried_after_429(stub_server):
+    stub_server.failures["/w/api.php"] = 2
+    connection = make_connection(stub_server, requests_per_second=100)
+    results = connection.search_entities("London")
+    assert [result["id"] for result in results] == ["Q84"]
+    assert len(stub_server.requests) == 3
+
+
+def test_requests_are_retried_after_a_timeout(stub_server, monkeypatch):
+    connection = make_connection(stub_server, requests_per_second=100)
+    get = connection.session.get
+    timeouts = [requests.Timeout("read timed out")]
+
+    def get_or_time_out(*args, **kwargs):
+        if len(timeouts) > 0:
+            raise timeouts.pop()
+        return get(*args, **kwargs)
+
+    monkeypatch.setattr(connection.session, "get", get_or_time_out)
+    results = connection.search_entities("London")
+    assert [result["id"] for result in results] == ["Q84"]
+
+
+def test_failed_requests_are_returned_separately(stub_server):
+    stub_server.failures["/w/api.php"] = 10
+    connection = make_connection(stub_server, requests_per_second=100, max_retries=1)
+    assert connection.search_entities_many(["London"]) == ({}, {"London"})
+    assert connection.get_entity_properties_many(["Q84"]) == ({}, {"Q84"})
+
+
+def test_error_responses_are_failures_and_are_not_cached(stub_server, tmp_path):
+    stub_server.error_searches.add("London")
+    response_cache = HttpResponseCache(str(tmp_path / "cache.sqlite"))
+    connection = make_connection(
+        stub_server, requests_per_second=100, response_cache=response_cache
+    )
+    assert connection.search_entities_many(["London"]) == ({}, {"London"})
+    stub_server.error_searches.clear()
+    results, failed_terms = connection.search_entities_many(["London"])
+    assert [result["id"] for result in results["London"]] == ["Q84"]
+    assert failed_terms == set()
+
+
+def test_missing_entities_are_failures(stub_server):
+    stub_server.missing_qids.add("Q0")
+    connection = make_connection(stub_server, requests_per_second=100)
+    properties, failed_qids = connection.get_entity_properties_many(["Q0", "Q90"])
+    assert set(properties) == {"Q90"}
+    assert failed_qids == {"Q0"}
+
+
+def test_cached_responses_are_served_without_a_request(stub_server, tmp_path):
+    response_cache = HttpResponseCache(str(tmp_path / "cache.sqlite"))
+    connection = make_connection(
+        stub_server, requests_per_second=100, response_cache=response_cache
+    )
+    connection.search_entities("London")
+    connection.search_entities("London")
+    connection.get_entity_properties("Q84")
+    connection.get_entity_properties("Q84")
+    assert len(stub_server.requests) == 2
+
+
+def test_stale_responses_are_revalidated_with_their_etag(stub_server, tmp_path):
+    response_cache = HttpResponseCache(str(tmp_path / "cache.sqlite"), ttl=0)
+    connection = make_connection(
+        stub_server, requests_per_second=100, response_cache=response_cache
+    )
+    connection.get_entity_properties("Q84")
+    properties = connection.get_entity_properties("Q84")
+    assert properties["P625"]["latitude"] == 51.51
+    assert len(stub_server.requests) == 2
+    assert stub_server.revalidated == ["/wiki/Special:EntityData/Q84.json"]
+
+
+def test_token_bucket_limits_request_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # the first token is available immediately, the other five take 1/50s each
+    assert time.monotonic() - start >= 0.09
@@ -8,6 +8,7 @@ The script does the following:
 - it generates csv representations.
 """
 
+import atexit
 from functools import lru_cache
 import json
 import re
@@ -21,9 +22,11 @@ from scipy import sparse
 from scipy.io import mmwrite
 
 from sheet_to_graph import (
+    BoundaryAssigner,
     Column,
     FileLoader,
     GoogleUtils,
+    HttpResponseCache,
     PostcodeToLatLong,
     Table,
     WikidataConnection,
@@ -34,6 +37,7 @@ from sheet_to_graph.columns import (
     EnumColumn,
     FormulaColumn,
     ListColumn,
+    MultiFormulaColumn,
     OptionalColumn,
     ReferenceColumn,
     SplitColumn,
@@ -55,6 +59,7 @@ from sheet_to_graph.rules import (
     MutuallyRequiredColumns,
     UniqueCorrespondences,
 )
+from sheet_to_graph.spatial_index import METRES_PER_MILE, get_nearest_open_museums
 
 
 def make_get_ancestors(lookup_table: dict) -> callable:
@@ -122,11 +127,27 @@ def make_get_ultimate_ancestor(lookup_table: dict) -> callable:
 
 if __name__ == "__main__":
     google_service = GoogleUtils.get_sheets_service()
-    file_loader = FileLoader.from_config_file("config.json", google_service)
+    file_loader = FileLoader.from_config_file(
+        "config.json", google_service, GoogleUtils.get_drive_service()
+    )
     output_directory_id = file_loader.values["output_csvs_directory"]
     credentials_file_name = "credentials.json"
+    response_cache = HttpResponseCache()
+    # the cache saves when its responses were last read on its next write,
+    # so close it on exit to save those of a run that only reads
+    atexit.register(response_cache.close)
+    wikidata_connection = WikidataConnection(
+        file_loader.values["email"], response_cache=response_cache
+    )
+    local_authority_assigner = (
+        BoundaryAssigner(file_loader.values["lad_boundaries_file"])
+        if file_loader.values.get("lad_boundaries_file", "") != ""
+        else None
+    )
     postcode_to_lat_long = PostcodeToLatLong(
-        "../data/ONSPD_FEB_2024_UK", WikidataConnection(file_loader.values["email"])
+        "../data/ONSPD_FEB_2024_UK",
+        wikidata_connection,
+        local_authority_assigner=local_authority_assigner,
     )
 
     print("Defining Tables")
@@ -236,61 +257,9 @@ if __name__ == "__main__":
             Column("county", property_of="place_id"),
             OptionalColumn("actor_country", property_of="place_id"),
             Column("postcode", property_of="place_id"),
-            FormulaColumn(
-                "longitude",
-                formula=lambda table, row_index: formulae.get_longitude(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "latitude",
-                formula=lambda table, row_index: formulae.get_latitude(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "bng_x",
-                formula=lambda table, row_index: formulae.get_bng_x(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "bng_y",
-                formula=lambda table, row_index: formulae.get_bng_y(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "region",
-                formula=lambda table, row_index: formulae.get_region(
+            MultiFormulaColumn(
+                "geo_info",
+                formula=lambda table, row_index: formulae.get_geo_info(
                     postcode_to_lat_long,
                     table,
                     row_index,
@@ -299,39 +268,27 @@ if __name__ == "__main__":
                     county_column="county",
                     country_column="actor_country",
                 ),
-                property_of="place_id",
+                sub_columns=[
+                    Column("longitude", property_of="place_id"),
+                    Column("latitude", property_of="place_id"),
+                    Column("bng_x", property_of="place_id"),
+                    Column("bng_y", property_of="place_id"),
+                    Column("region", property_of="place_id"),
+                    Column("local_authority_code", property_of="place_id"),
+                    Column("local_authority_name", property_of="place_id"),
+                ],
+                outputs={
+                    "longitude": "long",
+                    "latitude": "lat",
+                    "local_authority_code": "lad23cd",
+                    "local_authority_name": "lad23nm",
+                },
             ),
             FormulaColumn(
                 "country",
                 formula=lambda table, row_index: formulae.get_country(table, row_index),
                 property_of="place_id",
             ),
-            FormulaColumn(
-                "local_authority_code",
-                formula=lambda table, row_index: formulae.get_local_authority_code(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "local_authority_name",
-                formula=lambda table, row_index: formulae.get_local_authority_name(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
             FormulaColumn(
                 "place_id",
                 formula=formulae.get_place_id,
@@ -780,6 +737,7 @@ if __name__ == "__main__":
     )
 
     print("Loading data from files")
+    file_loader.prefetch()
     actor_types.import_from_list_of_lists(
         file_loader.get_sheet_as_list_of_lists("actor types")
     )
@@ -796,39 +754,55 @@ if __name__ == "__main__":
         file_loader.get_sheet_as_list_of_lists("super causes hierarchy")
     )
 
-    places.import_from_list_of_lists(
-        file_loader.get_sheet_as_list_of_lists("actors"),
-        header_mapping={
-            "actor_address1": "address_1",
-            "actor_address2": "address_2",
-            "actor_town_city": "village_town_city",
-            "actor_county": "county",
-            "actor_postcode": "postcode",
-            "actor_country": "actor_country",
-        },
-    )
-    places.import_from_list_of_lists(
-        file_loader.get_sheet_as_list_of_lists("museums"),
-        header_mapping={
-            "address_1": "address_1",
-            "address_2": "address_2",
-            "address_3": "address_3",
-            "village_town_city": "village_town_city",
-            "english_county": "county",
-            "postcode": "postcode",
-            "country": "actor_country",
-        },
-    )
-    places.import_from_list_of_lists(
-        file_loader.get_sheet_as_list_of_lists("events"),
-        preprocessor=EventPlacesPreprocessor(),
-        header_mapping={
-            "street": "address_1",
-            "town": "village_town_city",
-            "county": "county",
-            "postcode": "postcode",
-        },
-    )
+    actor_places_header_mapping = {
+        "actor_address1": "address_1",
+        "actor_address2": "address_2",
+        "actor_town_city": "village_town_city",
+        "actor_county": "county",
+        "actor_postcode": "postcode",
+        "actor_country": "actor_country",
+    }
+    museum_places_header_mapping = {
+        "address_1": "address_1",
+        "address_2": "address_2",
+        "address_3": "address_3",
+        "village_town_city": "village_town_city",
+        "english_county": "county",
+        "postcode": "postcode",
+        "country": "actor_country",
+    }
+    event_places_header_mapping = {
+        "street": "address_1",
+        "town": "village_town_city",
+        "county": "county",
+        "postcode": "postcode",
+    }
+
+    place_sheets = [
+        (
+            file_loader.get_sheet_as_list_of_lists("actors"),
+            None,
+            actor_places_header_mapping,
+        ),
+        (
+            file_loader.get_sheet_as_list_of_lists("museums"),
+            None,
+            museum_places_header_mapping,
+        ),
+        (
+            file_loader.get_sheet_as_list_of_lists("events"),
+            EventPlacesPreprocessor(),
+            event_places_header_mapping,
+        ),
+    ]
+
+    print("Resolving locations")
+    postcode_to_lat_long.resolve_sheets(place_sheets)
+
+    for rows, preprocessor, header_mapping in place_sheets:
+        places.import_from_list_of_lists(
+            rows, header_mapping=header_mapping, preprocessor=preprocessor
+        )
     places.remove_duplicates()
 
     actors.import_from_list_of_lists(
@@ -857,6 +831,7 @@ if __name__ == "__main__":
             default_recipient_types, actors, places, event_types
         ),
     )
+    postcode_to_lat_long.commit()
 
     actor_types_df = actor_types.to_pandas_dataframe()
     event_types_df = event_types.to_pandas_dataframe()
@@ -1251,6 +1226,39 @@ if __name__ == "__main__":
         "distance_from_initial_museum_category"
     ].mask(dispersal_events["recipient_type"] == "end of existence", "end of existence")
 
+    # nearest museum that was open when the objects left their origin,
+    # to compare with how far they actually travelled.
+    # unlike the geodesic distance columns, this is a straight-line distance on the
+    # British National Grid, so it is left empty for origins outside Great Britain
+    event_years = (
+        dispersal_events["event_date"]
+        .where(
+            dispersal_events["event_date"].notna()
+            & (dispersal_events["event_date"] != ""),
+            dispersal_events["event_date_from"],
+        )
+        .astype(str)
+        .str.extract(r"^(\d{4})", expand=False)
+    )
+    origin_in_great_britain = dispersal_events["origin_country"].isin(
+        ["England", "Scotland", "Wales"]
+    )
+    nearest_open_museum_distances, nearest_open_museum_ids = get_nearest_open_museums(
+        museums_df,
+        pd.to_numeric(dispersal_events["origin_x"], errors="coerce").where(
+            origin_in_great_britain
+        ),
+        pd.to_numeric(dispersal_events["origin_y"], errors="coerce").where(
+            origin_in_great_britain
+        ),
+        event_years,
+        exclude_ids=dispersal_events["initial_museum_id"],
+    )
+    dispersal_events["nearest_open_museum_id"] = nearest_open_museum_ids
+    dispersal_events["nearest_open_museum_distance"] = (
+        nearest_open_museum_distances / METRES_PER_MILE
+    )
+
     # infer collection sizes
     mask = dispersal_events["collection_collection_or_object"] == "Collection"
     dispersal_events["collection_estimated_size"] = np.nan
@@ -1583,13 +1591,16 @@ if __name__ == "__main__":
         "distance_category",
         "distance_from_initial_museum",
         "distance_from_initial_museum_category",
+        "nearest_open_museum_id",
+        "nearest_open_museum_distance",
     ]
     dispersal_events = dispersal_events[dispersal_events_columns]
 
     # find "sold-at-auction" events
     # where the same collection_id was in a preceding "sent-to-auction" event.
     # Delete the "sent-to-auction" event and update the "sold-at-auction" event's
-    # stage_in_path, sender, and origin fields with the values from the "sent-to-auction" event.
+    # stage_in_path, sender, origin and nearest open museum fields
+    # with the values from the "sent-to-auction" event.
     sender_values = [
         col_name
         for col_name in dispersal_events_columns
@@ -1601,7 +1612,10 @@ if __name__ == "__main__":
         if col_name.startswith("origin_")
     ]
     cols_to_update = (
-        ["event_stage_in_path", "previous_event_id"] + sender_values + origin_values
+        ["event_stage_in_path", "previous_event_id"]
+        + sender_values
+        + origin_values
+        + ["nearest_open_museum_id", "nearest_open_museum_distance"]
     )
 
     sent_to_auction_events = dispersal_events[
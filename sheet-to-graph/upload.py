@@ -7,12 +7,15 @@ The script does the following:
 - it uploads the data into a neo4j database.
 """
 
+import atexit
 import json
 
 from sheet_to_graph import (
+    BoundaryAssigner,
     Column,
     FileLoader,
     GoogleUtils,
+    HttpResponseCache,
     PostcodeToLatLong,
     Table,
     WikidataConnection,
@@ -23,6 +26,7 @@ from sheet_to_graph.columns import (
     EnumColumn,
     FormulaColumn,
     ListColumn,
+    MultiFormulaColumn,
     OptionalColumn,
     ReferenceColumn,
     SplitColumn,
@@ -47,10 +51,26 @@ from sheet_to_graph.rules import (
 
 if __name__ == "__main__":
     google_service = GoogleUtils.get_sheets_service()
-    file_loader = FileLoader.from_config_file("config.json", google_service)
+    file_loader = FileLoader.from_config_file(
+        "config.json", google_service, GoogleUtils.get_drive_service()
+    )
     credentials_file_name = "credentials.json"
+    response_cache = HttpResponseCache()
+    # the cache saves when its responses were last read on its next write,
+    # so close it on exit to save those of a run that only reads
+    atexit.register(response_cache.close)
+    wikidata_connection = WikidataConnection(
+        file_loader.values["email"], response_cache=response_cache
+    )
+    local_authority_assigner = (
+        BoundaryAssigner(file_loader.values["lad_boundaries_file"])
+        if file_loader.values.get("lad_boundaries_file", "") != ""
+        else None
+    )
     postcode_to_lat_long = PostcodeToLatLong(
-        "../data/ONSPD_FEB_2024_UK", WikidataConnection()
+        "../data/ONSPD_FEB_2024_UK",
+        wikidata_connection,
+        local_authority_assigner=local_authority_assigner,
     )
 
     print("Defining Tables")
@@ -160,35 +180,9 @@ if __name__ == "__main__":
             Column("county", property_of="place_id"),
             OptionalColumn("actor_country", property_of="place_id"),
             Column("postcode", property_of="place_id"),
-            FormulaColumn(
-                "longitude",
-                formula=lambda table, row_index: formulae.get_longitude(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "latitude",
-                formula=lambda table, row_index: formulae.get_latitude(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "bng_x",
-                formula=lambda table, row_index: formulae.get_bng_x(
+            MultiFormulaColumn(
+                "geo_info",
+                formula=lambda table, row_index: formulae.get_geo_info(
                     postcode_to_lat_long,
                     table,
                     row_index,
@@ -197,65 +191,27 @@ if __name__ == "__main__":
                     county_column="county",
                     country_column="actor_country",
                 ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "bng_y",
-                formula=lambda table, row_index: formulae.get_bng_y(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "region",
-                formula=lambda table, row_index: formulae.get_region(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
+                sub_columns=[
+                    Column("longitude", property_of="place_id"),
+                    Column("latitude", property_of="place_id"),
+                    Column("bng_x", property_of="place_id"),
+                    Column("bng_y", property_of="place_id"),
+                    Column("region", property_of="place_id"),
+                    Column("local_authority_code", property_of="place_id"),
+                    Column("local_authority_name", property_of="place_id"),
+                ],
+                outputs={
+                    "longitude": "long",
+                    "latitude": "lat",
+                    "local_authority_code": "lad23cd",
+                    "local_authority_name": "lad23nm",
+                },
             ),
             FormulaColumn(
                 "country",
                 formula=lambda table, row_index: formulae.get_country(table, row_index),
                 property_of="place_id",
             ),
-            FormulaColumn(
-                "local_authority_code",
-                formula=lambda table, row_index: formulae.get_local_authority_code(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
-            FormulaColumn(
-                "local_authority_name",
-                formula=lambda table, row_index: formulae.get_local_authority_name(
-                    postcode_to_lat_long,
-                    table,
-                    row_index,
-                    postcode_column="postcode",
-                    town_city_column="village_town_city",
-                    county_column="county",
-                    country_column="actor_country",
-                ),
-                property_of="place_id",
-            ),
             FormulaColumn(
                 "place_id",
                 formula=formulae.get_place_id,
@@ -703,6 +659,7 @@ if __name__ == "__main__":
     )
 
     print("Loading data from files")
+    file_loader.prefetch()
     actor_types.import_from_list_of_lists(
         file_loader.get_sheet_as_list_of_lists("actor types")
     )
@@ -719,39 +676,55 @@ if __name__ == "__main__":
         file_loader.get_sheet_as_list_of_lists("super causes hierarchy")
     )
 
-    places.import_from_list_of_lists(
-        file_loader.get_sheet_as_list_of_lists("actors"),
-        header_mapping={
-            "actor_address1": "address_1",
-            "actor_address2": "address_2",
-            "actor_town_city": "village_town_city",
-            "actor_county": "county",
-            "actor_postcode": "postcode",
-            "actor_country": "actor_country",
-        },
-    )
-    places.import_from_list_of_lists(
-        file_loader.get_sheet_as_list_of_lists("museums"),
-        header_mapping={
-            "address_1": "address_1",
-            "address_2": "address_2",
-            "address_3": "address_3",
-            "village_town_city": "village_town_city",
-            "english_county": "county",
-            "postcode": "postcode",
-            "country": "actor_country",
-        },
-    )
-    places.import_from_list_of_lists(
-        file_loader.get_sheet_as_list_of_lists("events"),
-        preprocessor=EventPlacesPreprocessor(),
-        header_mapping={
-            "street": "address_1",
-            "town": "village_town_city",
-            "county": "county",
-            "postcode": "postcode",
-        },
-    )
+    actor_places_header_mapping = {
+        "actor_address1": "address_1",
+        "actor_address2": "address_2",
+        "actor_town_city": "village_town_city",
+        "actor_county": "county",
+        "actor_postcode": "postcode",
+        "actor_country": "actor_country",
+    }
+    museum_places_header_mapping = {
+        "address_1": "address_1",
+        "address_2": "address_2",
+        "address_3": "address_3",
+        "village_town_city": "village_town_city",
+        "english_county": "county",
+        "postcode": "postcode",
+        "country": "actor_country",
+    }
+    event_places_header_mapping = {
+        "street": "address_1",
+        "town": "village_town_city",
+        "county": "county",
+        "postcode": "postcode",
+    }
+
+    place_sheets = [
+        (
+            file_loader.get_sheet_as_list_of_lists("actors"),
+            None,
+            actor_places_header_mapping,
+        ),
+        (
+            file_loader.get_sheet_as_list_of_lists("museums"),
+            None,
+            museum_places_header_mapping,
+        ),
+        (
+            file_loader.get_sheet_as_list_of_lists("events"),
+            EventPlacesPreprocessor(),
+            event_places_header_mapping,
+        ),
+    ]
+
+    print("Resolving locations")
+    postcode_to_lat_long.resolve_sheets(place_sheets)
+
+    for rows, preprocessor, header_mapping in place_sheets:
+        places.import_from_list_of_lists(
+            rows, header_mapping=header_mapping, preprocessor=preprocessor
+        )
     places.remove_duplicates()
 
     actors.import_from_list_of_lists(
@@ -778,6 +751,7 @@ if __name__ == "__main__":
             default_recipient_types, actors, places, event_types
         ),
     )
+    postcode_to_lat_long.commit()
 
     infer_collection_sizes = """
 MATCH (c:Collection)<-[:INVOLVES]-(:Event)-[:SUB_EVENT_OF]->(:SuperEvent)-[:CONCERNS]->(m:Actor)
@@ -879,7 +853,32 @@ CREATE (origin)<-[:HAS_ORIGIN]-(sold_at_auction)
             separate_sent_and_sold_auction_events_where_sub_collection_is_sold,
         ],
         credentials_file_name=credentials_file_name,
+        batch_size=file_loader.values["upload_batch_size"],
+        transaction_size=file_loader.values["upload_transaction_size"],
+        workers=file_loader.values["upload_workers"],
+        manifest_file_name=(
+            file_loader.values["upload_manifest_file"]
+            if file_loader.values.get("upload_manifest_file", "") != ""
+            else None
+        ),
+        checkpoint_file_name=(
+            file_loader.values["upload_checkpoint_file"]
+            if file_loader.values.get("upload_checkpoint_file", "") != ""
+            else None
+        ),
+        metrics_file_name=(
+            file_loader.values["upload_metrics_file"]
+            if file_loader.values.get("upload_metrics_file", "") != ""
+            else None
+        ),
     )
-    sheet_to_graph.translate_and_upload(
-        output_spreadsheet_name="output.xlsx", stop_if_validation_fails=True
-    )
+    if file_loader.values.get("bulk_import_directory", "") != "":
+        sheet_to_graph.translate_and_export(
+            output_spreadsheet_name="output.xlsx",
+            stop_if_validation_fails=True,
+            import_directory_name=file_loader.values["bulk_import_directory"],
+        )
+    else:
+        sheet_to_graph.translate_and_upload(
+            output_spreadsheet_name="output.xlsx", stop_if_validation_fails=True
+        )